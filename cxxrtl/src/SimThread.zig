@@ -11,6 +11,9 @@ pub const HEIGHT = 240;
 pub const Color = packed struct(u16) { r: u5, g: u6, b: u5 };
 pub const ImgData = [HEIGHT * WIDTH]Color;
 
+// spi_clk edges per clk edge; see targets.cxxrtl.lcd_clk_frequency.
+const SPI_RATIO = 2;
+
 sim_controller: *SimController,
 alloc: std.mem.Allocator,
 
@@ -19,6 +22,8 @@ vcd: ?Cxxrtl.Vcd,
 
 clk: Cxxrtl.Object(bool),
 rst: Cxxrtl.Object(bool),
+spi_clk: Cxxrtl.Object(bool),
+spi_phase: u8 = 0,
 
 spi_connector: SpiConnector,
 
@@ -33,6 +38,7 @@ pub fn init(alloc: std.mem.Allocator, sim_controller: *SimController) SimThread
 
     const clk = cxxrtl.get(bool, "clk");
     const rst = cxxrtl.get(bool, "rst");
+    const spi_clk = cxxrtl.get(bool, "spi_clk");
 
     const spi_connector = SpiConnector.init(cxxrtl);
 
@@ -43,6 +49,7 @@ pub fn init(alloc: std.mem.Allocator, sim_controller: *SimController) SimThread
         .vcd = vcd,
         .clk = clk,
         .rst = rst,
+        .spi_clk = spi_clk,
         .spi_connector = spi_connector,
     };
 }
@@ -55,8 +62,7 @@ pub fn deinit(self: *SimThread) void {
 pub fn run(self: *SimThread) !void {
     self.sim_controller.lock();
     self.rst.next(true);
-    self.tick();
-    self.tick();
+    for (0..2 * SPI_RATIO) |_| self.tick();
     self.rst.next(false);
     self.sim_controller.unlock();
 
@@ -172,12 +178,18 @@ pub fn run(self: *SimThread) !void {
     try self.writeVcd();
 }
 
+// Steps one edge of spi_clk, so the SpiConnector sees every one; clk moves
+// every SPI_RATIO steps.
 fn tick(self: *SimThread) void {
-    self.clk.next(!self.clk.curr());
+    self.spi_clk.next(!self.spi_clk.curr());
+    self.spi_phase += 1;
+    if (self.spi_phase == SPI_RATIO) {
+        self.spi_phase = 0;
+        self.clk.next(!self.clk.curr());
+        self.sim_controller.tick_number += 1;
+    }
     self.cxxrtl.step();
     if (self.vcd) |*vcd| vcd.sample();
-
-    self.sim_controller.tick_number += 1;
 }
 
 fn writeVcd(self: *SimThread) !void {
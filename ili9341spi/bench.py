@@ -0,0 +1,267 @@
+import argparse
+import json
+import sys
+import time
+
+from amaranth import Elaboratable, Module
+from amaranth.hdl import Fragment
+from amaranth.lib import data, wiring
+from amaranth.sim import Simulator
+
+from .rtl import Top
+from .rtl.initter import Initter
+from .rtl.lcd import Lcd
+from .rtl.life import Life
+from .rtl.proto import Stats
+from .rtl.render import Render
+from .targets import cxxrtl, icebreaker, ulx3s
+
+__all__ = ["bench_lcd", "bench_initter", "bench_frame", "bench_top", "derive", "run"]
+
+
+# Cycle counts and simulator throughput for the pieces of Top, as JSON:
+#
+#   python -m ili9341spi.bench [--top] [-o bench.json]
+#
+# `cycles` are exact, from simulation: a byte through Lcd, bringing the panel
+# up at cxxrtl's clock, drawing a full frame and damage-only ones as fast as
+# Render goes, and evolving a generation. With --top, Top itself is run
+# through its first generation on cxxrtl, and its own counters read back;
+# that takes minutes. `targets` has what those come to at each target's
+# clocks, where the SPI clock usually sets the pace. `throughput` is
+# simulated cycles per second of wall time.
+
+LCD_WIDTH = 320
+LCD_HEIGHT = 240
+CELL_SIZE = 4
+WORD_WIDTH = 16
+
+
+class platform:
+    simulation = True
+    default_clk_frequency = cxxrtl.default_clk_frequency
+
+
+def _simulate(elaboratable, *testbenches, plat=platform, processes=()):
+    # Runs the testbenches, the first of which returns its result; the
+    # others go in the background. Returns that result and the seconds the
+    # simulation itself took, leaving out elaboration.
+    result = None
+
+    async def main(ctx):
+        nonlocal result
+        result = await testbenches[0](ctx)
+
+    sim = Simulator(Fragment.get(elaboratable, plat))
+    sim.add_clock(1 / plat.default_clk_frequency)
+    sim.add_testbench(main)
+    for testbench in testbenches[1:]:
+        sim.add_testbench(testbench, background=True)
+    for process in processes:
+        sim.add_process(process)
+    start = time.perf_counter()
+    sim.run()
+    return result, time.perf_counter() - start
+
+
+def bench_lcd(count=512):
+    # A byte's cycles, from one going in to the next, streamed flat out once
+    # the FIFO's full.
+    dut = Lcd()
+
+    async def testbench(ctx):
+        ctx.set(dut.cmd.req.valid, 1)
+        cycle = 0
+        taken = []
+        while len(taken) < count:
+            ctx.set(dut.cmd.req.payload.data, cycle & 0xff)
+            _, _, ready = await ctx.tick().sample(dut.cmd.req.ready)
+            if ready:
+                taken.append(cycle)
+            cycle += 1
+        ctx.set(dut.cmd.req.valid, 0)
+        await ctx.tick().until(dut.idle)
+        return cycle, (taken[-1] - taken[count // 2]) / (count - 1 - count // 2)
+
+    (cycles, per_byte), seconds = _simulate(dut, testbench)
+    return {"cycles": cycles, "byte": per_byte, "throughput": cycles / seconds}
+
+
+def bench_initter():
+    # Reset to done, through a real Lcd.
+    m = Module()
+    m.submodules.initter = initter = Initter()
+    m.submodules.lcd = lcd = Lcd()
+    wiring.connect(m, wiring.flipped(initter.lcd), lcd.cmd)
+
+    async def testbench(ctx):
+        cycles = 0
+        while not ctx.get(initter.done):
+            await ctx.tick()
+            cycles += 1
+        return cycles
+
+    cycles, seconds = _simulate(m, testbench)
+    return {"cycles": cycles, "throughput": cycles / seconds}
+
+
+class _Frame(Elaboratable):
+    # Top's Life and Render, at its size, with nothing in front of the panel.
+    def __init__(self):
+        width, height = LCD_WIDTH // CELL_SIZE, LCD_HEIGHT // CELL_SIZE
+        self.life = Life(width=width, height=height, word_width=WORD_WIDTH,
+                         init=Life.start_cells(width, height))
+        self.dut = Render(width=LCD_WIDTH, height=LCD_HEIGHT, cell_size=CELL_SIZE,
+                          word_width=WORD_WIDTH)
+
+    def elaborate(self, platform):
+        m = Module()
+        m.submodules.life = self.life
+        m.submodules.dut = self.dut
+        wiring.connect(m, self.life.cells, self.dut.cells)
+        wiring.connect(m, self.life.damage, self.dut.damage)
+        return m
+
+
+def bench_frame(gens=2):
+    # Top's Life and Render, with the panel always ready: a full frame while
+    # the first generation evolves, then `gens` drawn from damage alone.
+    h = _Frame()
+
+    async def testbench(ctx):
+        ctx.set(h.dut.lcd.req.ready, 1)
+        frames = []
+        evolve = None
+        for gen in range(gens + 1):
+            ctx.set(h.dut.start, 1)
+            ctx.set(h.dut.full, gen == 0)
+            ctx.set(h.life.step, 1)
+            await ctx.tick()
+            ctx.set(h.dut.start, 0)
+            ctx.set(h.life.step, 0)
+            cycles = 1
+            bytes = 0
+            life_cycles = None
+            while ctx.get(h.dut.busy) or ctx.get(h.life.busy):
+                _, _, valid, render_busy, life_busy = await ctx.tick().sample(
+                    h.dut.lcd.req.valid, h.dut.busy, h.life.busy
+                )
+                cycles += 1
+                bytes += valid
+                if not life_busy and life_cycles is None:
+                    life_cycles = cycles
+                if render_busy:
+                    render_cycles = cycles
+            frames.append((render_cycles, bytes))
+            evolve = life_cycles
+            ctx.set(h.life.swap, 1)
+            await ctx.tick()
+            ctx.set(h.life.swap, 0)
+        return frames, evolve
+
+    (frames, evolve), seconds = _simulate(h, testbench)
+    cycles = sum(render_cycles for render_cycles, _ in frames)
+    damage = frames[1:]
+    return {
+        "render_full": frames[0][0],
+        "render_full_bytes": frames[0][1],
+        "render_damage": sum(c for c, _ in damage) / len(damage),
+        "render_damage_bytes": sum(b for _, b in damage) / len(damage),
+        "evolve": evolve,
+        "throughput": cycles / seconds,
+    }
+
+
+def bench_top(plat=None, top=None):
+    # Top on cxxrtl, through init, the first frame and the first generation;
+    # its counters are read back as they're snapshotted at the second frame.
+    if plat is None:
+        plat = cxxrtl()
+        plat.simulation = True
+    if top is None:
+        top = Top(plat)
+
+    async def spi_clk(ctx):
+        # A process can't sample, so it keeps its own count.
+        clk = 0
+        while True:
+            await ctx.delay(1 / plat.lcd_clk_frequency / 2)
+            clk ^= 1
+            ctx.set(top.spi_clk, clk)
+
+    async def testbench(ctx):
+        ctx.set(top.uart_rx, 1)
+        cycles = 0
+        while ctx.get(top.stats.gens) == 0:
+            await ctx.tick()
+            cycles += 1
+        stats = ctx.get(top.stats)
+        return cycles, {
+            **{name: getattr(stats, name) for name, _ in data.Layout.cast(Stats)},
+            "frame_cycles": ctx.get(top.frame_cycles),
+        }
+
+    (cycles, stats), seconds = _simulate(top, testbench, plat=plat, processes=[spi_clk])
+    return {**stats, "throughput": cycles / seconds}
+
+
+def derive(cycles):
+    # What `cycles` come to at each target's clocks. Render offers a byte a
+    # cycle, but Lcd takes 8 SPI clocks over each, `lcd_divisor` cycles of
+    # its own domain apiece.
+    targets = {}
+    for target in [icebreaker, ulx3s, cxxrtl]:
+        plat = target()
+        f = plat.default_clk_frequency
+        byte = 8 * plat.lcd_divisor * f / plat.lcd_clk_frequency
+        full = max(cycles["render_full"], cycles["render_full_bytes"] * byte)
+        damage = max(cycles["render_damage"], cycles["render_damage_bytes"] * byte)
+        # The next generation evolves while this one's drawn.
+        gen = max(damage, cycles["evolve"]) + cycles.get("transition", 0)
+        targets[target.__name__] = {
+            "clk_frequency": f,
+            "render_full": full,
+            "render_damage": damage,
+            "full_fps": f / full,
+            "gens_per_second": f / gen,
+        }
+    return targets
+
+
+def run(*, top=False):
+    lcd = bench_lcd()
+    initter = bench_initter()
+    frame = bench_frame()
+    cycles = {
+        "lcd_byte": lcd["byte"],
+        "init": initter["cycles"],
+        **{name: value for name, value in frame.items() if name != "throughput"},
+    }
+    throughput = {
+        "lcd": lcd["throughput"],
+        "initter": initter["throughput"],
+        "frame": frame["throughput"],
+    }
+    result = {"cycles": cycles, "throughput": throughput}
+    if top:
+        stats = bench_top()
+        throughput["top"] = stats.pop("throughput")
+        cycles["transition"] = stats["transition"]
+        result["top"] = stats
+    result["targets"] = derive(cycles)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Count cycles and simulator throughput, and what they come to on each target.",
+    )
+    parser.add_argument("--top", action="store_true", help="simulate Top too (slow)")
+    parser.add_argument("-o", "--output", type=argparse.FileType("w"), default=sys.stdout)
+    args = parser.parse_args()
+    json.dump(run(top=args.top), args.output, indent=2)
+    args.output.write("\n")
+
+
+if __name__ == "__main__":
+    main()
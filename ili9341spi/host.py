@@ -0,0 +1,302 @@
+import argparse
+import os
+import re
+import time
+
+from .rtl.life import Life
+from .rtl.proto import BridgeOp, LcdCommand, Stats
+
+__all__ = [
+    "rgb565", "window", "fill", "raw", "command", "sync", "host", "life", "load",
+    "stats", "view", "encode_pixels", "encode_frame", "chunks", "parse_rle", "seed", "send",
+    "STATS_REPLY_LEN", "parse_stats",
+]
+
+
+# Encodes BridgeOps for rtl.Bridge, to be sent over the UART.
+
+
+def rgb565(r, g, b):
+    return ((r >> 3) << 11) | ((g >> 2) << 5) | (b >> 3)
+
+
+def _u16(value):
+    return [value >> 8, value & 0xFF]
+
+
+def window(x0, x1, y0, y1):
+    return bytes([BridgeOp.WINDOW.value, *_u16(x0), *_u16(x1), *_u16(y0), *_u16(y1)])
+
+
+def fill(colour, count):
+    out = bytearray()
+    while count > 0:
+        n = min(count, 256)
+        out += bytes([BridgeOp.FILL.value, n - 1, *_u16(colour)])
+        count -= n
+    return bytes(out)
+
+
+def raw(pixels, *, span=256):
+    out = bytearray()
+    for ix in range(0, len(pixels), span):
+        part = pixels[ix:ix + span]
+        out += bytes([BridgeOp.RAW.value, len(part) - 1])
+        for pixel in part:
+            out += bytes(_u16(pixel))
+    return bytes(out)
+
+
+def command(cmd, params=(), resp_len=0):
+    if isinstance(cmd, LcdCommand):
+        cmd = cmd.value
+    if resp_len > 15:
+        raise ValueError(f"resp_len {resp_len} is more than the 15 Lcd can read")
+    return bytes([BridgeOp.COMMAND.value, cmd, len(params), resp_len, *params])
+
+
+def sync():
+    return bytes([BridgeOp.SYNC.value])
+
+
+def host():
+    return bytes([BridgeOp.HOST.value])
+
+
+def life():
+    return bytes([BridgeOp.LIFE.value])
+
+
+def load(cells, *, word_width=16, span=128):
+    # `cells` is the whole universe in raster order; Life's words are
+    # `word_width` cells wide. Sent `span` bytes at a time.
+    word_bytes = word_width // 8
+    assert span % word_bytes == 0
+    packed = Life.pack(cells, 8)
+    out = bytearray()
+    for ix in range(0, len(packed), span):
+        part = packed[ix:ix + span]
+        assert len(part) % word_bytes == 0
+        out += bytes([BridgeOp.LOAD.value, *_u16(ix // word_bytes), len(part) - 1, *part])
+    return bytes(out)
+
+
+def stats():
+    return bytes([BridgeOp.STATS.value])
+
+
+def view(x):
+    return bytes([BridgeOp.VIEW.value, *_u16(x)])
+
+
+STATS_REPLY_LEN = 1 + Stats.as_shape().size // 8
+
+
+def parse_stats(reply):
+    # Returns the counters in a STATS reply by name.
+    assert len(reply) == STATS_REPLY_LEN and reply[0] == BridgeOp.STATS.value
+    return {
+        name: int.from_bytes(reply[1 + ix * 4:5 + ix * 4], "big")
+        for ix, (name, _) in enumerate(Stats.as_shape())
+    }
+
+
+def encode_pixels(pixels, *, min_run=3, raw_span=64):
+    # Runs of at least `min_run` of the same colour are filled; anything
+    # between them is sent raw, in spans of at most `raw_span` pixels so each
+    # op fits comfortably in a chunk. A FILL costs as much as two raw pixels.
+    out = bytearray()
+    pending = []
+    ix = 0
+    while ix < len(pixels):
+        run = 1
+        while ix + run < len(pixels) and pixels[ix + run] == pixels[ix]:
+            run += 1
+        if run >= min_run:
+            if pending:
+                out += raw(pending, span=raw_span)
+                pending = []
+            out += fill(pixels[ix], run)
+        else:
+            pending.extend(pixels[ix:ix + run])
+        ix += run
+    if pending:
+        out += raw(pending, span=raw_span)
+    return bytes(out)
+
+
+def encode_frame(pixels, width, height, *, x=0, y=0):
+    # `pixels` is `width * height` RGB565 values in raster order, drawn with
+    # their top-left at (`x`, `y`). Runs carry on across rows, since the
+    # panel wraps within the window.
+    assert len(pixels) == width * height
+    return window(x, x + width - 1, y, y + height - 1) + encode_pixels(pixels)
+
+
+def chunks(data, size=256):
+    # Splits encoded ops into chunks of at most `size` bytes, each ending in
+    # a SYNC whose reply is to be waited for before sending the next, so as not
+    # to overrun the bridge's receive queue. Ops aren't split.
+    chunk = bytearray()
+    for op in _ops(data):
+        assert len(op) < size, f"{len(op)}-byte op doesn't fit in a chunk"
+        if len(chunk) + len(op) + 1 > size and chunk:
+            yield bytes(chunk + sync())
+            chunk = bytearray()
+        chunk += op
+    if chunk:
+        yield bytes(chunk + sync())
+
+
+def _ops(data):
+    ix = 0
+    while ix < len(data):
+        op = BridgeOp(data[ix])
+        match op:
+            case BridgeOp.WINDOW:
+                length = 9
+            case BridgeOp.FILL:
+                length = 4
+            case BridgeOp.RAW:
+                length = 2 + 2 * (data[ix + 1] + 1)
+            case BridgeOp.COMMAND:
+                length = 4 + data[ix + 2]
+            case BridgeOp.VIEW:
+                length = 3
+            case BridgeOp.LOAD:
+                length = 4 + data[ix + 3] + 1
+            case _:
+                length = 1
+        yield data[ix:ix + length]
+        ix += length
+
+
+def parse_rle(text):
+    # Reads a pattern in the usual Life RLE format, returning its width,
+    # height, and the set of (x, y) alive in it. Any state but `b` is alive.
+    lines = [line for line in text.splitlines() if not line.startswith("#")]
+    header = re.match(r"\s*x\s*=\s*(\d+)\s*,\s*y\s*=\s*(\d+)", lines[0])
+    if not header:
+        raise ValueError(f"bad RLE header: {lines[0]!r}")
+    width, height = int(header[1]), int(header[2])
+
+    alive = set()
+    x = y = 0
+    for count, tag in re.findall(r"(\d*)([^\d\s])", "".join(lines[1:])):
+        count = int(count or 1)
+        match tag:
+            case "!":
+                break
+            case "$":
+                x = 0
+                y += count
+            case "b" | ".":
+                x += count
+            case _:
+                alive.update((x + dx, y) for dx in range(count))
+                x += count
+    return width, height, alive
+
+
+def seed(pattern, width, height, *, x=None, y=None, word_width=16):
+    # Loads `pattern`, as returned by parse_rle, into an otherwise empty
+    # universe of `width` by `height`, centred unless placed at (`x`, `y`).
+    pattern_width, pattern_height, alive = pattern
+    if pattern_width > width or pattern_height > height:
+        raise ValueError(f"{pattern_width}x{pattern_height} pattern doesn't fit "
+                         f"in {width}x{height}")
+    if x is None:
+        x = (width - pattern_width) // 2
+    if y is None:
+        y = (height - pattern_height) // 2
+    cells = [False] * (width * height)
+    for px, py in alive:
+        cells[((y + py) % height) * width + (x + px) % width] = True
+    return host() + load(cells, word_width=word_width) + life()
+
+
+def send(fd, data):
+    # Writes `data` to the port a chunk at a time, waiting for each chunk's
+    # SYNC reply before the next.
+    for chunk in chunks(data):
+        os.write(fd, chunk)
+        while (reply := os.read(fd, 1)) != sync():
+            if not reply:
+                raise EOFError("port closed waiting for SYNC")
+
+
+def _read_stats(fd):
+    os.write(fd, stats())
+    reply = b""
+    while len(reply) < STATS_REPLY_LEN:
+        reply += os.read(fd, STATS_REPLY_LEN - len(reply))
+    return parse_stats(reply)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        epilog="Set the port up first, e.g. with `stty -F /dev/ttyUSB1 1000000 raw`.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    seed_parser = subparsers.add_parser(
+        "seed", help="seed Life with an RLE pattern",
+        description="LOADs are only taken once the frame being drawn is done, so "
+                    "each chunk's SYNC reply is waited for before the next.",
+    )
+    seed_parser.add_argument("port")
+    seed_parser.add_argument("rle", type=argparse.FileType("r"))
+    seed_parser.add_argument("--width", type=int, default=80)
+    seed_parser.add_argument("--height", type=int, default=60)
+    seed_parser.add_argument("--word-width", type=int, default=16)
+    seed_parser.add_argument("-x", type=int)
+    seed_parser.add_argument("-y", type=int)
+
+    stats_parser = subparsers.add_parser(
+        "stats", help="show the performance counters, per generation",
+    )
+    stats_parser.add_argument("port")
+    stats_parser.add_argument("--clk-freq", type=float, default=12e6)
+    stats_parser.add_argument("--interval", type=float, default=1.0)
+
+    view_parser = subparsers.add_parser(
+        "view", help="pan to show the universe from a cell column",
+    )
+    view_parser.add_argument("port")
+    view_parser.add_argument("x", type=int)
+
+    args = parser.parse_args()
+
+    match args.command:
+        case "seed":
+            data = seed(parse_rle(args.rle.read()), args.width, args.height,
+                        x=args.x, y=args.y, word_width=args.word_width)
+            fd = os.open(args.port, os.O_RDWR | os.O_NOCTTY)
+            send(fd, data)
+
+        case "view":
+            fd = os.open(args.port, os.O_WRONLY | os.O_NOCTTY)
+            os.write(fd, view(args.x))
+
+        case "stats":
+            fd = os.open(args.port, os.O_RDWR | os.O_NOCTTY)
+            last = _read_stats(fd)
+            print(last)
+            while True:
+                time.sleep(args.interval)
+                now = _read_stats(fd)
+                delta = {name: now[name] - last[name] for name in now}
+                gens = delta.pop("gens")
+                if gens:
+                    # Every cycle's counted in exactly one phase.
+                    cycles = sum(delta[name] for name in
+                                 ["init", "render", "evolve", "transition", "host",
+                                  "settled"])
+                    print(f"{gens * args.clk_freq / cycles:.1f} fps, per generation: " +
+                          ", ".join(f"{name} {value / gens:.0f}"
+                                    for name, value in delta.items()))
+                last = now
+
+
+if __name__ == "__main__":
+    main()
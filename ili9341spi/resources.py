@@ -0,0 +1,298 @@
+import argparse
+import json
+import math
+import os
+import sys
+
+from amaranth import Value
+from amaranth._toolchain.yosys import find_yosys
+from amaranth.back import rtlil
+from amaranth.vendor import LatticeECP5Platform, SiliconBluePlatform
+
+from . import ILI9341SPI
+from .rtl.initter import Initter
+from .rtl.lcd import Lcd
+
+__all__ = ["COMPONENTS", "netlist", "analyse", "report", "compare"]
+
+
+# Resource use and logic depth, per component and target, against a baseline
+# kept in resources.json:
+#
+#   python -m ili9341spi.resources [-b BOARD] [-c COMPONENT] [--update]
+#
+# The Yosys bundled with Amaranth can't map to a device, so this is all from
+# the generic gate-level netlist: `gates` are 1-bit logic cells before LUT
+# packing, `depth` is in gate levels, with carry chains, multipliers, shifters
+# and wide muxes weighted by their width, and `bram` is what the memories
+# would take in the device's block RAMs. None of it's what nextpnr will say,
+# but it moves when that would.
+
+COMPONENTS = {
+    "Lcd": lambda platform: Lcd(divisor=platform.lcd_divisor,
+                                read_divisor=platform.lcd_read_divisor, ddr=platform.lcd_ddr),
+    "Initter": lambda platform: Initter(),
+    "Top": lambda platform: ILI9341SPI.top(platform),
+}
+
+# Depth is compared with any growth flagged; everything else, past this.
+TOLERANCE = 0.05
+
+BRAM_SHAPES = {
+    # (depth, width) of each block's configurations.
+    SiliconBluePlatform: [(256, 16), (512, 8), (1024, 4), (2048, 2)],
+    LatticeECP5Platform: [(512, 36), (1024, 18), (2048, 9), (4096, 4), (8192, 2),
+                          (16384, 1)],
+}
+
+
+def netlist(design, platform):
+    # Elaborates `design` for `platform` and returns Yosys's flattened,
+    # gate-level netlist, as parsed JSON. Ports take their direction from
+    # what drives them: producers like Initter have their `lcd` interface
+    # the other way around, to be connected flipped. A design without any,
+    # like Top, is prepared as it'd be built, with the pins it requests and
+    # the device's I/O cells on them.
+    yosys = find_yosys(lambda version: version >= (0, 40))
+    if design.signature.members:
+        ports = [Value.cast(value) for _, _, value in design.signature.flatten(design)]
+        text = rtlil.convert(design, platform=platform, name="top", ports=ports)
+    else:
+        text = platform.prepare(design, name="top").files["top.il"]
+    return json.loads(yosys.run(["-q", "-"], "\n".join([
+        f"read_rtlil <<rtlil\n{text}\nrtlil",
+        "hierarchy -top top",
+        "proc",
+        "flatten",
+        "memory_collect",
+        "opt",
+        "wreduce",
+        "opt_clean",
+        "simplemap",
+        "opt",
+        "delete t:$scopeinfo",
+        "write_json",
+    ])))
+
+
+def _param(cell, name):
+    value = cell["parameters"].get(name, 0)
+    return int(value, 2) if isinstance(value, str) else value
+
+
+def _sequential(kind):
+    return kind.lstrip("$_").lower().startswith(("dff", "sdff", "adff", "aldff", "ff",
+                                                  "dlatch", "sr"))
+
+
+def _primitive(kind):
+    # Instances of the device's own cells, like SB_SPRAM256KA or EHXPLLL.
+    return not kind.startswith("$")
+
+
+def _levels(cell):
+    kind = cell["type"]
+    if kind.startswith("$_"):
+        return 1
+    a, b = _param(cell, "A_WIDTH"), _param(cell, "B_WIDTH")
+    match kind:
+        case "$add" | "$sub" | "$neg" | "$lt" | "$le" | "$gt" | "$ge" | "$alu" | "$lcu":
+            return max(a, b, 1)
+        case "$mul" | "$div" | "$mod" | "$divfloor" | "$modfloor":
+            return a + b
+        case "$shl" | "$shr" | "$sshl" | "$sshr" | "$shift" | "$shiftx":
+            return b + 1
+        case "$pmux":
+            return math.ceil(math.log2(_param(cell, "S_WIDTH") + 1)) + 1
+        case "$bmux":
+            return _param(cell, "S_WIDTH")
+        case _:
+            return 1
+
+
+def _bram(memories, platform):
+    # Blocks for each memory asked to be in block RAM, or too big to be worth
+    # doing in logic; the smallest, like FIFOs', end up in flops.
+    for family, shapes in BRAM_SHAPES.items():
+        if isinstance(platform, family):
+            block_bits = shapes[0][0] * shapes[0][1]
+            return sum(
+                min(math.ceil(size / depth) * math.ceil(width / block_width)
+                    for depth, block_width in shapes)
+                for size, width, block in memories
+                if block or size * width * 4 >= block_bits
+            )
+    return 0
+
+
+def analyse(netlist, platform):
+    # Counts what's in `netlist` and finds its longest combinational path,
+    # from any port, flop, memory or primitive to any other.
+    cells = netlist["modules"]["top"]["cells"]
+
+    # The device's own cells, like SB_IO or EHXPLLL, come without port
+    # directions; they start and end paths anyway, so what they drive needn't
+    # be known.
+    drivers = {}
+    for name, cell in cells.items():
+        for port, direction in cell.get("port_directions", {}).items():
+            if direction == "output":
+                for bit in cell["connections"][port]:
+                    drivers[bit] = name
+
+    def combinational(name):
+        kind = cells[name]["type"]
+        return not (_sequential(kind) or _primitive(kind) or kind.startswith("$mem"))
+
+    def fanin(name):
+        cell = cells[name]
+        return {
+            drivers[bit]
+            for port, direction in cell["port_directions"].items() if direction == "input"
+            for bit in cell["connections"][port]
+            if bit in drivers and combinational(drivers[bit])
+        }
+
+    depths = {}
+    for root in cells:
+        if root in depths or not combinational(root):
+            continue
+        stack = [root]
+        entered = set()
+        while stack:
+            name = stack[-1]
+            if name in depths:
+                stack.pop()
+                continue
+            pending = [driver for driver in fanin(name) if driver not in depths]
+            if pending and name not in entered:
+                # A combinational loop leaves a driver pending the second time
+                # round; it's counted from zero.
+                entered.add(name)
+                stack.extend(pending)
+                continue
+            stack.pop()
+            depths[name] = _levels(cells[name]) + max(
+                (depths.get(driver, 0) for driver in fanin(name)), default=0)
+
+    result = {"cells": len(cells), "gates": 0, "ffs": 0, "memory_bits": 0, "bram": 0,
+              "depth": 0, "depth_at": None, "depth_path": [], "coarse": {}, "primitives": {}}
+    memories = []
+    for name, cell in cells.items():
+        kind = cell["type"]
+        if _sequential(kind):
+            result["ffs"] += len(cell["connections"]["Q"])
+        elif kind.startswith("$mem"):
+            block = "block" in (cell["attributes"].get("rom_style"),
+                                cell["attributes"].get("ram_style"))
+            memories.append((_param(cell, "SIZE"), _param(cell, "WIDTH"), block))
+        elif _primitive(kind):
+            result["primitives"][kind] = result["primitives"].get(kind, 0) + 1
+        elif kind.startswith("$_"):
+            result["gates"] += 1
+        else:
+            result["coarse"][kind] = result["coarse"].get(kind, 0) + 1
+    result["memory_bits"] = sum(size * width for size, width, _ in memories)
+    result["bram"] = _bram(memories, platform)
+
+    if depths:
+        # Back along the longest path from its end, for where it went through;
+        # proc's muxes don't know where they're from, so they're skipped.
+        name = max(depths, key=depths.get)
+        result["depth"] = depths[name]
+        path = []
+        seen = set()
+        while name is not None and name not in seen:
+            seen.add(name)
+            src = cells[name]["attributes"].get("src", "").split("|")[0]
+            if src and os.path.basename(src) not in path:
+                path.append(os.path.basename(src))
+            name = max(fanin(name), key=depths.get, default=None)
+        result["depth_at"] = path[0] if path else None
+        result["depth_path"] = path
+    return result
+
+
+def report(targets, components):
+    # {target: {component: analysis}}
+    results = {}
+    for target in targets:
+        results[target.__name__] = {}
+        for name in components:
+            platform = target()
+            results[target.__name__][name] = analyse(
+                netlist(COMPONENTS[name](platform), platform), platform)
+    return results
+
+
+def compare(results, baseline, *, tolerance=TOLERANCE):
+    # Lines describing each change from `baseline`, and whether any of them
+    # is growth worth failing over.
+    lines = []
+    grown = False
+    for target, components in results.items():
+        for component, now in components.items():
+            was = baseline.get(target, {}).get(component)
+            if was is None:
+                lines.append(f"{target} {component}: not in baseline")
+                continue
+            for metric in ["cells", "gates", "ffs", "bram", "depth"]:
+                if now[metric] == was[metric]:
+                    continue
+                change = (now[metric] - was[metric]) / max(was[metric], 1)
+                worse = now[metric] > was[metric] and (metric == "depth" or change > tolerance)
+                grown |= worse
+                lines.append(f"{target} {component} {metric}: {was[metric]} -> {now[metric]} "
+                             f"({change:+.1%}){' !' if worse else ''}")
+            if now["depth_at"] != was["depth_at"]:
+                lines.append(f"{target} {component} deepest at {now['depth_at']}")
+    return lines, grown
+
+
+def main():
+    np = ILI9341SPI()
+    parser = argparse.ArgumentParser(
+        description="Report resource use and logic depth, and compare with the baseline.",
+    )
+    parser.add_argument("-b", "--board", action="append",
+                        choices=[target.__name__ for target in np.targets])
+    parser.add_argument("-c", "--component", action="append", choices=list(COMPONENTS))
+    parser.add_argument("--baseline", default=np.path("resources.json"))
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="fractional growth allowed before failing, but for depth")
+    parser.add_argument("--update", action="store_true",
+                        help="write the results into the baseline")
+    args = parser.parse_args()
+
+    targets = [np.target_by_name(board).__class__ for board in args.board] \
+        if args.board else np.targets
+    results = report(targets, args.component or list(COMPONENTS))
+
+    for target, components in results.items():
+        for component, r in components.items():
+            print(f"{target} {component}: {r['cells']} cells, {r['gates']} gates, "
+                  f"{r['ffs']} FFs, {r['bram']} BRAM ({r['memory_bits']} bits), "
+                  f"depth {r['depth']} at {r['depth_at']}")
+
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        baseline = {}
+
+    if args.update:
+        for target, components in results.items():
+            baseline.setdefault(target, {}).update(components)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        return
+
+    lines, grown = compare(results, baseline, tolerance=args.tolerance)
+    for line in lines:
+        print(line)
+    sys.exit(1 if grown else 0)
+
+
+if __name__ == "__main__":
+    main()
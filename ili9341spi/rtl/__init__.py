@@ -1,16 +1,21 @@
-from amaranth import ClockSignal, Module, Mux, Signal
+from amaranth import Cat, ClockDomain, ClockSignal, Module, Mux, ResetSignal, Signal
 from amaranth.build import Attrs, Pins, PinsN, Resource, Subsignal
-from amaranth.lib import wiring
-from amaranth.lib.cdc import FFSynchronizer
-from amaranth.lib.memory import Memory
+from amaranth.lib import io, wiring
+from amaranth.lib.cdc import FFSynchronizer, ResetSynchronizer
 from amaranth.lib.wiring import In, Out
 from amaranth_stdio.serial import AsyncSerial
 
 from ..targets import cxxrtl, icebreaker, ulx3s
 from . import streamext as _
+from .arbiter import Arbiter
+from .bridge import Bridge
 from .initter import Initter
 from .lcd import Lcd
-from .proto import LcdCommand
+from .life import Life
+from .pll import Pll
+from .proto import Stats
+from .render import Render
+from .spram import Spram
 
 __all__ = ["Top"]
 
@@ -26,268 +31,305 @@ icebreaker_spi_lcd = Resource("spi_lcd", 0,
 
 
 class Top(wiring.Component):
-    def __init__(self, platform):
+    LCD_WIDTH = 320
+    LCD_HEIGHT = 240
+
+    def __init__(self, platform, *, cell_size=4, grid_width=None, grid_height=None,
+                 settle_period=2, frame_gens=1):
+        # Life's played on a `grid_width` by `grid_height` universe of cells
+        # `cell_size` pixels square, by default just what fits on the panel.
+        # A wider one is panned across by the host with VIEW; the panel only
+        # scrolls the one way, so it can't be any taller.
+        #
+        # Once it's settled into still lifes and oscillators of no more than
+        # `settle_period` generations, Life's left be and the panel shows
+        # the last one drawn, until the host takes over. 0 never settles.
+        #
+        # Each frame drawn is `frame_gens` generations on from the last. With
+        # 0, Life evolves continuously, and whatever's newest is drawn each
+        # time the panel's free; that takes a third bank, so not in SPRAM.
+        panel_width = self.LCD_WIDTH // cell_size
+        panel_height = self.LCD_HEIGHT // cell_size
+        grid_width = grid_width or panel_width
+        grid_height = grid_height or panel_height
+        if grid_height != panel_height:
+            raise ValueError(f"grid height {grid_height} isn't the panel's {panel_height}")
+        if grid_width < panel_width:
+            raise ValueError(f"grid width {grid_width} is less than the panel's {panel_width}")
+        if frame_gens < 0:
+            raise ValueError(f"frame_gens must be 0 or more, not {frame_gens}")
+        self._cell_size = cell_size
+        self._grid_width = grid_width
+        self._settle_period = settle_period
+        self._frame_gens = frame_gens
+
         if isinstance(platform, cxxrtl):
             super().__init__({
                 "lcd": Out(Lcd.PinSignature),
                 "lcd_res": Out(1),
+                "spi_clk": In(1),
                 "uart_rx": In(1),
                 "uart_tx": Out(1),
             })
         else:
             super().__init__({})
 
+        # Cycles between the starts of the last two frames sent to the LCD.
+        self.frame_cycles = Signal(32)
+        # The counters as they were when the last frame started, as read by
+        # the host with STATS.
+        self.stats = Signal(Stats)
+
     def elaborate(self, platform):
         m = Module()
 
         m.submodules.serial = serial = AsyncSerial(
-            divisor=int(platform.default_clk_frequency // 115_200)
+            divisor=int(platform.default_clk_frequency // platform.uart_baud)
         )
 
         res = Signal(init=0)
         blk = Signal(init=1)
 
-        ili = wiring.flipped(Lcd.PinSignature.create())
-
-        m.submodules.lcd = lcd = Lcd()
+        # The panel link runs in its own domain, as fast as the panel will go,
+        # and everything else at whatever meets timing.
+        match platform:
+            case cxxrtl():
+                m.domains.spi = cd_spi = ClockDomain("spi")
+                m.d.comb += cd_spi.clk.eq(self.spi_clk)
+                m.submodules.spi_rst = ResetSynchronizer(ResetSignal("sync"), domain="spi")
+            case _:
+                m.submodules.pll = Pll(domain="spi", frequency=platform.lcd_clk_frequency)
+
+        m.submodules.lcd = lcd = Lcd(divisor=platform.lcd_divisor,
+                                     read_divisor=platform.lcd_read_divisor,
+                                     ddr=platform.lcd_ddr, domain="spi")
+        ili = wiring.flipped(lcd.pin.signature.create())
         wiring.connect(m, lcd.pin, ili)
 
-        with lcd.cmd.resp.Recv(m) as payload:
-            m.d.comb += [
-                serial.tx.data.eq(payload),
-                serial.tx.ack.eq(1),
-            ]
-
-        m.submodules.initter = initter = Initter()
-
-        LCD_WIDTH = 320
-        LCD_HEIGHT = 240
-        GOL_SIZE = 4
+        LCD_WIDTH = self.LCD_WIDTH
+        LCD_HEIGHT = self.LCD_HEIGHT
+        GOL_SIZE = self._cell_size
         GOL_WIDTH = LCD_WIDTH // GOL_SIZE
         GOL_HEIGHT = LCD_HEIGHT // GOL_SIZE
-        GOL_CELLCNT = GOL_WIDTH * GOL_HEIGHT
-
-        start = """
-................................................................................
-................................................................................
-..........................#.....................................................
-........................#.#.....................................................
-..............##......##............##..........................................
-.............#...#....##............##..........................................
-..##........#.....#...##........................................................
-..##........#...#.##....#.#.....................................................
-............#.....#.......#.....................................................
-.............#...#..............................................................
-..............##................................................................
-................................................................................
-................................................................................
-""".strip().replace(
-            "\n", ""
-        )
+        GOL_WORD = 16
+        UNI_WIDTH = self._grid_width
 
-        m.submodules.now_cells = now_cells = \
-            Memory(shape=1, depth=GOL_CELLCNT, init=[c != "." for c in start])
-        now_cells_rd = now_cells.read_port()
-        now_cells_wr = now_cells.write_port()
-        now_cells_addr = Signal.like(now_cells_rd.addr)
+        m.submodules.bridge = bridge = Bridge(word_width=GOL_WORD)
         m.d.comb += [
-            now_cells_rd.addr.eq(now_cells_addr),
-            now_cells_wr.addr.eq(now_cells_addr),
+            bridge.rx.payload.eq(serial.rx.data),
+            bridge.rx.valid.eq(serial.rx.rdy),
+            serial.rx.ack.eq(bridge.rx.ready),
         ]
-        m.d.sync += now_cells_wr.en.eq(0)
 
-        m.submodules.next_cells = next_cells = Memory(shape=1, depth=GOL_CELLCNT, init=[])
-        next_cells_rd = next_cells.read_port()
-        next_cells_wr = next_cells.write_port()
-        next_cells_addr = Signal.like(next_cells_rd.addr)
-        m.d.comb += [
-            next_cells_rd.addr.eq(next_cells_addr),
-            next_cells_wr.addr.eq(next_cells_addr),
-        ]
-        m.d.sync += next_cells_wr.en.eq(0)
-
-        col = Signal(range(LCD_WIDTH))
-        pag = Signal(range(LCD_HEIGHT))
-
-        # To avoid nonsense, we define the 'real' range of x as [1..GOL_WIDTH]
-        # and y as [1..GOL_HEIGHT], and define our UInts up to GOL_WIDTH+1 and
-        # GOL_HEIGHT+1 inclusive. This way we can detect wraps without having to
-        # reach for signed integers.
-        def cell_ix_at(x, y):
-            eff_x = Signal(range(GOL_CELLCNT))
-            with m.If(x == 0):
-                m.d.comb += eff_x.eq(GOL_WIDTH - 1)
-            with m.Elif(x == (GOL_WIDTH + 1)):
-                m.d.comb += eff_x.eq(0)
-            with m.Else():
-                m.d.comb += eff_x.eq(x - 1)
-            eff_y = Signal(range(GOL_CELLCNT))
-            with m.If(y == 0):
-                m.d.comb += eff_y.eq(GOL_HEIGHT - 1)
-            with m.Elif(y == (GOL_HEIGHT + 1)):
-                m.d.comb += eff_y.eq(0)
-            with m.Else():
-                m.d.comb += eff_y.eq(y - 1)
-            out = Signal(range(GOL_CELLCNT))
-            m.d.comb += out.eq(eff_x + (eff_y * GOL_WIDTH))
-            return out
-
-        cell_x = col // GOL_SIZE + 1
-        cell_y = pag // GOL_SIZE + 1
-
-        direct_cell_ix = Signal(range(GOL_CELLCNT))
-        m.d.comb += direct_cell_ix.eq(cell_ix_at(col + 1, pag + 1))
-
-        pl_ix = Signal(range(8 + 1))
-        was_alive = Signal()
-        neighbours_alive = Signal(8)
-
-        req = Signal(Lcd.Request)
-
-        with m.FSM():
+        # The bridge's replies go out ahead of any responses from the panel.
+        with m.If(bridge.tx.valid):
+            m.d.comb += [
+                serial.tx.data.eq(bridge.tx.payload),
+                serial.tx.ack.eq(1),
+                bridge.tx.ready.eq(serial.tx.rdy),
+            ]
+        with m.Else():
+            m.d.comb += [
+                serial.tx.data.eq(bridge.lcd.resp.payload),
+                serial.tx.ack.eq(bridge.lcd.resp.valid),
+                bridge.lcd.resp.ready.eq(serial.tx.rdy),
+            ]
+
+        m.submodules.initter = initter = Initter()
+
+        # On the UP5K, bitplanes go in SPRAM, leaving the block RAM be, unless
+        # there's to be a third.
+        banks = 2 if self._frame_gens else 3
+        m.submodules.life = life = Life(width=UNI_WIDTH, height=GOL_HEIGHT, word_width=GOL_WORD,
+                                        init=Life.start_cells(UNI_WIDTH, GOL_HEIGHT),
+                                        spram=Spram.available(platform) and banks == 2,
+                                        periods=self._settle_period, banks=banks)
+
+        m.submodules.render = render = Render(width=LCD_WIDTH, height=LCD_HEIGHT,
+                                              cell_size=GOL_SIZE, word_width=GOL_WORD,
+                                              universe_width=UNI_WIDTH)
+        if UNI_WIDTH > GOL_WIDTH:
+            max_view = UNI_WIDTH - GOL_WIDTH
+            m.d.comb += render.view.eq(Mux(bridge.view > max_view, max_view, bridge.view))
+        wiring.connect(m, life.cells, render.cells)
+        wiring.connect(m, life.damage, render.damage)
+
+        # The panel's brought up before anyone else gets a word in. The host's
+        # commands can go in between the renderer's rows, and responses to
+        # them go back over the UART (above).
+        m.submodules.arbiter = arbiter = Arbiter(n=3)
+        wiring.connect(m, wiring.flipped(initter.lcd), arbiter.clients[0])
+        wiring.connect(m, wiring.flipped(bridge.lcd), arbiter.clients[1])
+        wiring.connect(m, wiring.flipped(render.lcd), arbiter.clients[2])
+        wiring.connect(m, wiring.flipped(arbiter.lcd), lcd.cmd)
+
+        frame_timer = Signal.like(self.frame_cycles)
+        m.d.sync += frame_timer.eq(frame_timer + 1)
+
+        counters = Signal(Stats)
+        m.d.comb += bridge.stats.eq(self.stats)
+
+        # Each generation is evolved while the one before it is rendered, and
+        # swapped in once both are done. Only what changed between them is
+        # redrawn, unless the host's had the panel in the meantime.
+        #
+        # The host can also load cells while it has the panel, so the next
+        # generation's evolved afresh once it hands back.
+        #
+        # Once Life's settled, nothing's evolved or drawn again but to pan.
+        #
+        # With more than one generation to a frame, the rest are evolved and
+        # swapped in after it's drawn, each skipped over so its damage carries
+        # into the next's. Evolving continuously, they're swapped in as they
+        # come, and the newest one's shown when the panel's free, if it's
+        # `fresh`.
+        redraw = Signal()
+        settled_view = Signal.like(bridge.view)
+        skips = Signal(range(max(self._frame_gens, 1)))
+        unshown = skips != max(self._frame_gens - 1, 0)
+        fresh = Signal()
+
+        with m.FSM() as fsm:
             with m.State("init"):
-                wiring.connect(m, wiring.flipped(initter.lcd), lcd.cmd)
                 m.d.comb += res.eq(initter.res)
-                with m.If(initter.done):
-                    m.next = "initiate"
-
-            with m.State("initiate"):
-                m.d.comb += [
-                    req.data.eq(LcdCommand.MEMORY_WRITE),
-                    req.dc.eq(1),
-                ]
-                with lcd.cmd.req.Send(m, req):
-                    m.next = "load"
+                with m.If(initter.done & ~life.busy):
+                    m.d.comb += life.step.eq(1)
+                    m.d.sync += fresh.eq(1)
+                    m.next = "render"
 
-            ## render
+            with m.State("render"):
+                with m.If(bridge.host):
+                    m.next = "host"
+                # Every frame's new, a generation at a time.
+                with m.Elif(fresh | (self._frame_gens != 0)):
+                    m.d.comb += [
+                        render.start.eq(1),
+                        render.full.eq(redraw),
+                        life.show.eq(1),
+                    ]
+                    m.d.sync += [
+                        redraw.eq(0),
+                        skips.eq(max(self._frame_gens - 1, 0)),
+                        self.frame_cycles.eq(frame_timer + 1),
+                        frame_timer.eq(0),
+                        self.stats.eq(counters),
+                    ]
+                    m.next = "render_wait"
+                with m.Elif(~life.busy & (life.period != 0)):
+                    m.d.sync += settled_view.eq(bridge.view)
+                    m.next = "settled"
+
+            with m.State("render_wait"):
+                with m.If(~render.busy):
+                    m.next = "evolve_wait" if self._frame_gens else "render"
 
-            with m.State("load"):
-                m.d.sync += now_cells_addr.eq(cell_ix_at(cell_x, cell_y))
-                m.next = "load_wait"
+            with m.State("evolve_wait"):
+                with m.If(~life.busy & (life.period != 0) & unshown):
+                    # Settled on one that's not been drawn yet.
+                    m.next = "render"
+                with m.Elif(~life.busy & (life.period != 0)):
+                    m.d.sync += settled_view.eq(bridge.view)
+                    m.next = "settled"
+                with m.Elif(~life.busy):
+                    m.d.comb += [
+                        life.swap.eq(1),
+                        life.step.eq(1),
+                    ]
+                    m.d.sync += counters.gens.eq(counters.gens + 1)
+                    with m.If(skips != 0):
+                        m.d.comb += life.skip.eq(1)
+                        m.d.sync += skips.eq(skips - 1)
+                    with m.Else():
+                        m.next = "render"
 
-            with m.State("load_wait"):
-                m.next = "render"
+            with m.State("settled"):
+                with m.If(bridge.host | (bridge.view != settled_view)):
+                    m.d.sync += fresh.eq(1)
+                    m.next = "render"
 
-            with m.State("render"):
+            with m.State("host"):
                 m.d.comb += [
-                    req.data.eq(Mux(now_cells_rd.data, 0xff, 0x00)),
-                    req.dc.eq(0),
+                    life.load.payload.addr.eq(bridge.load.payload.addr),
+                    life.load.payload.data.eq(bridge.load.payload.data),
+                    life.load.valid.eq(bridge.load.valid),
+                    bridge.load.ready.eq(life.load.ready),
                 ]
-                with lcd.cmd.req.Send(m, req):
-                    m.next = "render2"
-
-            with m.State("render2"):
+                with m.If(~bridge.host):
+                    m.d.sync += [
+                        redraw.eq(1),
+                        fresh.eq(1),
+                    ]
+                    m.next = "reseed"
+
+            with m.State("reseed"):
+                with m.If(~life.busy):
+                    m.d.comb += life.step.eq(1)
+                    m.next = "render"
+
+        if not self._frame_gens:
+            drawing = fsm.ongoing("render") | fsm.ongoing("render_wait")
+            with m.If(drawing & ~life.busy & (life.period == 0)):
                 m.d.comb += [
-                    req.data.eq(Mux(now_cells_rd.data, 0xff, 0x00)),
-                    req.dc.eq(0),
-                ]
-                with lcd.cmd.req.Send(m, req):
-                    m.next = "load"
-
-                    with m.If(col == LCD_WIDTH - 1):
-                        m.d.sync += col.eq(0)
-                        with m.If(pag == LCD_HEIGHT - 1):
-                            m.d.sync += pag.eq(0)
-                            m.next = "evolve_start"
-                        with m.Else():
-                            m.d.sync += pag.eq(pag + 1)
-                    with m.Else():
-                        m.d.sync += col.eq(col + 1)
-   
-            ## evolve
-
-            with m.State("evolve_start"):
-                m.d.sync += [
-                    pl_ix.eq(0),
-                    neighbours_alive.eq(0),
-                ]
-                m.next = "evolve_load"
-
-            with m.State("evolve_load"):
-                with m.Switch(pl_ix):
-                    with m.Case(0): m.d.sync += now_cells_addr.eq(cell_ix_at(col + 0, pag + 0))
-                    with m.Case(1): m.d.sync += now_cells_addr.eq(cell_ix_at(col + 1, pag + 0))
-                    with m.Case(2): m.d.sync += now_cells_addr.eq(cell_ix_at(col + 2, pag + 0))
-                    with m.Case(3): m.d.sync += now_cells_addr.eq(cell_ix_at(col + 0, pag + 1))
-                    with m.Case(4): m.d.sync += now_cells_addr.eq(cell_ix_at(col + 1, pag + 1))
-                    with m.Case(5): m.d.sync += now_cells_addr.eq(cell_ix_at(col + 2, pag + 1))
-                    with m.Case(6): m.d.sync += now_cells_addr.eq(cell_ix_at(col + 0, pag + 2))
-                    with m.Case(7): m.d.sync += now_cells_addr.eq(cell_ix_at(col + 1, pag + 2))
-                    with m.Case(8): m.d.sync += now_cells_addr.eq(cell_ix_at(col + 2, pag + 2))
-                m.next = "evolve_wait"
-
-            with m.State("evolve_wait"):
-                m.next = "evolve_part"
-
-            with m.State("evolve_part"):
-                with m.If(pl_ix == 4):
-                    m.d.sync += was_alive.eq(now_cells_rd.data)
-                with m.Else():
-                    m.d.sync += neighbours_alive.eq(neighbours_alive + now_cells_rd.data)
-
-                with m.If(pl_ix != 8):
-                    m.d.sync += pl_ix.eq(pl_ix + 1)
-                    m.next = "evolve_load"
-                with m.Else():
-                    m.next = "evolve_write"
-
-            with m.State("evolve_write"):
-                m.d.sync += [
-                    next_cells_addr.eq(direct_cell_ix),
-                    next_cells_wr.en.eq(1),
+                    life.swap.eq(1),
+                    life.step.eq(1),
+                    life.skip.eq(~life.show),
                 ]
-
-                with m.If(was_alive):
-                    m.d.sync += next_cells_wr.data.eq((neighbours_alive == 2) | (neighbours_alive == 3))
-                with m.Else():
-                    m.d.sync += next_cells_wr.data.eq(neighbours_alive == 3)
-
-                m.next = "evolve_start"
-                m.d.sync += col.eq(col + 1)
-                with m.If(col == (GOL_WIDTH - 1)):
-                    m.d.sync += col.eq(0)
-                    m.d.sync += pag.eq(pag + 1)
-                    with m.If(pag == (GOL_HEIGHT - 1)):
-                        m.d.sync += pag.eq(0)
-                        m.next = "transition_load"
-
-            ## transition
-
-            with m.State("transition_load"):
-                m.d.sync += next_cells_addr.eq(direct_cell_ix)
-                m.next = "transition_wait"
-
-            with m.State("transition_wait"):
-                m.next = "transition_write"
-
-            with m.State("transition_write"):
-                m.d.sync += [
-                    now_cells_addr.eq(direct_cell_ix),
-                    now_cells_wr.en.eq(1),
-                    now_cells_wr.data.eq(next_cells_rd.data),
-                ]
-
-                m.next = "transition_load"
-                m.d.sync += col.eq(col + 1)
-                with m.If(col == (GOL_WIDTH - 1)):
-                    m.d.sync += col.eq(0)
-                    m.d.sync += pag.eq(pag + 1)
-                    with m.If(pag == (GOL_HEIGHT - 1)):
-                        m.d.sync += pag.eq(0)
-                        m.next = "initiate"
+                m.d.sync += counters.gens.eq(counters.gens + 1)
+        with m.If(life.show):
+            m.d.sync += fresh.eq(0)
+        with m.Elif(life.swap):
+            m.d.sync += fresh.eq(1)
+
+        for counter, states in [
+            (counters.init, ["init"]),
+            (counters.render, ["render_wait"]),
+            (counters.evolve, ["evolve_wait"]),
+            (counters.transition, ["render", "reseed"]),
+            (counters.host, ["host"]),
+            (counters.settled, ["settled"]),
+        ]:
+            with m.If(Cat(fsm.ongoing(state) for state in states).any()):
+                m.d.sync += counter.eq(counter + 1)
+        with m.If(lcd.cmd.req.valid & lcd.cmd.req.ready):
+            m.d.sync += counters.lcd_bytes.eq(counters.lcd_bytes + 1)
+        # Counted in sync cycles, like everything else.
+        lcd_idle = Signal()
+        m.submodules.lcd_idle = FFSynchronizer(lcd.idle, lcd_idle, o_domain="sync")
+        with m.If(lcd_idle):
+            m.d.sync += counters.spi_idle.eq(counters.spi_idle + 1)
 
         match platform:
             case icebreaker():
                 platform.add_resources([icebreaker_spi_lcd])
-                plat_spi = platform.request("spi_lcd")
-                m.d.comb += [
-                    plat_spi.clk.o.eq(ili.clk),
-                    plat_spi.copi.o.eq(ili.copi),
-                    plat_spi.dc.o.eq(ili.dc),
-                    plat_spi.res.o.eq(res),
-                    plat_spi.blk.o.eq(blk),
-                    ili.cipo.eq(plat_spi.cipo.i),
-                ]
+                if platform.lcd_ddr:
+                    plat_spi = platform.request("spi_lcd", dir={
+                        "clk": "-", "copi": "-", "dc": "-", "cipo": "-",
+                    })
+                    m.submodules.spi_clk = spi_clk = io.DDRBuffer("o", plat_spi.clk,
+                                                                  o_domain="spi")
+                    m.submodules.spi_copi = spi_copi = io.FFBuffer("o", plat_spi.copi,
+                                                                   o_domain="spi")
+                    m.submodules.spi_dc = spi_dc = io.FFBuffer("o", plat_spi.dc, o_domain="spi")
+                    m.submodules.spi_cipo = spi_cipo = io.FFBuffer("i", plat_spi.cipo,
+                                                                   i_domain="spi")
+                    m.d.comb += [
+                        spi_clk.o.eq(ili.clk),
+                        spi_copi.o.eq(ili.copi),
+                        spi_dc.o.eq(ili.dc),
+                        plat_spi.res.o.eq(res),
+                        plat_spi.blk.o.eq(blk),
+                        ili.cipo.eq(spi_cipo.i),
+                    ]
+                else:
+                    plat_spi = platform.request("spi_lcd")
+                    m.d.comb += [
+                        plat_spi.clk.o.eq(ili.clk),
+                        plat_spi.copi.o.eq(ili.copi),
+                        plat_spi.dc.o.eq(ili.dc),
+                        plat_spi.res.o.eq(res),
+                        plat_spi.blk.o.eq(blk),
+                        ili.cipo.eq(plat_spi.cipo.i),
+                    ]
 
                 platform.add_resources([Resource("pmod_clk_out", 0,
                     Subsignal("clk", Pins("1", dir="o", conn=("pmod", 0)), Attrs(IO_STANDARD="SB_LVCMOS")),
@@ -0,0 +1,80 @@
+from amaranth import Cat, Module, Signal
+from amaranth.lib import wiring
+from amaranth.lib.wiring import Out
+
+from .lcd import Lcd
+
+__all__ = ["Arbiter"]
+
+
+class Arbiter(wiring.Component):
+    POLICIES = ("priority", "round_robin")
+
+    def __init__(self, *, n, policy="priority"):
+        # Shares one Lcd between `n` producers, each connected to one of
+        # `clients` as it would be to Lcd.cmd. The client granted keeps the
+        # channel for as long as it has a request waiting or holds `lock`, and
+        # until it's read every response it asked for, so a transaction's
+        # never interleaved with another's.
+        #
+        # With "priority", the lowest-numbered client waiting goes next; with
+        # "round_robin", the first waiting after the last one granted.
+        if policy not in Arbiter.POLICIES:
+            raise ValueError(f"policy must be one of {Arbiter.POLICIES}, not {policy!r}")
+        self._n = n
+        self._policy = policy
+
+        super().__init__({
+            "clients": Out(Lcd.CmdSignature).array(n),
+            "lcd": Out(Lcd.CmdSignature),
+        })
+
+    def elaborate(self, platform):
+        m = Module()
+
+        grant = Signal(range(self._n))
+        granted = Signal()
+
+        # Responses still to come back to the client granted.
+        pending = Signal(8)
+        asked = Signal.like(pending)
+        read = Signal()
+        with m.If(self.lcd.req.valid & self.lcd.req.ready):
+            m.d.comb += asked.eq(self.lcd.req.payload.resp_len)
+        m.d.comb += read.eq(self.lcd.resp.valid & self.lcd.resp.ready)
+        m.d.sync += pending.eq(pending + asked - read)
+
+        with m.Switch(grant):
+            for ix, client in enumerate(self.clients):
+                with m.Case(ix):
+                    with m.If(granted):
+                        m.d.comb += [
+                            self.lcd.req.payload.eq(client.req.payload),
+                            self.lcd.req.valid.eq(client.req.valid),
+                            client.req.ready.eq(self.lcd.req.ready),
+                            client.resp.payload.eq(self.lcd.resp.payload),
+                            client.resp.valid.eq(self.lcd.resp.valid),
+                            self.lcd.resp.ready.eq(client.resp.ready),
+                            self.lcd.lock.eq(client.lock),
+                        ]
+
+        waiting = Signal(self._n)
+        m.d.comb += waiting.eq(Cat(client.req.valid | client.lock for client in self.clients))
+
+        def choose(order):
+            # The first waiting in `order` wins, or none.
+            m.d.sync += granted.eq(waiting.any())
+            for ix in reversed(order):
+                with m.If(waiting[ix]):
+                    m.d.sync += grant.eq(ix)
+
+        with m.If(~granted | ~(self.lcd.req.valid | self.lcd.lock | (pending != 0))):
+            if self._policy == "priority":
+                choose(range(self._n))
+            else:
+                with m.Switch(grant):
+                    for last in range(self._n):
+                        with m.Case(last):
+                            choose([(last + 1 + k) % self._n for k in range(self._n)])
+
+        return m
@@ -0,0 +1,311 @@
+from amaranth import Cat, Module, Mux, Signal
+from amaranth.lib import data, stream, wiring
+from amaranth.lib.fifo import SyncFIFOBuffered
+from amaranth.lib.wiring import In, Out
+
+from .lcd import Lcd
+from .proto import BridgeOp, LcdCommand, Stats
+
+__all__ = ["Bridge"]
+
+
+class Bridge(wiring.Component):
+    def __init__(self, *, rx_depth=256, word_width=8):
+        # Decodes BridgeOps received from the host into requests for the
+        # panel. What's received is queued while the panel catches up; the
+        # host mustn't get more than `rx_depth` bytes ahead of its last SYNC
+        # reply, since the UART has no flow control of its own.
+        #
+        # LOADs carry cells eight to a byte, in order, and are written to Life
+        # a word of `word_width` at a time; each must be a whole number of
+        # words. They're only taken while the host has the panel.
+        if word_width % 8:
+            raise ValueError(f"word width {word_width} isn't a whole number of bytes")
+
+        self._rx_depth = rx_depth
+        self._word_width = word_width
+        super().__init__({
+            "rx": In(stream.Signature(8)),
+            "tx": Out(stream.Signature(8)),
+            "lcd": Out(Lcd.CmdSignature),
+            "load": Out(stream.Signature(data.StructLayout({
+                "addr": 16,
+                "data": word_width,
+            }))),
+            "host": Out(1),
+            "view": Out(16),
+            "stats": In(Stats),
+        })
+
+    def elaborate(self, platform):
+        m = Module()
+
+        m.submodules.rx_fifo = rx_fifo = SyncFIFOBuffered(width=8, depth=self._rx_depth)
+        m.d.comb += [
+            rx_fifo.w_data.eq(self.rx.payload),
+            rx_fifo.w_en.eq(self.rx.valid),
+            self.rx.ready.eq(rx_fifo.w_rdy),
+        ]
+        rx = rx_fifo.r_stream
+
+        req = Signal(Lcd.Request)
+
+        # Bytes left to pass through or load, or pixels left to fill.
+        count = Signal(range(2 * 256 + 1))
+        cmd = Signal(8)
+        resp_len = Signal.like(req.resp_len)
+        colour = Signal(16)
+        colour_lo = Signal()
+
+        # Each counter goes out big-endian, in the order they're declared.
+        STATS_BYTES = Stats.as_shape().size // 8
+        stats_sr = Signal(Stats.as_shape().size)
+        stats_bytes = [
+            self.stats.as_value()[ix * 32 + shift:ix * 32 + shift + 8]
+            for ix in range(STATS_BYTES // 4)
+            for shift in (24, 16, 8, 0)
+        ]
+
+        # The view changes all at once.
+        view = Signal(16)
+
+        WORD_BYTES = self._word_width // 8
+        load = Signal(self.load.payload.shape())
+        load_byte = Signal(range(WORD_BYTES))
+
+        def forward(then):
+            # Pass `count` bytes straight through as parameters, the last
+            # carrying `resp_len`.
+            m.d.comb += [
+                req.data.eq(rx.payload),
+                req.dc.eq(0),
+                req.resp_len.eq(Mux(count == 1, resp_len, 0)),
+                self.lcd.req.payload.eq(req),
+                self.lcd.req.valid.eq(rx.valid),
+                rx.ready.eq(self.lcd.req.ready),
+            ]
+            with m.If(rx.valid & self.lcd.req.ready):
+                m.d.sync += count.eq(count - 1)
+                with m.If(count == 1):
+                    m.next = then
+
+        def send_cmd(command, then):
+            m.d.comb += [
+                req.data.eq(command),
+                req.dc.eq(1),
+            ]
+            with self.lcd.req.Send(m, req):
+                m.next = then
+
+        # Set by WINDOW, and kept through the FILLs and RAWs that draw in it,
+        # so nobody else's window can get in. Anything else, a SYNC included,
+        # lets it go: the host needn't follow its drawing with anything, and
+        # must be able to wait on a SYNC's reply without holding up Render.
+        # One that wants its window kept across SYNCs takes the panel first.
+        drawing = Signal()
+
+        with m.FSM() as fsm:
+            with m.State("op"):
+                with rx.Recv(m) as op:
+                    m.d.sync += resp_len.eq(0)
+                    with m.If(~op.matches(BridgeOp.FILL, BridgeOp.RAW)):
+                        m.d.sync += drawing.eq(op == BridgeOp.WINDOW)
+                    with m.Switch(op):
+                        with m.Case(BridgeOp.WINDOW):
+                            m.next = "window_caset"
+                        with m.Case(BridgeOp.FILL):
+                            m.next = "fill_n"
+                        with m.Case(BridgeOp.RAW):
+                            m.next = "raw_n"
+                        with m.Case(BridgeOp.COMMAND):
+                            m.next = "cmd"
+                        with m.Case(BridgeOp.LOAD):
+                            m.next = "load_addr_hi"
+                        with m.Case(BridgeOp.STATS):
+                            m.next = "stats_op"
+                        with m.Case(BridgeOp.VIEW):
+                            m.next = "view_hi"
+                        with m.Case(BridgeOp.SYNC):
+                            m.next = "sync"
+                        with m.Case(BridgeOp.HOST):
+                            m.d.sync += self.host.eq(1)
+                        with m.Case(BridgeOp.LIFE):
+                            m.d.sync += self.host.eq(0)
+
+            ## WINDOW
+
+            with m.State("window_caset"):
+                m.d.sync += count.eq(4)
+                send_cmd(LcdCommand.CASET, "window_x")
+
+            with m.State("window_x"):
+                forward("window_paset")
+
+            with m.State("window_paset"):
+                m.d.sync += count.eq(4)
+                send_cmd(LcdCommand.PASET, "window_y")
+
+            with m.State("window_y"):
+                forward("window_write")
+
+            with m.State("window_write"):
+                send_cmd(LcdCommand.MEMORY_WRITE, "op")
+
+            ## FILL
+
+            with m.State("fill_n"):
+                with rx.Recv(m) as n:
+                    m.d.sync += count.eq(n + 1)
+                    m.next = "fill_hi"
+
+            with m.State("fill_hi"):
+                with rx.Recv(m) as hi:
+                    m.d.sync += colour[8:].eq(hi)
+                    m.next = "fill_lo"
+
+            with m.State("fill_lo"):
+                with rx.Recv(m) as lo:
+                    m.d.sync += [
+                        colour[:8].eq(lo),
+                        colour_lo.eq(0),
+                    ]
+                    m.next = "fill"
+
+            with m.State("fill"):
+                m.d.comb += [
+                    req.data.eq(Mux(colour_lo, colour[:8], colour[8:])),
+                    req.dc.eq(0),
+                ]
+                with self.lcd.req.Send(m, req):
+                    m.d.sync += colour_lo.eq(~colour_lo)
+                    with m.If(colour_lo):
+                        m.d.sync += count.eq(count - 1)
+                        with m.If(count == 1):
+                            m.next = "op"
+
+            ## RAW
+
+            with m.State("raw_n"):
+                with rx.Recv(m) as n:
+                    m.d.sync += count.eq((n + 1) * 2)
+                    m.next = "raw"
+
+            with m.State("raw"):
+                forward("op")
+
+            ## COMMAND
+
+            with m.State("cmd"):
+                with rx.Recv(m) as payload:
+                    m.d.sync += cmd.eq(payload)
+                    m.next = "cmd_nparams"
+
+            with m.State("cmd_nparams"):
+                with rx.Recv(m) as payload:
+                    m.d.sync += count.eq(payload)
+                    m.next = "cmd_resp_len"
+
+            with m.State("cmd_resp_len"):
+                with rx.Recv(m) as payload:
+                    m.d.sync += resp_len.eq(payload)
+                    m.next = "cmd_send"
+
+            with m.State("cmd_send"):
+                m.d.comb += [
+                    req.data.eq(cmd),
+                    req.dc.eq(1),
+                    req.resp_len.eq(Mux(count == 0, resp_len, 0)),
+                ]
+                with self.lcd.req.Send(m, req):
+                    with m.If(count == 0):
+                        m.next = "op"
+                    with m.Else():
+                        m.next = "cmd_params"
+
+            with m.State("cmd_params"):
+                forward("op")
+
+            ## LOAD
+
+            with m.State("load_addr_hi"):
+                with rx.Recv(m) as payload:
+                    m.d.sync += load.addr[8:].eq(payload)
+                    m.next = "load_addr_lo"
+
+            with m.State("load_addr_lo"):
+                with rx.Recv(m) as payload:
+                    m.d.sync += load.addr[:8].eq(payload)
+                    m.next = "load_n"
+
+            with m.State("load_n"):
+                with rx.Recv(m) as n:
+                    m.d.sync += [
+                        count.eq(n + 1),
+                        load_byte.eq(0),
+                    ]
+                    m.next = "load"
+
+            with m.State("load"):
+                # Cells arrive in order, eight to a byte.
+                with rx.Recv(m) as payload:
+                    m.d.sync += [
+                        load.data.eq(Cat(load.data[8:], payload)),
+                        load_byte.eq(load_byte + 1),
+                        count.eq(count - 1),
+                    ]
+                    with m.If(load_byte == WORD_BYTES - 1):
+                        m.d.sync += load_byte.eq(0)
+                        m.next = "load_write"
+
+            with m.State("load_write"):
+                with self.load.Send(m, load):
+                    m.d.sync += load.addr.eq(load.addr + 1)
+                    with m.If(count == 0):
+                        m.next = "op"
+                    with m.Else():
+                        m.next = "load"
+
+            ## STATS
+
+            with m.State("stats_op"):
+                with self.tx.Send(m, BridgeOp.STATS):
+                    m.d.sync += [
+                        stats_sr.eq(Cat(*stats_bytes)),
+                        count.eq(STATS_BYTES),
+                    ]
+                    m.next = "stats"
+
+            with m.State("stats"):
+                with self.tx.Send(m, stats_sr[:8]):
+                    m.d.sync += [
+                        stats_sr.eq(stats_sr >> 8),
+                        count.eq(count - 1),
+                    ]
+                    with m.If(count == 1):
+                        m.next = "op"
+
+            ## VIEW
+
+            with m.State("view_hi"):
+                with rx.Recv(m) as payload:
+                    m.d.sync += view[8:].eq(payload)
+                    m.next = "view_lo"
+
+            with m.State("view_lo"):
+                with rx.Recv(m) as payload:
+                    m.d.sync += self.view.eq(Cat(payload, view[8:]))
+                    m.next = "op"
+
+            ## SYNC
+
+            with m.State("sync"):
+                with self.tx.Send(m, BridgeOp.SYNC):
+                    m.next = "op"
+
+        # Each op that talks to the panel does so without interruption.
+        m.d.comb += self.lcd.lock.eq(drawing | Cat(
+            fsm.ongoing(state) for state in fsm.encoding
+            if state.startswith(("window", "fill", "raw", "cmd"))
+        ).any())
+
+        return m
@@ -1,9 +1,10 @@
-from amaranth import Array, Module, Signal
+from amaranth import Cat, Module, Signal
 from amaranth.lib import wiring
+from amaranth.lib.memory import Memory
 from amaranth.lib.wiring import Out
 
 from .lcd import Lcd
-from .proto import LCD_INIT_ROM, LCD_INIT_SEQUENCE, LcdCommand
+from .proto import LCD_INIT_SEQUENCE, LcdCommand
 
 __all__ = ["Initter"]
 
@@ -13,69 +14,157 @@ class Initter(wiring.Component):
     res: Out(1)
     done: Out(1)
 
+    def __init__(self, *, sequence=LCD_INIT_SEQUENCE, poll_status=False):
+        # `sequence` is of (command, parameters, delay in µs) like
+        # LCD_INIT_SEQUENCE; it's stored in block RAM, so swapping in another
+        # doesn't cost any logic.
+        #
+        # With `poll_status`, rather than wait out a command's delay, poll
+        # READ_DISPLAY_STATUS until the panel reports it's out of sleep with
+        # its booster on. The first poll still waits 5ms, since that's how
+        # long SLEEP_OUT needs before any other command.
+        self._sequence = list(sequence)
+        self._poll_status = poll_status
+        super().__init__()
+
     def elaborate(self, platform):
         m = Module()
 
         m.d.comb += self.done.eq(0)
         m.d.comb += self.res.eq(0)
-
-        reset_apply_cyc = int((11 * platform.default_clk_frequency) // 1_000_000)  # tRW_min = 10µs
-        reset_wait_cyc = int((121_000 * platform.default_clk_frequency) // 1_000_000)  # tRT_max = 120ms
-        res_timer = Signal(range(reset_wait_cyc + 1), init=reset_apply_cyc)
-
-        rom = Array(LCD_INIT_ROM)
-        rom_len = len(LCD_INIT_ROM)
+        # Nobody else gets to talk to the panel before it's up.
+        m.d.comb += self.lcd.lock.eq(~self.done)
+
+        def cycles(us):
+            return int((us * platform.default_clk_frequency) // 1_000_000)
+
+        reset_apply_cyc = cycles(11)  # tRW_min = 10µs
+        # tRT is 5ms, but SLEEP_OUT mustn't follow a reset within 120ms, and
+        # nothing before it is worth sending any sooner.
+        reset_wait_cyc = cycles(121_000)
+        poll_wait_cyc = cycles(5_000)
+        delays = [cycles(delay) for _, _, delay in self._sequence]
+        timer = Signal(range(max(reset_wait_cyc, poll_wait_cyc, *delays) + 1),
+                       init=reset_apply_cyc)
+
+        # Each entry is laid out as its command, the number of parameters, then
+        # the parameters. Reads are registered, so `rom_ix_next` is presented
+        # as the address, making the data read always that at `rom_ix`.
+        rom_init = []
+        for cmd, params, _ in self._sequence:
+            rom_init.append(cmd.value if isinstance(cmd, LcdCommand) else cmd)
+            rom_init.append(len(params))
+            rom_init.extend(params)
+        rom_len = len(rom_init)
+        m.submodules.rom = rom = Memory(shape=8, depth=rom_len, init=rom_init,
+                                        attrs={"rom_style": "block"})
+        rom_rd = rom.read_port()
         rom_ix = Signal(range(rom_len + 1))
-        cmd_rem = Signal(range(max(len(pair[1]) for pair in LCD_INIT_SEQUENCE) + 1))
+        rom_ix_next = Signal.like(rom_ix)
+        m.d.comb += [
+            rom_ix_next.eq(rom_ix),
+            rom_rd.addr.eq(rom_ix_next),
+        ]
+        m.d.sync += rom_ix.eq(rom_ix_next)
+        cmd_rem = Signal(range(max(len(entry[1]) for entry in self._sequence) + 1))
+
+        # `entry_ix` stays put while each entry's sent, so its delay's long
+        # since been read by the time it's needed.
+        m.submodules.delay_rom = delay_rom = Memory(
+            shape=range(max(*delays, 1) + 1), depth=len(delays), init=delays,
+        )
+        delay_rd = delay_rom.read_port()
+        entry_ix = Signal(range(len(self._sequence) + 1))
+        m.d.comb += delay_rd.addr.eq(entry_ix)
+
+        # The 32 status bits are preceded by a dummy clock, and only 32 are
+        # clocked in, so D0's lost: status[n] is D(n+1).
+        status = Signal(32)
+        status_rem = Signal(range(5))
+        booster_on = status[30]  # D31
+        sleep_out = status[16]  # D17
 
         req = Signal(Lcd.Request)
 
         with m.FSM():
             with m.State("reset_apply"):
                 m.d.comb += self.res.eq(1)
-                m.d.sync += res_timer.eq(res_timer - 1)
-                with m.If(res_timer == 0):
-                    m.d.sync += res_timer.eq(reset_wait_cyc)
-                    m.next = "reset_wait"
-
-            with m.State("reset_wait"):
-                m.d.sync += res_timer.eq(res_timer - 1)
-                with m.If(res_timer == 0):
+                m.d.sync += timer.eq(timer - 1)
+                with m.If(timer == 0):
+                    m.d.sync += timer.eq(reset_wait_cyc)
+                    m.next = "wait"
+
+            with m.State("wait"):
+                m.d.sync += timer.eq(timer - 1)
+                with m.If(timer == 0):
                     m.next = "init_cmd"
 
             with m.State("init_cmd"):
                 with m.If(rom_ix != rom_len):
                     m.d.comb += [
-                        req.data.eq(rom[rom_ix]),
+                        req.data.eq(rom_rd.data),
                         req.dc.eq(1),
                     ]
                     with self.lcd.req.Send(m, req):
-                        m.d.sync += [
-                            rom_ix.eq(rom_ix + 2),
-                            cmd_rem.eq(rom[rom_ix + 1])
-                        ]
-                        m.next = "init_param"
-
-                        with m.If(rom[rom_ix] == LcdCommand.NOP):
-                            m.d.sync += res_timer.eq(reset_wait_cyc)
-                            m.next = "reset_wait"
+                        m.d.comb += rom_ix_next.eq(rom_ix + 1)
+                        m.next = "init_len"
 
                 with m.Else():
                     m.next = "done"
 
+            with m.State("init_len"):
+                m.d.comb += rom_ix_next.eq(rom_ix + 1)
+                m.d.sync += cmd_rem.eq(rom_rd.data)
+                m.next = "init_param"
+
             with m.State("init_param"):
                 with m.If(cmd_rem != 0):
                     m.d.comb += [
-                        req.data.eq(rom[rom_ix]),
+                        req.data.eq(rom_rd.data),
                         req.dc.eq(0),
                     ]
                     with self.lcd.req.Send(m, req):
-                        m.d.sync += [
-                            rom_ix.eq(rom_ix + 1),
-                            cmd_rem.eq(cmd_rem - 1),
-                        ]
+                        m.d.comb += rom_ix_next.eq(rom_ix + 1)
+                        m.d.sync += cmd_rem.eq(cmd_rem - 1)
                 with m.Else():
-                    m.next = "init_cmd"
+                    m.d.sync += entry_ix.eq(entry_ix + 1)
+                    with m.If(delay_rd.data == 0):
+                        m.next = "init_cmd"
+                    with m.Else():
+                        if self._poll_status:
+                            m.d.sync += timer.eq(poll_wait_cyc)
+                            m.next = "poll_wait"
+                        else:
+                            m.d.sync += timer.eq(delay_rd.data)
+                            m.next = "wait"
+
+            if self._poll_status:
+                with m.State("poll_wait"):
+                    m.d.sync += timer.eq(timer - 1)
+                    with m.If(timer == 0):
+                        m.next = "poll"
+
+                with m.State("poll"):
+                    m.d.comb += [
+                        req.data.eq(LcdCommand.READ_DISPLAY_STATUS),
+                        req.dc.eq(1),
+                        req.resp_len.eq(4),
+                    ]
+                    with self.lcd.req.Send(m, req):
+                        m.d.sync += status_rem.eq(4)
+                        m.next = "poll_resp"
+
+                with m.State("poll_resp"):
+                    with m.If(status_rem != 0):
+                        with self.lcd.resp.Recv(m) as payload:
+                            m.d.sync += [
+                                status.eq(Cat(payload, status[:24])),
+                                status_rem.eq(status_rem - 1),
+                            ]
+                    with m.Elif(booster_on & sleep_out):
+                        m.next = "init_cmd"
+                    with m.Else():
+                        m.next = "poll"
 
             with m.State("done"):
                 m.d.comb += self.done.eq(1)
@@ -1,5 +1,6 @@
-from amaranth import Cat, ClockSignal, Module, Signal
+from amaranth import Cat, ClockSignal, Const, Module, Mux, Signal
 from amaranth.lib import data, stream, wiring
+from amaranth.lib.fifo import AsyncFIFO, SyncFIFO
 from amaranth.lib.wiring import In, Out
 
 __all__ = ["Lcd"]
@@ -24,65 +25,224 @@ class Lcd(wiring.Component):
         {
             "req": In(stream.Signature(Request)),
             "resp": Out(stream.Signature(8)),
+            # Held by a producer mid-transaction, for an Arbiter in front.
+            # Lcd itself pays it no mind.
+            "lock": In(1),
         }
     )
 
-    pin: Out(PinSignature)
-    cmd: Out(CmdSignature)
+    # With `ddr`, `clk` is the pair of values for the rising and falling
+    # halves of each sync cycle, for a DDR output buffer. `copi` and `dc` are
+    # to be registered in the I/O cell, and `cipo` too, to match its latency.
+    DdrPinSignature = wiring.Signature(
+        {
+            "clk": Out(2),
+            "copi": Out(1),
+            "dc": Out(1),
+            "cipo": In(1),
+        }
+    )
+
+    def __init__(self, *, req_depth=2, resp_depth=4, divisor=1, read_divisor=None, ddr=False,
+                 domain="sync"):
+        # Requests are queued so the next byte is ready to load while bit 0 of
+        # the current one is still shifting out; the producer then has a whole
+        # byte time to come up with its next request.
+        self._req_depth = req_depth
+
+        # Responses are queued too. When the queue's full, the SPI clock is
+        # held between bytes until there's room, so a slow consumer doesn't
+        # lose any.
+        self._resp_depth = resp_depth
+
+        # `divisor` is the number of sync cycles per SPI clock. At 1, the SPI
+        # clock is the inverted sync clock: gated combinatorially unless `ddr`
+        # is set, in which case it's produced by a DDR I/O buffer, and the
+        # input/output registers' latency is accounted for on reads. Fabric
+        # registers can do at most sync/2 by themselves.
+        #
+        # The panel's reads are slower than its writes, so the bytes read back
+        # can be clocked by `read_divisor` instead, no less than `divisor`.
+        if read_divisor is None:
+            read_divisor = divisor
+        for name, value in [("divisor", divisor), ("read_divisor", read_divisor)]:
+            if value < 1 or value & (value - 1):
+                raise ValueError(f"{name} must be a power of two, not {value}")
+        if read_divisor < divisor:
+            raise ValueError(f"read_divisor {read_divisor} is less than divisor {divisor}")
+        if ddr and read_divisor != 1:
+            raise ValueError("ddr requires divisor and read_divisor 1")
+        self._divisor = divisor
+        self._read_divisor = read_divisor
+        self._ddr = ddr
+
+        # The SPI clock and the pins are run from `domain`. Away from `sync`,
+        # the queues become AsyncFIFOs, with `cmd` on the `sync` side of them
+        # and `idle` on the other.
+        self._domain = domain
+
+        super().__init__({
+            "pin": Out(Lcd.DdrPinSignature if ddr else Lcd.PinSignature),
+            "cmd": Out(Lcd.CmdSignature),
+            # High on cycles the SPI clock isn't running.
+            "idle": Out(1),
+        })
 
     def elaborate(self, platform):
         m = Module()
 
+        if self._domain == "sync":
+            req_fifo = SyncFIFO(width=Lcd.Request.as_shape().size, depth=self._req_depth)
+            resp_fifo = SyncFIFO(width=8, depth=self._resp_depth)
+        else:
+            req_fifo = AsyncFIFO(width=Lcd.Request.as_shape().size, depth=self._req_depth,
+                                 r_domain=self._domain, w_domain="sync")
+            resp_fifo = AsyncFIFO(width=8, depth=self._resp_depth,
+                                  r_domain="sync", w_domain=self._domain)
+
+        m.submodules.req_fifo = req_fifo
+        m.d.comb += [
+            req_fifo.w_data.eq(self.cmd.req.payload),
+            req_fifo.w_en.eq(self.cmd.req.valid),
+            self.cmd.req.ready.eq(req_fifo.w_rdy),
+        ]
+        req = req_fifo.r_stream
+
+        m.submodules.resp_fifo = resp_fifo
+        m.d.comb += [
+            self.cmd.resp.payload.eq(resp_fifo.r_data),
+            self.cmd.resp.valid.eq(resp_fifo.r_rdy),
+            resp_fifo.r_en.eq(self.cmd.resp.ready),
+        ]
+        resp = resp_fifo.w_stream
+
         sr = Signal(8)
 
         bit_rem = Signal(3)
         rcv_byte_rem = Signal(4)
 
-        with m.FSM() as fsm:
+        # Everything but loading a new request happens at the end of an SPI
+        # clock period, on `tick`. Periods are `read_divisor` long while
+        # `reading`, and `divisor` long in the low bits of `phase` otherwise.
+        write_bits = (self._divisor - 1).bit_length()
+        phase = Signal(range(self._read_divisor))
+        reading = Signal()
+        tick = Signal()
+        if self._read_divisor == self._divisor:
+            m.d.comb += tick.eq(phase == self._divisor - 1)
+        else:
+            m.d.comb += tick.eq(Mux(reading, phase == self._read_divisor - 1,
+                                    phase[:write_bits] == self._divisor - 1))
+        m.d[self._domain] += phase.eq(phase + 1)
+
+        # Only what's read matters, so cipo's sampled for those periods.
+        if self._read_divisor <= 2:
+            cipo = self.pin.cipo
+        else:
+            cipo = Signal()
+            with m.If(phase == self._read_divisor // 2):
+                m.d[self._domain] += cipo.eq(self.pin.cipo)
+
+        io_latency = 2 if self._ddr else 0
+        lat_rem = Signal(range(io_latency + 1))
+
+        def load():
+            with req.Recv(m) as payload:
+                payload = Lcd.Request(payload)
+                m.d[self._domain] += [
+                    sr.eq(payload.data),
+                    self.pin.dc.eq(payload.dc),
+                    bit_rem.eq(7),
+                    rcv_byte_rem.eq(payload.resp_len),
+                    phase.eq(0),
+                ]
+                m.next = "snd"
+
+        with m.FSM(domain=self._domain) as fsm:
             with m.State("idle"):
-                with self.cmd.req.Recv(m) as payload:
-                    m.d.sync += [
-                        sr.eq(payload.data),
-                        self.pin.dc.eq(payload.dc),
-                        bit_rem.eq(7),
-                        rcv_byte_rem.eq(payload.resp_len),
-                    ]
-                    m.next = "snd"
+                m.d[self._domain] += phase.eq(0)
+                load()
 
             with m.State("snd"):
                 m.d.comb += self.pin.copi.eq(sr[7])
-                m.d.sync += bit_rem.eq(bit_rem - 1)
 
-                with m.If(bit_rem == 0):
-                    m.d.sync += [
+                with m.If(tick):
+                    m.d[self._domain] += [
+                        bit_rem.eq(bit_rem - 1),
+                        sr.eq(Cat(cipo, sr[:7])),
+                    ]
+
+                with m.If(tick & (bit_rem == 0)):
+                    m.d[self._domain] += [
                         bit_rem.eq(7),
                         rcv_byte_rem.eq(rcv_byte_rem - 1),
                         self.pin.dc.eq(0),
                     ]
                     with m.If(rcv_byte_rem == 0):
                         m.next = "idle"
+                        load()
                     with m.Else():
+                        m.d[self._domain] += phase.eq(0)
                         m.next = "rcv"
 
             with m.State("rcv"):
-                m.d.sync += bit_rem.eq(bit_rem - 1)
+                with m.If(tick):
+                    m.d[self._domain] += [
+                        bit_rem.eq(bit_rem - 1),
+                        sr.eq(Cat(cipo, sr[:7])),
+                    ]
 
-                with m.If(bit_rem == 0):
-                    m.d.sync += bit_rem.eq(7)
-                    m.next = "rcv_end"
+                with m.If(tick & (bit_rem == 0)):
+                    m.d[self._domain] += [
+                        bit_rem.eq(7),
+                        lat_rem.eq(io_latency),
+                    ]
+                    m.next = "rcv_lat" if io_latency else "rcv_end"
+
+            if io_latency:
+                # The last bits are still on their way in; wait for them
+                # without clocking any more out of the panel.
+                with m.State("rcv_lat"):
+                    m.d[self._domain] += [
+                        lat_rem.eq(lat_rem - 1),
+                        sr.eq(Cat(cipo, sr[:7])),
+                    ]
+                    with m.If(lat_rem == 1):
+                        m.next = "rcv_end"
 
             with m.State("rcv_end"):
-                # XXX no support for backpressure, probably violates `stream` policy.
-                self.cmd.resp.enq(m, sr)
-                m.d.sync += rcv_byte_rem.eq(rcv_byte_rem - 1)
-
-                with m.If(rcv_byte_rem == 0):
-                    m.next = "idle"
-                with m.Else():
-                    m.next = "rcv"
-
-        with m.If(~fsm.ongoing("idle")):
-            m.d.comb += self.pin.clk.eq(~ClockSignal("sync"))
-            m.d.sync += sr.eq(Cat(self.pin.cipo, sr[:7]))
+                # The byte's all in; it's queued without clocking the panel,
+                # so the next one's bits follow on from the last.
+                m.d[self._domain] += phase.eq(0)
+                with m.If(resp.ready):
+                    resp.enq(m, sr)
+                    m.d[self._domain] += rcv_byte_rem.eq(rcv_byte_rem - 1)
+
+                    with m.If(rcv_byte_rem == 0):
+                        m.next = "idle"
+                    with m.Else():
+                        m.next = "rcv"
+
+        m.d.comb += reading.eq(~fsm.ongoing("idle") & ~fsm.ongoing("snd"))
+        clocking = ~fsm.ongoing("idle") & ~fsm.ongoing("rcv_end")
+        if io_latency:
+            clocking &= ~fsm.ongoing("rcv_lat")
+        m.d.comb += self.idle.eq(~clocking)
+
+        # High for the second half of each period.
+        def half(divisor):
+            if divisor == 1:
+                return ~ClockSignal(self._domain)
+            return phase[(divisor - 1).bit_length() - 1]
+
+        if self._ddr:
+            m.d.comb += self.pin.clk.eq(Cat(Const(0), clocking))
+        elif self._read_divisor == self._divisor:
+            with m.If(clocking):
+                m.d.comb += self.pin.clk.eq(half(self._divisor))
+        else:
+            with m.If(clocking):
+                m.d.comb += self.pin.clk.eq(Mux(reading, half(self._read_divisor),
+                                                half(self._divisor)))
 
         return m
@@ -0,0 +1,508 @@
+from amaranth import Cat, Module, Mux, Signal
+from amaranth.lib import crc, data, stream, wiring
+from amaranth.lib.memory import Memory, ReadPort
+from amaranth.lib.wiring import In, Out
+
+from .spram import Spram
+
+__all__ = ["Life"]
+
+
+def _full_add(a, b, c):
+    return a ^ b ^ c, (a & b) | (a & c) | (b & c)
+
+
+def _half_add(a, b):
+    return a ^ b, a & b
+
+
+def _next_gen(alive, neighbours):
+    # Bit-sliced: each argument is a vector with one bit per cell, and the
+    # neighbour count is summed with a tree of full adders across all of
+    # them at once. We only need the count mod 8, since 8 neighbours is
+    # death either way.
+    n = neighbours
+    s_a, c_a = _full_add(n[0], n[1], n[2])
+    s_b, c_b = _full_add(n[3], n[4], n[5])
+    s_c, c_c = _half_add(n[6], n[7])
+    ones, c_d = _full_add(s_a, s_b, s_c)
+    t_s, t_c = _full_add(c_a, c_b, c_c)
+    twos, c_e = _half_add(t_s, c_d)
+    fours = t_c ^ c_e
+    # 3 neighbours, or 2 and alive.
+    return twos & ~fours & (ones | alive)
+
+
+class Life(wiring.Component):
+    # What Top starts with, at the top left of the universe.
+    START = """
+................................................................................
+................................................................................
+..........................#.....................................................
+........................#.#.....................................................
+..............##......##............##..........................................
+.............#...#....##............##..........................................
+..##........#.....#...##........................................................
+..##........#...#.##....#.#.....................................................
+............#.....#.......#.....................................................
+.............#...#..............................................................
+..............##................................................................
+................................................................................
+................................................................................
+""".strip().split("\n")
+
+    def __init__(self, *, width, height, word_width=1, init=(), spram=False, periods=0,
+                 banks=2):
+        # With `spram`, cells are kept in single-ported Spram rather than block
+        # RAM, and written with `init` after reset, since SPRAM can't be
+        # initialised.
+        #
+        # With `periods`, each step reports in `period` whether the generation
+        # it made has been seen within that many generations before: 1 if
+        # it's a still life, 2 if it's back to what it was two ago, and so
+        # on, or 0 if none of them. Still lifes are found exactly, the rest
+        # by CRC, with a swap between each step as Top does.
+        #
+        # With three `banks`, Life can evolve on while a generation's read:
+        # `cells` and `damage` read the generation last shown with `show`
+        # rather than the current one, and `swap` leaves it be. There's no
+        # room for a third in SPRAM.
+        if width % word_width:
+            raise ValueError(f"word width {word_width} doesn't divide width {width}")
+        if spram and word_width != Spram.WIDTH:
+            raise ValueError(f"word width must be {Spram.WIDTH} with spram, not {word_width}")
+        if banks not in (2, 3):
+            raise ValueError(f"banks must be 2 or 3, not {banks}")
+        if spram and banks != 2:
+            raise ValueError("spram only has room for 2 banks")
+
+        self._width = width
+        self._height = height
+        self._word_width = word_width
+        self._init = list(init)
+        self._spram = spram
+        self._periods = periods
+        self._banks = banks
+
+        depth = width * height // word_width
+        super().__init__({
+            "cells": Out(ReadPort.Signature(
+                addr_width=(depth - 1).bit_length(), shape=word_width,
+            )),
+            "damage": Out(ReadPort.Signature(
+                addr_width=(height - 1).bit_length(), shape=Life.Damage(width),
+            )),
+            "step": In(1),
+            "busy": Out(1),
+            "swap": In(1),
+            "skip": In(1),
+            "show": In(1),
+            "period": Out(range(periods + 1)),
+            "load": In(stream.Signature(data.StructLayout({
+                "addr": range(depth),
+                "data": word_width,
+            }))),
+        })
+
+    @staticmethod
+    def Damage(width):
+        # The span of cells in a row that changed since the last generation.
+        return data.StructLayout({
+            "dirty": 1,
+            "x0": range(width),
+            "x1": range(width),
+        })
+
+    @staticmethod
+    def pack(cells, word_width):
+        # Cell x of a row is bit x % word_width of word x // word_width.
+        cells = list(cells)
+        return [
+            sum(bool(cell) << bit for bit, cell in enumerate(cells[ix:ix + word_width]))
+            for ix in range(0, len(cells), word_width)
+        ]
+
+    @staticmethod
+    def start_cells(width, height):
+        # START on a `width` by `height` universe, cropped or padded to fit.
+        cells = []
+        for row in Life.START[:height]:
+            row = [c != "." for c in row[:width]]
+            cells += row + [False] * (width - len(row))
+        return cells + [False] * (width * height - len(cells))
+
+    def elaborate(self, platform):
+        m = Module()
+
+        GOL_WIDTH = self._width
+        GOL_HEIGHT = self._height
+        GOL_WORD = self._word_width
+        GOL_ROW_WORDS = GOL_WIDTH // GOL_WORD
+        GOL_WORDCNT = GOL_ROW_WORDS * GOL_HEIGHT
+
+        # The two banks swap roles every generation: `gen` selects the one
+        # holding the current generation, and the next is written to the other.
+        # `cells` and the evolver have their own read ports, so the current
+        # generation can be read while the next is computed; the banks only
+        # trade places on `swap`, so the reader decides when it sees it.
+        #
+        # `load` overwrites words of the current generation. Whatever's been
+        # evolved from it is stale after, and its damage meaningless; step again
+        # and draw it in full.
+        #
+        # Spram has a single port, so there each bank is kept twice: one copy
+        # for each reader of the current generation, and both written with the
+        # next. Reset's spent writing `init` to bank 0 as the next generation,
+        # before it becomes the current one.
+        #
+        # With a third bank, `cells` and `damage` read the `shown` one, and
+        # the next generation's written to whichever's neither that nor the
+        # current one. A `show` with a `swap` shows what's swapped in.
+        if self._banks == 3:
+            gen = Signal(range(3))
+            nxt = Signal(range(3), init=1)
+            shown = Signal(range(3))
+            with m.If(self.swap & self.show):
+                m.d.sync += [
+                    gen.eq(nxt),
+                    nxt.eq(gen),
+                    shown.eq(nxt),
+                ]
+            with m.Elif(self.swap):
+                m.d.sync += [
+                    gen.eq(nxt),
+                    nxt.eq(3 - nxt - shown),
+                ]
+            with m.Elif(self.show):
+                m.d.sync += shown.eq(gen)
+        else:
+            gen = Signal(init=1 if self._spram else 0)
+            nxt = ~gen
+            shown = gen
+            with m.If(self.swap):
+                m.d.sync += gen.eq(~gen)
+
+        cells_addr = Signal(range(GOL_WORDCNT))
+        cells_data = Signal(GOL_WORD)
+        cells_wr_addr = Signal(range(GOL_WORDCNT))
+        cells_wr_data = Signal(GOL_WORD)
+        cells_wr_en = Signal()
+
+        # Each bank also records which cells changed in each row on the way to
+        # the generation it holds. Nothing's been shown yet at the start, so
+        # the initial one is all changed.
+        #
+        # Stepping with `skip` is for when the current generation won't be
+        # drawn: its damage is carried over into the next's, so that's what
+        # changed since the one that was.
+        damage_layout = Life.Damage(GOL_WIDTH)
+        damage_wr_addr = Signal(range(GOL_HEIGHT))
+        damage_wr_data = Signal(damage_layout)
+        damage_wr_en = Signal()
+        carry_addr = Signal(range(GOL_HEIGHT))
+        carry_data = Signal(damage_layout)
+
+        for bank_ix in range(self._banks):
+            if self._spram:
+                for copy, rd_addr, rd_data in [
+                    ("evolve", cells_addr, cells_data),
+                    ("ext", self.cells.addr, self.cells.data),
+                ]:
+                    m.submodules[f"cells{bank_ix}_{copy}"] = cells = Spram(depth=GOL_WORDCNT)
+                    with m.If(gen == bank_ix):
+                        m.d.comb += rd_data.eq(cells.r_data)
+                        with m.If(self.load.valid):
+                            m.d.comb += [
+                                cells.addr.eq(self.load.payload.addr),
+                                cells.w_data.eq(self.load.payload.data),
+                                cells.w_en.eq(1),
+                            ]
+                        with m.Else():
+                            m.d.comb += cells.addr.eq(rd_addr)
+                    with m.Else():
+                        m.d.comb += [
+                            cells.addr.eq(cells_wr_addr),
+                            cells.w_data.eq(cells_wr_data),
+                            cells.w_en.eq(cells_wr_en),
+                        ]
+            else:
+                m.submodules[f"cells{bank_ix}"] = cells = Memory(
+                    shape=GOL_WORD, depth=GOL_WORDCNT,
+                    init=Life.pack(self._init, GOL_WORD) if bank_ix == 0 else [],
+                )
+                cells_rd = cells.read_port()
+                ext_rd = cells.read_port()
+                cells_wr = cells.write_port()
+                m.d.comb += [
+                    cells_rd.addr.eq(cells_addr),
+                    ext_rd.addr.eq(self.cells.addr),
+                    ext_rd.en.eq(self.cells.en),
+                ]
+                with m.If(gen == bank_ix):
+                    m.d.comb += [
+                        cells_data.eq(cells_rd.data),
+                        cells_wr.addr.eq(self.load.payload.addr),
+                        cells_wr.data.eq(self.load.payload.data),
+                        cells_wr.en.eq(self.load.valid),
+                    ]
+                with m.If(shown == bank_ix):
+                    m.d.comb += self.cells.data.eq(ext_rd.data)
+                with m.If(nxt == bank_ix):
+                    m.d.comb += [
+                        cells_wr.addr.eq(cells_wr_addr),
+                        cells_wr.data.eq(cells_wr_data),
+                        cells_wr.en.eq(cells_wr_en),
+                    ]
+
+            m.submodules[f"damage{bank_ix}"] = damage = Memory(
+                shape=damage_layout, depth=GOL_HEIGHT,
+                init=[{"dirty": 1, "x0": 0, "x1": GOL_WIDTH - 1}] * GOL_HEIGHT
+                     if bank_ix == 0 else [],
+            )
+            damage_rd = damage.read_port()
+            carry_rd = damage.read_port()
+            damage_wr = damage.write_port()
+            m.d.comb += [
+                damage_rd.addr.eq(self.damage.addr),
+                damage_rd.en.eq(self.damage.en),
+                carry_rd.addr.eq(carry_addr),
+                damage_wr.addr.eq(damage_wr_addr),
+                damage_wr.data.eq(damage_wr_data),
+                damage_wr.en.eq(damage_wr_en & (nxt == bank_ix)),
+            ]
+
+            with m.If(shown == bank_ix):
+                m.d.comb += self.damage.data.eq(damage_rd.data)
+            with m.If(gen == bank_ix):
+                m.d.comb += carry_data.eq(carry_rd.data)
+
+        m.d.sync += cells_wr_en.eq(0)
+
+        # The evolver streams the current generation through a window of three
+        # rows held in registers, reading a word of cells in raster order each
+        # cycle as it goes. Each row rotates by one word per column, so the
+        # word being evolved is always at [:GOL_WORD], and its neighbours either
+        # side are found by rotating one cell further (wrapping around the
+        # torus for free).
+        #
+        # Each row period is GOL_ROW_WORDS+1 cycles: a word per cycle, then one
+        # to collect the last read and move the rows up. Rows are loaded in
+        # the order GOL_HEIGHT-1, 0, 1, .., GOL_HEIGHT-1, 0, so the wrap rows
+        # are read twice; the first three periods only fill the window.
+        up = Signal(GOL_WIDTH)
+        mid = Signal(GOL_WIDTH)
+        dn = Signal(GOL_WIDTH)
+        load = Signal(GOL_WIDTH)
+
+        col = Signal(range(GOL_ROW_WORDS + 1))
+        period = Signal(range(GOL_HEIGHT + 3))
+        rd_addr = Signal(range(GOL_WORDCNT))
+        rd_pending = Signal()
+
+        reading = Signal()
+        writing = Signal()
+        m.d.comb += [
+            reading.eq((col != GOL_ROW_WORDS) & (period < GOL_HEIGHT + 2)),
+            writing.eq((col != GOL_ROW_WORDS) & (period >= 3)),
+        ]
+
+        def left(row):
+            return row.rotate_left(1)[:GOL_WORD]
+
+        def right(row):
+            return row.rotate_right(1)[:GOL_WORD]
+
+        next_word = Signal(GOL_WORD)
+        m.d.comb += next_word.eq(_next_gen(mid[:GOL_WORD], [
+            left(up), up[:GOL_WORD], right(up),
+            left(mid), right(mid),
+            left(dn), dn[:GOL_WORD], right(dn),
+        ]))
+
+        # The span of cells that changed in the row being written so far; it's
+        # recorded once the row is done.
+        changed = Signal(GOL_WORD)
+        changed_first = Signal(range(GOL_WORD))
+        changed_last = Signal(range(GOL_WORD))
+        m.d.comb += changed.eq(next_word ^ mid[:GOL_WORD])
+        for bit in reversed(range(GOL_WORD)):
+            with m.If(changed[bit]):
+                m.d.comb += changed_first.eq(bit)
+        for bit in range(GOL_WORD):
+            with m.If(changed[bit]):
+                m.d.comb += changed_last.eq(bit)
+
+        row_damage = Signal(damage_layout)
+
+        # The current generation's damage for the row being written, read
+        # over its row period, and merged in with `skip`.
+        skipping = Signal()
+        row_damage_carried = Signal(damage_layout)
+        m.d.comb += [
+            carry_addr.eq(period - 3),
+            row_damage_carried.eq(row_damage),
+        ]
+        with m.If(skipping & carry_data.dirty):
+            m.d.comb += row_damage_carried.eq(carry_data)
+            with m.If(row_damage.dirty):
+                m.d.comb += [
+                    row_damage_carried.x0.eq(
+                        Mux(row_damage.x0 < carry_data.x0, row_damage.x0, carry_data.x0)),
+                    row_damage_carried.x1.eq(
+                        Mux(row_damage.x1 > carry_data.x1, row_damage.x1, carry_data.x1)),
+                ]
+
+        # `history[k]` is the CRC of the generation k before the current one,
+        # and `known` says how many of them are; `load` forgets them all. The
+        # CRC of each next one is taken over the words as they're written.
+        # Whether anything at all changed is enough to know a still life.
+        changed_any = Signal()
+        history = [Signal(32, name=f"history{k}") for k in range(self._periods)]
+        known = Signal(range(self._periods + 1))
+        found = Signal.like(self.period)
+        if self._periods >= 2:
+            m.submodules.crc = crc_next = \
+                crc.catalog.CRC32_ETHERNET(data_width=GOL_WORD).create()
+            m.d.comb += crc_next.data.eq(next_word)
+            for p in reversed(range(2, self._periods + 1)):
+                with m.If((known >= p) & (crc_next.crc == history[p - 1])):
+                    m.d.comb += found.eq(p)
+        if self._periods:
+            with m.If(~changed_any):
+                m.d.comb += found.eq(1)
+
+        with m.FSM(init="clear_start" if self._spram else "idle") as fsm:
+            if self._spram:
+                # Only the words of `init` with any cells alive are kept, in
+                # order, ending with one that never matches after the first.
+                init_words = [
+                    {"addr": addr, "word": word}
+                    for addr, word in enumerate(Life.pack(self._init, GOL_WORD)) if word
+                ] + [{"addr": 0, "word": 0}]
+                m.submodules.init_rom = init_rom = Memory(
+                    shape=data.StructLayout({"addr": range(GOL_WORDCNT), "word": GOL_WORD}),
+                    depth=len(init_words), init=init_words, attrs={"rom_style": "block"},
+                )
+                init_rd = init_rom.read_port()
+                init_ix = Signal(range(len(init_words)))
+                init_ix_next = Signal.like(init_ix)
+                clear_addr = Signal(range(GOL_WORDCNT))
+                m.d.comb += [
+                    init_ix_next.eq(init_ix),
+                    init_rd.addr.eq(init_ix_next),
+                ]
+                m.d.sync += init_ix.eq(init_ix_next)
+
+                with m.State("clear_start"):
+                    m.next = "clear"
+
+                with m.State("clear"):
+                    hit = init_rd.data.addr == clear_addr
+                    m.d.sync += [
+                        cells_wr_en.eq(1),
+                        cells_wr_data.eq(Mux(hit, init_rd.data.word, 0)),
+                        clear_addr.eq(clear_addr + 1),
+                    ]
+                    with m.If(hit):
+                        m.d.comb += init_ix_next.eq(init_ix + 1)
+                    with m.If(cells_wr_en):
+                        m.d.sync += cells_wr_addr.eq(cells_wr_addr + 1)
+                    with m.If(clear_addr == GOL_WORDCNT - 1):
+                        m.next = "clear_end"
+
+                with m.State("clear_end"):
+                    # Let the last write land before the banks trade places.
+                    m.d.sync += gen.eq(0)
+                    m.next = "idle"
+
+            with m.State("idle"):
+                with m.If(self.step):
+                    if self._periods >= 2:
+                        m.d.comb += crc_next.start.eq(1)
+                    m.d.sync += [
+                        self.period.eq(0),
+                        changed_any.eq(0),
+                        skipping.eq(self.skip),
+                        row_damage.dirty.eq(0),
+                        col.eq(0),
+                        period.eq(0),
+                        rd_addr.eq((GOL_HEIGHT - 1) * GOL_ROW_WORDS),
+                        rd_pending.eq(0),
+                        cells_wr_addr.eq(0),
+                    ]
+                    m.next = "evolve"
+
+            with m.State("evolve"):
+                m.d.sync += rd_pending.eq(reading)
+                with m.If(reading):
+                    m.d.sync += rd_addr.eq(Mux(rd_addr == GOL_WORDCNT - 1, 0, rd_addr + 1))
+                with m.If(rd_pending):
+                    m.d.sync += load.eq(Cat(load[GOL_WORD:], cells_data))
+
+                with m.If(writing):
+                    if self._periods >= 2:
+                        m.d.comb += crc_next.valid.eq(1)
+                    m.d.sync += [
+                        cells_wr_en.eq(1),
+                        cells_wr_data.eq(next_word),
+                    ]
+                with m.If(cells_wr_en):
+                    m.d.sync += cells_wr_addr.eq(cells_wr_addr + 1)
+
+                with m.If(writing & changed.any()):
+                    m.d.sync += [
+                        changed_any.eq(1),
+                        row_damage.dirty.eq(1),
+                        row_damage.x1.eq(col * GOL_WORD + changed_last),
+                    ]
+                    with m.If(~row_damage.dirty):
+                        m.d.sync += row_damage.x0.eq(col * GOL_WORD + changed_first)
+
+                with m.If(col != GOL_ROW_WORDS):
+                    m.d.sync += [
+                        up.eq(up.rotate_right(GOL_WORD)),
+                        mid.eq(mid.rotate_right(GOL_WORD)),
+                        dn.eq(dn.rotate_right(GOL_WORD)),
+                        col.eq(col + 1),
+                    ]
+                with m.Else():
+                    m.d.sync += [
+                        up.eq(mid),
+                        mid.eq(dn),
+                        dn.eq(Cat(load[GOL_WORD:], cells_data)),
+                        col.eq(0),
+                        period.eq(period + 1),
+                    ]
+                    with m.If(period >= 3):
+                        m.d.comb += [
+                            damage_wr_addr.eq(period - 3),
+                            damage_wr_data.eq(row_damage_carried),
+                            damage_wr_en.eq(1),
+                        ]
+                        m.d.sync += row_damage.dirty.eq(0)
+                    with m.If(period == GOL_HEIGHT + 2):
+                        # The last word's in the CRC by now.
+                        m.d.sync += self.period.eq(found)
+                        if self._periods >= 2:
+                            m.d.sync += [
+                                history[0].eq(crc_next.crc),
+                                *(history[k].eq(history[k - 1])
+                                  for k in range(1, self._periods)),
+                            ]
+                            with m.If(known != self._periods):
+                                m.d.sync += known.eq(known + 1)
+                        m.next = "idle"
+
+        with m.If(self.load.valid):
+            m.d.sync += [
+                known.eq(0),
+                self.period.eq(0),
+            ]
+
+        m.d.comb += [
+            self.load.ready.eq(1),
+            self.busy.eq(~fsm.ongoing("idle")),
+            cells_addr.eq(rd_addr),
+        ]
+
+        return m
@@ -0,0 +1,128 @@
+import math
+
+from amaranth import ClockDomain, ClockSignal, Instance, Module
+from amaranth.lib import wiring
+from amaranth.lib.cdc import ResetSynchronizer
+from amaranth.lib.wiring import Out
+from amaranth.vendor import LatticeECP5Platform, SiliconBluePlatform
+
+__all__ = ["Pll"]
+
+
+class Pll(wiring.Component):
+    def __init__(self, *, domain, frequency):
+        # Makes `domain` from sync's clock, at `frequency` or as near as the
+        # PLL gets. The domain's held in reset until the PLL locks.
+        self._domain = domain
+        self._frequency = frequency
+
+        super().__init__({
+            "locked": Out(1),
+        })
+
+    @staticmethod
+    def _ice40_params(f_in, f_out):
+        # As icepll does it: the PFD runs at 10-133MHz and the VCO at
+        # 533-1066MHz, with the output a power-of-two division of the VCO.
+        best = None
+        for divr in range(16):
+            f_pfd = f_in / (divr + 1)
+            if not 10e6 <= f_pfd <= 133e6:
+                continue
+            for divf in range(128):
+                f_vco = f_pfd * (divf + 1)
+                if not 533e6 <= f_vco <= 1066e6:
+                    continue
+                for divq in range(1, 7):
+                    error = abs(f_vco / 2 ** divq - f_out)
+                    if best is None or error < best[0]:
+                        best = (error, divr, divf, divq, f_pfd)
+        if best is None:
+            raise ValueError(f"no iCE40 PLL setting makes {f_out:g}Hz from {f_in:g}Hz")
+        _, divr, divf, divq, f_pfd = best
+        filter_range = 1 + sum(f_pfd >= limit for limit in [17e6, 26e6, 44e6, 66e6, 101e6])
+        return divr, divf, divq, filter_range
+
+    @staticmethod
+    def _ecp5_params(f_in, f_out):
+        # As ecppll does it: the PFD runs at 3.125-400MHz and the VCO at
+        # 400-800MHz, with CLKOP fed back, so it's the PFD times CLKFB_DIV.
+        best = None
+        for clki_div in range(1, 129):
+            f_pfd = f_in / clki_div
+            if not 3.125e6 <= f_pfd <= 400e6:
+                continue
+            for clkfb_div in range(1, 81):
+                f_clkop = f_pfd * clkfb_div
+                clkop_div = math.ceil(400e6 / f_clkop)
+                if clkop_div > 128 or f_clkop * clkop_div > 800e6:
+                    continue
+                error = abs(f_clkop - f_out)
+                if best is None or error < best[0]:
+                    best = (error, clki_div, clkfb_div, clkop_div)
+        if best is None:
+            raise ValueError(f"no ECP5 PLL setting makes {f_out:g}Hz from {f_in:g}Hz")
+        return best[1:]
+
+    def elaborate(self, platform):
+        m = Module()
+
+        cd = ClockDomain(self._domain)
+        m.domains += cd
+        f_in = platform.default_clk_frequency
+
+        match platform:
+            case SiliconBluePlatform():
+                divr, divf, divq, filter_range = Pll._ice40_params(f_in, self._frequency)
+                m.submodules.pll = Instance(
+                    "SB_PLL40_CORE",
+                    p_FEEDBACK_PATH="SIMPLE",
+                    p_DIVR=divr,
+                    p_DIVF=divf,
+                    p_DIVQ=divq,
+                    p_FILTER_RANGE=filter_range,
+                    i_REFERENCECLK=ClockSignal("sync"),
+                    i_RESETB=1,
+                    i_BYPASS=0,
+                    o_PLLOUTGLOBAL=cd.clk,
+                    o_LOCK=self.locked,
+                )
+
+            case LatticeECP5Platform():
+                clki_div, clkfb_div, clkop_div = Pll._ecp5_params(f_in, self._frequency)
+                m.submodules.pll = Instance(
+                    "EHXPLLL",
+                    p_PLLRST_ENA="DISABLED",
+                    p_INTFB_WAKE="DISABLED",
+                    p_STDBY_ENABLE="DISABLED",
+                    p_DPHASE_SOURCE="DISABLED",
+                    p_OUTDIVIDER_MUXA="DIVA",
+                    p_CLKOP_ENABLE="ENABLED",
+                    p_CLKOP_DIV=clkop_div,
+                    p_CLKOP_CPHASE=clkop_div - 1,
+                    p_CLKOP_FPHASE=0,
+                    p_FEEDBK_PATH="CLKOP",
+                    p_CLKFB_DIV=clkfb_div,
+                    p_CLKI_DIV=clki_div,
+                    i_CLKI=ClockSignal("sync"),
+                    i_CLKFB=cd.clk,
+                    i_RST=0,
+                    i_STDBY=0,
+                    i_PHASESEL0=0,
+                    i_PHASESEL1=0,
+                    i_PHASEDIR=1,
+                    i_PHASESTEP=1,
+                    i_PHASELOADREG=1,
+                    i_PLLWAKESYNC=0,
+                    i_ENCLKOP=0,
+                    o_CLKOP=cd.clk,
+                    o_LOCK=self.locked,
+                )
+
+            case _:
+                raise NotImplementedError(f"no PLL for {type(platform).__name__}")
+
+        platform.add_clock_constraint(cd.clk, self._frequency)
+        m.submodules.rst_sync = ResetSynchronizer(~self.locked, domain=self._domain)
+
+        return m
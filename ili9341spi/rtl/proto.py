@@ -1,6 +1,6 @@
-from amaranth.lib import enum
+from amaranth.lib import data, enum
 
-__all__ = ["LcdCommand", "LCD_INIT_SEQUENCE", "LCD_INIT_ROM"]
+__all__ = ["LcdCommand", "LCD_INIT_SEQUENCE", "BridgeOp", "Stats"]
 
 class LcdCommand(enum.Enum, shape=8):
     NOP = 0x00
@@ -15,7 +15,9 @@ class LcdCommand(enum.Enum, shape=8):
     CASET = 0x2A
     PASET = 0x2B
     MEMORY_WRITE = 0x2C
+    VSCRDEF = 0x33
     MEMORY_ACCESS_CTRL = 0x36
+    VSCRSADD = 0x37
     COLMOD = 0x3A
     WRITE_MEMORY_CONTINUE = 0x3C
     FRAME_RATE_CTRL = 0xB1
@@ -38,34 +40,67 @@ class LcdCommand(enum.Enum, shape=8):
     PUMP_RATIO_CTRL = 0xF7
 
 
+# Each command is followed by its parameters, and then the delay in µs before
+# the next may be sent. Datasheet figures get a little slack, since the delay
+# starts once the command's queued, not once it's on the wire.
 LCD_INIT_SEQUENCE = [
-    (LcdCommand.POWER_CTRL_A, [0x39, 0x2C, 0x00, 0x34, 0x02]),
-    (LcdCommand.POWER_CTRL_B, [0x00, 0xC1, 0x30]),
-    (LcdCommand.DRIVER_TIMING_CTRL_A, [0x85, 0x00, 0x78]),
-    (LcdCommand.DRIVER_TIMING_CTRL_B, [0x00, 0x00]),
-    (LcdCommand.POWER_ON_SEQ_CTRL, [0x64, 0x03, 0x12, 0x81]),
-    (LcdCommand.PUMP_RATIO_CTRL, [0x20]),
-    (LcdCommand.POWER_CTRL_1, [0x23]),
-    (LcdCommand.POWER_CTRL_2, [0x10]),
-    (LcdCommand.VCOM_CTRL_1, [0x3E, 0x28]),
-    (LcdCommand.VCOM_CTRL_2, [0x86]),
-    (LcdCommand.MEMORY_ACCESS_CTRL, [0x28]),
-    (LcdCommand.COLMOD, [0x55]),
-    (LcdCommand.FRAME_RATE_CTRL, [0x00, 0x18]),
-    (LcdCommand.DISPLAY_FN_CTRL, [0x08, 0x82, 0x27]),
-    (LcdCommand.ENABLE_3G, [0x00]),
-    (LcdCommand.GAMMA_SET, [0x01]),
-    (LcdCommand.POS_GAMMA_CORRECTION, [0x0F, 0x31, 0x2B, 0x0C, 0x0E, 0x08, 0x4E, 0xF1, 0x37, 0x07, 0x10, 0x03, 0x0E, 0x09, 0x00]),
-    (LcdCommand.NEG_GAMMA_CORRECTION, [0x00, 0x0E, 0x14, 0x03, 0x11, 0x07, 0x31, 0xC1, 0x48, 0x08, 0x0F, 0x0C, 0x31, 0x36, 0x0F]),
-    (LcdCommand.CASET, [0x00, 0x00, 0x01, 0x3F]),
-    (LcdCommand.PASET, [0x00, 0x00, 0x00, 0xEF]),
-    (LcdCommand.SLEEP_OUT, []),
-    (LcdCommand.NOP, []),  # stand-in that means "wait 120ms"
-    (LcdCommand.DISPLAY_ON, []),
+    (LcdCommand.POWER_CTRL_A, [0x39, 0x2C, 0x00, 0x34, 0x02], 0),
+    (LcdCommand.POWER_CTRL_B, [0x00, 0xC1, 0x30], 0),
+    (LcdCommand.DRIVER_TIMING_CTRL_A, [0x85, 0x00, 0x78], 0),
+    (LcdCommand.DRIVER_TIMING_CTRL_B, [0x00, 0x00], 0),
+    (LcdCommand.POWER_ON_SEQ_CTRL, [0x64, 0x03, 0x12, 0x81], 0),
+    (LcdCommand.PUMP_RATIO_CTRL, [0x20], 0),
+    (LcdCommand.POWER_CTRL_1, [0x23], 0),
+    (LcdCommand.POWER_CTRL_2, [0x10], 0),
+    (LcdCommand.VCOM_CTRL_1, [0x3E, 0x28], 0),
+    (LcdCommand.VCOM_CTRL_2, [0x86], 0),
+    (LcdCommand.MEMORY_ACCESS_CTRL, [0x28], 0),
+    (LcdCommand.COLMOD, [0x55], 0),
+    (LcdCommand.FRAME_RATE_CTRL, [0x00, 0x18], 0),
+    (LcdCommand.DISPLAY_FN_CTRL, [0x08, 0x82, 0x27], 0),
+    (LcdCommand.ENABLE_3G, [0x00], 0),
+    (LcdCommand.GAMMA_SET, [0x01], 0),
+    (LcdCommand.POS_GAMMA_CORRECTION, [0x0F, 0x31, 0x2B, 0x0C, 0x0E, 0x08, 0x4E, 0xF1, 0x37, 0x07, 0x10, 0x03, 0x0E, 0x09, 0x00], 0),
+    (LcdCommand.NEG_GAMMA_CORRECTION, [0x00, 0x0E, 0x14, 0x03, 0x11, 0x07, 0x31, 0xC1, 0x48, 0x08, 0x0F, 0x0C, 0x31, 0x36, 0x0F], 0),
+    (LcdCommand.CASET, [0x00, 0x00, 0x01, 0x3F], 0),
+    (LcdCommand.PASET, [0x00, 0x00, 0x00, 0xEF], 0),
+    # No fixed areas; all 320 lines scroll. In landscape, that's along x.
+    (LcdCommand.VSCRDEF, [0x00, 0x00, 0x01, 0x40, 0x00, 0x00], 0),
+    # Initter waits out the 120ms after reset before any of these; once out
+    # of sleep, the panel needs 5ms before the next command.
+    (LcdCommand.SLEEP_OUT, [], 6_000),
+    (LcdCommand.DISPLAY_ON, [], 0),
 ]
 
-LCD_INIT_ROM = []
-for cmd, params in LCD_INIT_SEQUENCE:
-    LCD_INIT_ROM.append(cmd)
-    LCD_INIT_ROM.append(len(params))
-    LCD_INIT_ROM.extend(params)
+
+class BridgeOp(enum.Enum, shape=8):
+    # Each op is followed by its arguments. Multi-byte values are big-endian,
+    # like the panel's own.
+    WINDOW = 0x01  # x0:2 x1:2 y0:2 y1:2; sets the window and starts writing to it
+    FILL = 0x02  # n:1 colour:2; n+1 pixels of RGB565 `colour`
+    RAW = 0x03  # n:1 pixels:2*(n+1); n+1 RGB565 pixels
+    COMMAND = 0x04  # cmd:1 nparams:1 resp_len:1 params:nparams; any command, reading 0-15 back
+    SYNC = 0x05  # replies SYNC once all before it have gone to the panel
+    HOST = 0x06  # takes the panel over from Life, once the frame's done
+    LIFE = 0x07  # hands it back
+    LOAD = 0x08  # addr:2 n:1 cells:n+1; Life's cells from word `addr`, host only
+    STATS = 0x09  # replies STATS and the last snapshot of each of Stats' counters
+    VIEW = 0x0A  # x:2; pans to show the universe from cell column `x`
+
+
+class Stats(data.Struct):
+    # Free-running counters, snapshotted as each generation's frame starts.
+    # All but `gens` and `lcd_bytes` count cycles: `init` until the panel's
+    # up, `render` drawing a frame, `evolve` waiting on Life after it's drawn,
+    # `transition` between the two, `host` with the host in charge, and
+    # `settled` with Life left be once it's settled. Those phases add up to
+    # every cycle.
+    gens: 32
+    init: 32
+    render: 32
+    evolve: 32
+    transition: 32
+    host: 32
+    settled: 32
+    lcd_bytes: 32
+    spi_idle: 32
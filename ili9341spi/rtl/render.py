@@ -0,0 +1,387 @@
+from amaranth import Array, Cat, Module, Mux, Signal
+from amaranth.lib import wiring
+from amaranth.lib.memory import ReadPort
+from amaranth.lib.wiring import In, Out
+
+from .lcd import Lcd
+from .life import Life
+from .proto import LcdCommand
+
+__all__ = ["Render"]
+
+
+class Render(wiring.Component):
+    def __init__(self, *, width, height, cell_size, word_width=1, damage=True,
+                 universe_width=None):
+        # `width` and `height` are of the panel, in pixels; each cell is drawn
+        # as a square of `cell_size` pixels.
+        #
+        # With `damage`, only the span of cells Life reports changed in each
+        # row is drawn, in a window of its own, unless `full` is set at
+        # `start`. Otherwise the whole panel is.
+        #
+        # A `universe_width` wider than the panel (in cells) is shown from
+        # cell column `view`, as of `start`. The panel's scrolled to pan, so
+        # only the strip that comes into view needs drawing as well as any
+        # damage; the panel's memory holds cell x at column x modulo the
+        # panel's width in cells, and is scrolled to match.
+        grid_width = width // cell_size
+        grid_height = height // cell_size
+        universe_width = universe_width or grid_width
+        if universe_width < grid_width:
+            raise ValueError(f"universe width {universe_width} is narrower than the "
+                             f"panel's {grid_width}")
+        if universe_width > grid_width and not damage:
+            raise ValueError("scrolling requires damage")
+
+        self._width = width
+        self._height = height
+        self._cell_size = cell_size
+        self._word_width = word_width
+        self._damage = damage
+        self._universe_width = universe_width
+
+        depth = universe_width * grid_height // word_width
+        signature = {
+            "cells": In(ReadPort.Signature(
+                addr_width=(depth - 1).bit_length(), shape=word_width,
+            )),
+            "damage": In(ReadPort.Signature(
+                addr_width=(grid_height - 1).bit_length(), shape=Life.Damage(universe_width),
+            )),
+            "lcd": Out(Lcd.CmdSignature),
+            "start": In(1),
+            "full": In(1),
+            "busy": Out(1),
+        }
+        if universe_width > grid_width:
+            signature["view"] = In(range(universe_width - grid_width + 1))
+        super().__init__(signature)
+
+    def elaborate(self, platform):
+        m = Module()
+
+        LCD_WIDTH = self._width
+        LCD_HEIGHT = self._height
+        GOL_SIZE = self._cell_size
+        GOL_WIDTH = LCD_WIDTH // GOL_SIZE
+        GOL_HEIGHT = LCD_HEIGHT // GOL_SIZE
+        GOL_WORD = self._word_width
+        UNI_WIDTH = self._universe_width
+        SCROLL = UNI_WIDTH > GOL_WIDTH
+
+        UNI_ROW_WORDS = UNI_WIDTH // GOL_WORD
+        # When scrolled part way into a word, the view straddles one more.
+        FETCH_WORDS = GOL_WIDTH // GOL_WORD + (1 if SCROLL and GOL_WORD > 1 else 0)
+        LINE_WIDTH = FETCH_WORDS * GOL_WORD
+
+        # Rows of cells are fetched into `load` a word at a time, then handed
+        # to the streamer through a one-row slot, so the next row is fetched
+        # while the current one is drawn. Each row is fetched once and its
+        # line buffer drawn as all GOL_SIZE scanlines, once for each span of
+        # it that needs drawing.
+        slot_valid = Signal()
+        slot_line = Signal(LINE_WIDTH)
+        slot_x0 = Signal(range(GOL_WIDTH))
+        slot_x1 = Signal(range(GOL_WIDTH))
+        slot_off = Signal(range(LINE_WIDTH))
+        slot_row = Signal(range(GOL_HEIGHT))
+        slot_window = Signal()
+
+        row = Signal(range(GOL_HEIGHT))
+        m.d.comb += self.damage.addr.eq(row)
+
+        full = Signal()
+        x0 = Signal(range(GOL_WIDTH))
+        x1 = Signal(range(GOL_WIDTH))
+        word = Signal(range(FETCH_WORDS + 1))
+        load = Signal(LINE_WIDTH)
+        rd_pending = Signal()
+
+        # `view` is the first cell column shown, `view_word` and `view_bit`
+        # where it is in the row, and `view_col` the panel column cell it's
+        # drawn at.
+        if SCROLL:
+            view = Signal.like(self.view)
+            shown = Signal.like(self.view)
+            view_word = Signal(range(UNI_ROW_WORDS))
+            view_bit = Signal(range(GOL_WORD))
+            view_col = Signal(range(GOL_WIDTH))
+            scroll_pending = Signal()
+
+            # What's come into view since the last frame, in view columns.
+            strip = Signal()
+            strip_x0 = Signal(range(GOL_WIDTH))
+            strip_x1 = Signal(range(GOL_WIDTH))
+        else:
+            view = view_word = view_bit = view_col = 0
+
+        # Each span to draw in a row may wrap around the panel's edge, so it's
+        # drawn in up to two parts: from `view_col` onwards, and then from the
+        # start. `pieces` are these parts for each span, with the offset into
+        # the line buffer of the cell at each panel column.
+        pieces = []
+
+        def span(sx0, sx1):
+            if not SCROLL:
+                pieces.append((1, sx0, sx1, 0))
+                return
+            cx0 = sx0 + view_col
+            cx1 = sx1 + view_col
+            pieces.append((cx0 < GOL_WIDTH, cx0, Mux(cx1 < GOL_WIDTH, cx1, GOL_WIDTH - 1),
+                           view_bit - view_col))
+            pieces.append((cx1 >= GOL_WIDTH,
+                           Mux(cx0 < GOL_WIDTH, 0, cx0 - GOL_WIDTH), cx1 - GOL_WIDTH,
+                           GOL_WIDTH + view_bit - view_col))
+
+        # Which of the pieces of the row are still to be drawn.
+        damaged = Signal()
+        if SCROLL:
+            span(strip_x0, strip_x1)
+        span(x0, x1)
+        pending = Signal(len(pieces))
+        if SCROLL:
+            spans = [strip, strip, damaged, damaged]
+        else:
+            spans = [1]
+        pending_init = Cat(drawn & valid for drawn, (valid, *_) in zip(spans, pieces))
+
+        def next_row():
+            with m.If(row == GOL_HEIGHT - 1):
+                m.next = "idle"
+            with m.Else():
+                m.d.sync += row.eq(row + 1)
+                if self._damage:
+                    m.next = "damage_read"
+                else:
+                    m.next = "fetch"
+
+        with m.FSM(name="fetch") as fetch_fsm:
+            with m.State("idle"):
+                with m.If(self.start):
+                    m.d.sync += [
+                        row.eq(0),
+                        full.eq(self.full),
+                    ]
+                    if SCROLL:
+                        m.d.sync += [
+                            view.eq(self.view),
+                            shown.eq(self.view),
+                            view_word.eq(self.view // GOL_WORD),
+                            view_bit.eq(self.view % GOL_WORD),
+                            view_col.eq(self.view % GOL_WIDTH),
+                            scroll_pending.eq(self.view != shown),
+                            strip.eq(1),
+                            strip_x0.eq(0),
+                            strip_x1.eq(GOL_WIDTH - 1),
+                        ]
+                        # Panning further than the panel's width is as good
+                        # as a full redraw.
+                        with m.If(~self.full):
+                            with m.If(self.view == shown):
+                                m.d.sync += strip.eq(0)
+                            with m.Elif((self.view > shown) & (self.view - shown < GOL_WIDTH)):
+                                m.d.sync += strip_x0.eq(GOL_WIDTH - (self.view - shown))
+                            with m.Elif((self.view < shown) & (shown - self.view < GOL_WIDTH)):
+                                m.d.sync += strip_x1.eq(shown - self.view - 1)
+                            with m.Else():
+                                m.d.sync += full.eq(1)
+
+                    if self._damage:
+                        m.next = "damage_read"
+                    else:
+                        m.d.sync += [
+                            x0.eq(0),
+                            x1.eq(GOL_WIDTH - 1),
+                            word.eq(0),
+                        ]
+                        m.next = "fetch"
+
+            with m.State("damage_read"):
+                m.next = "damage_check"
+
+            with m.State("damage_check"):
+                damage = self.damage.data
+                # Any damage to draw besides the strip, in view columns.
+                visible = damage.dirty & ~full
+                if SCROLL:
+                    visible &= (damage.x1 >= view) & (damage.x0 <= view + GOL_WIDTH - 1)
+                    m.d.sync += [
+                        x0.eq(Mux(damage.x0 > view, damage.x0 - view, 0)),
+                        x1.eq(Mux(damage.x1 < view + GOL_WIDTH - 1,
+                                  damage.x1 - view, GOL_WIDTH - 1)),
+                        damaged.eq(visible),
+                    ]
+                    draw = strip | visible
+                else:
+                    with m.If(full):
+                        m.d.sync += [
+                            x0.eq(0),
+                            x1.eq(GOL_WIDTH - 1),
+                        ]
+                    with m.Else():
+                        m.d.sync += [
+                            x0.eq(damage.x0),
+                            x1.eq(damage.x1),
+                        ]
+                    draw = full | damage.dirty
+                with m.If(draw):
+                    m.d.sync += word.eq(0)
+                    m.next = "fetch"
+                with m.Else():
+                    next_row()
+
+            with m.State("fetch"):
+                col_word = view_word + word
+                if SCROLL:
+                    col_word = Mux(col_word >= UNI_ROW_WORDS, col_word - UNI_ROW_WORDS, col_word)
+                m.d.comb += self.cells.addr.eq(row * UNI_ROW_WORDS + col_word)
+                m.d.sync += rd_pending.eq(word != FETCH_WORDS)
+                with m.If(rd_pending):
+                    m.d.sync += load.eq(Cat(load[GOL_WORD:], self.cells.data))
+                with m.If(word != FETCH_WORDS):
+                    m.d.sync += word.eq(word + 1)
+                with m.Else():
+                    m.d.sync += pending.eq(pending_init)
+                    m.next = "fetched"
+
+            with m.State("fetched"):
+                # Hand over each piece to be drawn in turn.
+                with m.If(~slot_valid):
+                    for ix, (_, px0, px1, off) in enumerate(pieces):
+                        with (m.If if ix == 0 else m.Elif)(pending[ix]):
+                            m.d.sync += [
+                                slot_valid.eq(1),
+                                slot_line.eq(load),
+                                slot_x0.eq(px0),
+                                slot_x1.eq(px1),
+                                slot_off.eq(off),
+                                slot_row.eq(row),
+                                # Without damage, the one window covering the
+                                # whole panel is set before the first row.
+                                slot_window.eq(1 if self._damage else row == 0),
+                                pending[ix].eq(0),
+                                word.eq(0),
+                            ]
+                            with m.If((pending >> (ix + 1)) == 0):
+                                next_row()
+
+        line = Signal(LINE_WIDTH)
+        off = Signal.like(slot_off)
+        col = Signal(range(LCD_WIDTH))
+        scan = Signal(range(GOL_SIZE))
+        if SCROLL:
+            alive = line.bit_select((col // GOL_SIZE + off)[:len(off)], 1)
+        else:
+            alive = line.bit_select(col // GOL_SIZE, 1)
+
+        win_x0 = Signal(range(LCD_WIDTH))
+        win_x1 = Signal(range(LCD_WIDTH))
+        win_y0 = Signal(range(LCD_HEIGHT))
+        win_y1 = Signal(range(LCD_HEIGHT))
+
+        window = Array([
+            LcdCommand.CASET, win_x0 >> 8, win_x0[:8], win_x1 >> 8, win_x1[:8],
+            LcdCommand.PASET, win_y0 >> 8, win_y0[:8], win_y1 >> 8, win_y1[:8],
+            LcdCommand.MEMORY_WRITE,
+        ])
+        window_ix = Signal(range(len(window)))
+
+        req = Signal(Lcd.Request)
+
+        def take():
+            # Start on the row in the slot, if there's one ready.
+            with m.If(slot_valid):
+                m.d.sync += [
+                    slot_valid.eq(0),
+                    line.eq(slot_line),
+                    off.eq(slot_off),
+                    col.eq(slot_x0 * GOL_SIZE),
+                    scan.eq(0),
+                    win_x0.eq(slot_x0 * GOL_SIZE),
+                    win_x1.eq(slot_x1 * GOL_SIZE + GOL_SIZE - 1),
+                    win_y0.eq(slot_row * GOL_SIZE),
+                    win_y1.eq(slot_row * GOL_SIZE + GOL_SIZE - 1
+                              if self._damage else LCD_HEIGHT - 1),
+                ]
+                with m.If(slot_window):
+                    m.next = "window"
+                with m.Else():
+                    m.next = "render"
+
+        with m.FSM(name="stream") as stream_fsm:
+            with m.State("idle"):
+                if SCROLL:
+                    with m.If(scroll_pending):
+                        m.next = "scroll"
+                    with m.Else():
+                        take()
+                else:
+                    take()
+
+            if SCROLL:
+                # The panel line shown first is the one the view starts at.
+                vsp = Signal(range(LCD_WIDTH))
+                m.d.comb += vsp.eq(view_col * GOL_SIZE)
+                scroll = Array([LcdCommand.VSCRSADD, vsp >> 8, vsp[:8]])
+                scroll_ix = Signal(range(len(scroll)))
+
+                with m.State("scroll"):
+                    m.d.comb += [
+                        req.data.eq(scroll[scroll_ix]),
+                        req.dc.eq(scroll_ix == 0),
+                    ]
+                    with self.lcd.req.Send(m, req):
+                        m.d.sync += scroll_ix.eq(scroll_ix + 1)
+                        with m.If(scroll_ix == len(scroll) - 1):
+                            m.d.sync += [
+                                scroll_ix.eq(0),
+                                scroll_pending.eq(0),
+                            ]
+                            m.next = "idle"
+
+            with m.State("window"):
+                m.d.comb += [
+                    req.data.eq(window[window_ix]),
+                    req.dc.eq((window_ix == 0) | (window_ix == 5) | (window_ix == 10)),
+                ]
+                with self.lcd.req.Send(m, req):
+                    m.d.sync += window_ix.eq(window_ix + 1)
+                    with m.If(window_ix == len(window) - 1):
+                        m.d.sync += window_ix.eq(0)
+                        m.next = "render"
+
+            with m.State("render"):
+                m.d.comb += [
+                    req.data.eq(Mux(alive, 0xff, 0x00)),
+                    req.dc.eq(0),
+                ]
+                with self.lcd.req.Send(m, req):
+                    m.next = "render2"
+
+            with m.State("render2"):
+                m.d.comb += [
+                    req.data.eq(Mux(alive, 0xff, 0x00)),
+                    req.dc.eq(0),
+                ]
+                with self.lcd.req.Send(m, req):
+                    m.next = "render"
+
+                    with m.If(col == win_x1):
+                        m.d.sync += col.eq(win_x0)
+                        with m.If(scan == GOL_SIZE - 1):
+                            m.next = "idle"
+                            take()
+                        with m.Else():
+                            m.d.sync += scan.eq(scan + 1)
+                    with m.Else():
+                        m.d.sync += col.eq(col + 1)
+
+        busy = ~fetch_fsm.ongoing("idle") | slot_valid | ~stream_fsm.ongoing("idle")
+        if SCROLL:
+            busy |= scroll_pending
+        m.d.comb += self.busy.eq(busy)
+        # Without damage, the whole frame's a single window.
+        m.d.comb += self.lcd.lock.eq(~stream_fsm.ongoing("idle") if self._damage else busy)
+
+        return m
@@ -0,0 +1,65 @@
+from amaranth import ClockSignal, Instance, Module, Signal
+from amaranth.lib import wiring
+from amaranth.lib.memory import Memory
+from amaranth.lib.wiring import In, Out
+from amaranth.vendor import SiliconBluePlatform
+
+__all__ = ["Spram"]
+
+
+class Spram(wiring.Component):
+    # The iCE40UP's SPRAM blocks are 16K x 16 bits and single-ported: each
+    # cycle either reads or writes `addr`. Read data comes a cycle later.
+    DEPTH = 16384
+    WIDTH = 16
+
+    def __init__(self, *, depth):
+        if depth > Spram.DEPTH:
+            raise ValueError(f"depth {depth} is more than an SPRAM's {Spram.DEPTH}")
+        self._depth = depth
+
+        super().__init__({
+            "addr": In(range(depth)),
+            "w_data": In(Spram.WIDTH),
+            "w_en": In(1),
+            "r_data": Out(Spram.WIDTH),
+        })
+
+    @staticmethod
+    def available(platform):
+        return isinstance(platform, SiliconBluePlatform) and platform.device.startswith("iCE40UP")
+
+    def elaborate(self, platform):
+        m = Module()
+
+        if Spram.available(platform):
+            address = Signal(range(Spram.DEPTH))
+            m.d.comb += address.eq(self.addr)
+            m.submodules.spram = Instance(
+                "SB_SPRAM256KA",
+                i_ADDRESS=address,
+                i_DATAIN=self.w_data,
+                i_MASKWREN=0b1111,
+                i_WREN=self.w_en,
+                i_CHIPSELECT=1,
+                i_CLOCK=ClockSignal("sync"),
+                i_STANDBY=0,
+                i_SLEEP=0,
+                i_POWEROFF=1,
+                o_DATAOUT=self.r_data,
+            )
+        else:
+            # Elsewhere it's just block RAM, or whatever the simulator does.
+            m.submodules.mem = mem = Memory(shape=Spram.WIDTH, depth=self._depth, init=[])
+            rd = mem.read_port()
+            wr = mem.write_port()
+            m.d.comb += [
+                rd.addr.eq(self.addr),
+                rd.en.eq(~self.w_en),
+                wr.addr.eq(self.addr),
+                wr.data.eq(self.w_data),
+                wr.en.eq(self.w_en),
+                self.r_data.eq(rd.data),
+            ]
+
+        return m
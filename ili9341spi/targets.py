@@ -7,19 +7,45 @@ from amaranth_boards.ulx3s import ULX3S_45F_Platform
 __all__ = ["icebreaker", "ulx3s", "cxxrtl"]
 
 
+# The panel's SPI clock is limited by its serial cycle times, tSCYCW = 100ns
+# for writes and tSCYCR = 150ns for reads: 10MHz and about 6.67MHz.
+
+
 class icebreaker(ICEBreakerPlatform):
-    if False: # XXX: testing DDR SPI and this would make us run probably-too-fast for the LCD>
+    # Life stays at 12MHz, which meets timing; the SPI clock gets its own
+    # domain from the PLL, as near 20MHz as it goes from 12MHz. Halved, that
+    # writes at 9.9375MHz, and reads at half that again.
+    lcd_clk_frequency = 19.875e6
+    lcd_divisor = 2
+    lcd_read_divisor = 4
+    lcd_ddr = False
+    uart_baud = 1_000_000
+
+    if False:
     # if not os.getenv("GITHUB_ACTIONS"):
         # XXX: This meets timing when I build locally, but not on CI?!
         # https://github.com/kivikakk/ili9341spi/actions/runs/9535281535/job/26280812013?pr=1
         default_clk = "SB_HFOSC"
         hfosc_div = 1
+        # The SPI clock's domain is still the PLL's, from 24MHz now.
 
 
 class ulx3s(ULX3S_45F_Platform):
-    pass
+    # 10MHz SPI for writes and 5MHz for reads, from a 40MHz domain off the
+    # PLL.
+    lcd_clk_frequency = 40e6
+    lcd_divisor = 4
+    lcd_read_divisor = 8
+    lcd_ddr = False
+    uart_baud = 1_000_000
 
 
 class cxxrtl(niar.CxxrtlPlatform):
     default_clk_frequency = 1_000_000.0
     uses_zig = True
+    # The simulator drives `spi_clk` itself, twice as fast as `clk`.
+    lcd_clk_frequency = 2_000_000.0
+    lcd_divisor = 1
+    lcd_read_divisor = 1
+    lcd_ddr = False
+    uart_baud = 115_200
@@ -0,0 +1,91 @@
+import numpy as np
+
+from ili9341spi.rtl.proto import LcdCommand
+
+
+class Panel:
+    # Just enough of the ILI9341 to follow CASET, PASET, MEMORY_WRITE and
+    # VSCRSADD, in landscape, where it scrolls along x. Pixels are RGB565, and
+    # UNWRITTEN until something's written there.
+    #
+    # Bytes are fed in with `feed`, or decoded off the pins by `watch`. Each
+    # time a window covering the whole panel is filled, what's on screen is
+    # added to `frames`. As on the panel, writing past the end of a window
+    # wraps round to its start.
+    #
+    # Given `cipo`, `watch` answers READ_DISPLAY_STATUS with `status`: a
+    # dummy clock, then D31 onwards, a bit shifted out on each clock.
+    UNWRITTEN = -1
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.fb = np.full((height, width), Panel.UNWRITTEN, dtype=np.int32)
+        self.frames = []
+        self.cmd = None
+        self.params = []
+        self.window = (0, width - 1, 0, height - 1)
+        self.vsp = 0
+        self.bytes = 0
+        self.status = 0
+        self.status_reads = 0
+
+    def screen(self):
+        return np.roll(self.fb, -self.vsp, axis=1)
+
+    def feed(self, data, dc):
+        self.bytes += 1
+        if dc:
+            self.cmd = data
+            self.params = []
+            if data == LcdCommand.MEMORY_WRITE.value:
+                self.x, _, self.y, _ = self.window
+            return
+
+        self.params.append(data)
+        match self.cmd:
+            case LcdCommand.CASET.value if len(self.params) == 4:
+                self.window = (
+                    self.params[0] << 8 | self.params[1],
+                    self.params[2] << 8 | self.params[3],
+                    *self.window[2:],
+                )
+            case LcdCommand.PASET.value if len(self.params) == 4:
+                self.window = (
+                    *self.window[:2],
+                    self.params[0] << 8 | self.params[1],
+                    self.params[2] << 8 | self.params[3],
+                )
+            case LcdCommand.VSCRSADD.value if len(self.params) == 2:
+                self.vsp = self.params[0] << 8 | self.params[1]
+            case LcdCommand.MEMORY_WRITE.value if len(self.params) == 2:
+                x0, x1, y0, y1 = self.window
+                self.fb[self.y, self.x] = self.params[0] << 8 | self.params[1]
+                self.params = []
+                self.x += 1
+                if self.x > x1:
+                    self.x = x0
+                    self.y += 1
+                    if self.y > y1:
+                        # Writes past the end go round to the start again.
+                        self.y = y0
+                        if self.window == (0, self.width - 1, 0, self.height - 1):
+                            self.frames.append(self.screen())
+
+    async def watch(self, ctx, clk, copi, dc, cipo=None):
+        # Shifts `copi` in on each rising edge of `clk`, taking `dc` with the
+        # last bit of each byte, as the panel does.
+        sr = 0
+        bit = 0
+        out = []
+        async for _, copi_value, dc_value in ctx.posedge(clk).sample(copi, dc):
+            if cipo is not None:
+                ctx.set(cipo, out.pop(0) if out else 0)
+            sr = (sr << 1 | copi_value) & 0xff
+            bit += 1
+            if bit == 8:
+                self.feed(sr, dc_value)
+                bit = 0
+                if dc_value and sr == LcdCommand.READ_DISPLAY_STATUS.value:
+                    out = [0] + [(self.status >> (31 - ix)) & 1 for ix in range(32)]
+                    self.status_reads += 1
@@ -0,0 +1,109 @@
+import random
+import unittest
+
+from amaranth.hdl import Fragment
+from amaranth.sim import Simulator
+
+from ili9341spi.rtl.arbiter import Arbiter
+
+
+class test:
+    simulation = True
+
+
+class TestArbiter(unittest.TestCase):
+    def _run(self, txns, *, policy="priority", start_gaps=None):
+        # Each client sends its transactions in turn, locked, with the client
+        # and transaction numbers in every byte. The last byte of each asks for
+        # one response back, which is the same byte inverted.
+        n = len(txns)
+        dut = Arbiter(n=n, policy=policy)
+        start_gaps = start_gaps or [0] * n
+        sent = []
+        resps = [[] for _ in range(n)]
+
+        def client(ix):
+            async def tb(ctx):
+                port = dut.clients[ix]
+                ctx.set(port.resp.ready, 1)
+                if start_gaps[ix]:
+                    await ctx.tick().repeat(start_gaps[ix])
+                for txn_ix, length in enumerate(txns[ix]):
+                    ctx.set(port.lock, 1)
+                    for byte_ix in range(length):
+                        last = byte_ix == length - 1
+                        ctx.set(port.req.payload, {
+                            "data": (ix << 6) | (txn_ix << 3) | byte_ix,
+                            "dc": byte_ix == 0,
+                            "resp_len": 1 if last else 0,
+                        })
+                        ctx.set(port.req.valid, 1)
+                        await ctx.tick().until(port.req.ready)
+                    ctx.set(port.req.valid, 0)
+                    resp, = await ctx.tick().sample(port.resp.payload).until(port.resp.valid)
+                    resps[ix].append(resp)
+                    # Let go for a cycle between transactions.
+                    ctx.set(port.lock, 0)
+                    await ctx.tick()
+            return tb
+
+        async def panel(ctx):
+            # Answers each request for a response a few cycles on.
+            owed = []
+            while True:
+                ctx.set(dut.lcd.req.ready, random.random() < 0.5)
+                if owed and not ctx.get(dut.lcd.resp.valid):
+                    ctx.set(dut.lcd.resp.payload, owed.pop(0))
+                    ctx.set(dut.lcd.resp.valid, 1)
+                _, _, valid, ready, payload, resp_valid, resp_ready = await ctx.tick().sample(
+                    dut.lcd.req.valid, dut.lcd.req.ready, dut.lcd.req.payload,
+                    dut.lcd.resp.valid, dut.lcd.resp.ready,
+                )
+                if resp_valid and resp_ready:
+                    ctx.set(dut.lcd.resp.valid, 0)
+                if valid and ready:
+                    sent.append(payload.data)
+                    owed += [payload.data ^ 0xff] * payload.resp_len
+
+        async def waiter(ctx):
+            while sum(map(len, resps)) < sum(map(len, txns)):
+                await ctx.tick()
+
+        sim = Simulator(Fragment.get(dut, test()))
+        sim.add_clock(1e-6)
+        for ix in range(n):
+            sim.add_testbench(client(ix), background=True)
+        sim.add_testbench(panel, background=True)
+        sim.add_testbench(waiter)
+        sim.run()
+
+        # Every transaction went out whole, and its response went back to the
+        # client that asked.
+        order = []
+        while sent:
+            ix, txn_ix = sent[0] >> 6, (sent[0] >> 3) & 7
+            length = txns[ix][txn_ix]
+            assert sent[:length] == [(ix << 6) | (txn_ix << 3) | b for b in range(length)]
+            order.append(ix)
+            del sent[:length]
+        for ix in range(n):
+            assert resps[ix] == [
+                ((ix << 6) | (txn_ix << 3) | (length - 1)) ^ 0xff
+                for txn_ix, length in enumerate(txns[ix])
+            ]
+        return order
+
+    def test_priority(self):
+        # Client 0 isn't asking yet when 1 goes first, but after that 2 has to
+        # wait for both of them.
+        order = self._run([[2, 3], [4, 1], [5]], start_gaps=[2, 0, 0])
+        assert order == [1, 0, 1, 0, 2]
+
+    def test_round_robin(self):
+        # Starting from after client 0, as if it'd just been granted.
+        order = self._run([[3, 1, 4, 2], [5, 2, 6], [1, 1]], policy="round_robin")
+        assert order == [1, 2, 0, 1, 2, 0, 1, 0, 0]
+
+    def test_bad_policy(self):
+        with self.assertRaisesRegex(ValueError, r"policy must be one of"):
+            Arbiter(n=2, policy="lottery")
@@ -0,0 +1,76 @@
+import unittest
+
+from ili9341spi import bench
+
+from .top import Top, platform
+
+
+class TestBench(unittest.TestCase):
+    # What the cheaper benches may take, in cycles. Raise one only knowingly;
+    # if something's got faster, lower it to match.
+    BUDGETS = {
+        "lcd_byte": 8,
+        "init": 127_783,
+        "render_full": 154_271,
+        "render_full_bytes": 154_260,
+        "evolve": 380,
+    }
+
+    def _check(self, measured):
+        for name, value in measured.items():
+            if name in self.BUDGETS:
+                with self.subTest(name=name):
+                    self.assertLessEqual(value, self.BUDGETS[name])
+
+    def test_lcd(self):
+        result = bench.bench_lcd()
+        self.assertEqual(result["byte"], 8)
+        self._check({"lcd_byte": result["byte"]})
+
+    def test_initter(self):
+        self._check({"init": bench.bench_initter()["cycles"]})
+
+    def test_frame(self):
+        result = bench.bench_frame(gens=1)
+        self._check(result)
+        # Damage is far cheaper than a full frame, from Top's start at least.
+        self.assertLess(result["render_damage"], result["render_full"] // 10)
+
+    def test_top(self):
+        # The --top path, on the shrunken Top: its first generation's counted.
+        plat = platform()
+        result = bench.bench_top(plat, Top(plat))
+        self.assertEqual(result["gens"], 1)
+        self.assertGreater(result["init"], 0)
+        self.assertGreater(result["render"], 0)
+        self.assertGreater(result["frame_cycles"], 0)
+
+    def test_derive(self):
+        cycles = {
+            "render_full": 1000,
+            "render_full_bytes": 1000,
+            "render_damage": 100,
+            "render_damage_bytes": 90,
+            "evolve": 200,
+        }
+        targets = bench.derive(cycles)
+        # ICEBreaker's SPI clock is 9.9375MHz against sync's 12MHz, so a byte's
+        # nearly 10 cycles of sync.
+        byte = 8 * 12e6 / 9.9375e6
+        self.assertAlmostEqual(targets["icebreaker"]["render_full"], 1000 * byte)
+        self.assertAlmostEqual(targets["icebreaker"]["gens_per_second"], 12e6 / (90 * byte))
+        # ULX3S's is 10MHz against 25MHz, off a 40MHz domain: 20 cycles.
+        self.assertEqual(targets["ulx3s"]["render_full"], 20000)
+        self.assertEqual(targets["ulx3s"]["gens_per_second"], 25e6 / 1800)
+
+    def test_derive_waits_on_life(self):
+        cycles = {
+            "render_full": 1000,
+            "render_full_bytes": 1000,
+            "render_damage": 10,
+            "render_damage_bytes": 10,
+            "evolve": 200,
+            "transition": 5,
+        }
+        targets = bench.derive(cycles)
+        self.assertEqual(targets["icebreaker"]["gens_per_second"], 12e6 / 205)
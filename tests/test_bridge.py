@@ -0,0 +1,269 @@
+import random
+import unittest
+
+from amaranth import Module
+from amaranth.hdl import Fragment
+from amaranth.lib import wiring
+from amaranth.sim import Simulator
+
+from ili9341spi import host
+from ili9341spi.rtl.arbiter import Arbiter
+from ili9341spi.rtl.bridge import Bridge
+from ili9341spi.rtl.life import Life
+from ili9341spi.rtl.proto import BridgeOp, LcdCommand, Stats
+
+from .panel import Panel
+
+
+class test:
+    simulation = True
+
+
+class TestBridge(unittest.TestCase):
+    @staticmethod
+    async def _send(ctx, dut, chunks):
+        # Send each chunk as fast as it's taken, then wait for the SYNC reply
+        # that ends it before going on.
+        ctx.set(dut.tx.ready, 1)
+        for chunk in chunks:
+            for byte in chunk:
+                ctx.set(dut.rx.payload, byte)
+                ctx.set(dut.rx.valid, 1)
+                await ctx.tick().until(dut.rx.ready)
+            ctx.set(dut.rx.valid, 0)
+            if chunk[-1] == BridgeOp.SYNC.value:
+                reply, = await ctx.tick().sample(dut.tx.payload).until(dut.tx.valid)
+                assert reply == BridgeOp.SYNC.value
+
+    @staticmethod
+    async def _panel(ctx, dut, panel, reqs, ready_chance=0.25):
+        # Take requests no faster than the real panel might.
+        while True:
+            ctx.set(dut.lcd.req.ready, random.random() < ready_chance)
+            _, _, valid, ready, payload = await ctx.tick().sample(
+                dut.lcd.req.valid, dut.lcd.req.ready, dut.lcd.req.payload
+            )
+            if valid and ready:
+                reqs.append((payload.data, payload.dc, payload.resp_len))
+                panel.feed(payload.data, payload.dc)
+
+    def _run(self, chunks, panel=None):
+        dut = Bridge(rx_depth=32)
+        panel = panel or Panel(64, 48)
+        reqs = []
+
+        async def sender(ctx):
+            await self._send(ctx, dut, chunks)
+            # Let the last requests drain.
+            await ctx.tick().repeat(100)
+
+        async def panel_tb(ctx):
+            await self._panel(ctx, dut, panel, reqs)
+
+        sim = Simulator(Fragment.get(dut, test()))
+        sim.add_clock(1e-6)
+        sim.add_testbench(sender)
+        sim.add_testbench(panel_tb, background=True)
+        sim.run()
+        return panel, reqs
+
+    def test_frame_round_trip(self):
+        width, height, x, y = 40, 30, 5, 3
+        # Blocks of colour, with a patch of noise.
+        pixels = []
+        for py in range(height):
+            for px in range(width):
+                if 10 <= px < 18 and 8 <= py < 14:
+                    pixels.append(random.randrange(0x10000))
+                else:
+                    pixels.append(host.rgb565(255, 0, 0) if (px // 8 + py // 6) % 2
+                                  else host.rgb565(0, 0, 255))
+
+        encoded = host.encode_frame(pixels, width, height, x=x, y=y)
+        assert len(encoded) < width * height * 2 // 3
+        chunks = list(host.chunks(encoded, 32))
+
+        panel, _ = self._run(chunks)
+        for py in range(height):
+            assert list(panel.fb[y + py, x:x + width]) == pixels[py * width:(py + 1) * width], \
+                f"row {py}"
+        assert panel.fb[y - 1, x] == Panel.UNWRITTEN
+        assert panel.fb[y, x + width] == Panel.UNWRITTEN
+
+    def test_command_passthrough(self):
+        data = (
+            host.command(LcdCommand.MEMORY_ACCESS_CTRL, [0x48]) +
+            host.command(LcdCommand.READ_DISPLAY_ID, resp_len=4) +
+            host.command(0xD9, [0x10, 0x20], resp_len=1) +
+            host.sync()
+        )
+        _, reqs = self._run([data])
+        assert reqs == [
+            (LcdCommand.MEMORY_ACCESS_CTRL.value, 1, 0), (0x48, 0, 0),
+            (LcdCommand.READ_DISPLAY_ID.value, 1, 4),
+            (0xD9, 1, 0), (0x10, 0, 0), (0x20, 0, 1),
+        ]
+
+    def test_host_mode(self):
+        dut = Bridge()
+
+        async def testbench(ctx):
+            for op, expected in [
+                (host.host(), 1),
+                (host.fill(0x1234, 3), 1),
+                (host.life(), 0),
+            ]:
+                for byte in op:
+                    ctx.set(dut.rx.payload, byte)
+                    ctx.set(dut.rx.valid, 1)
+                    await ctx.tick().until(dut.rx.ready)
+                ctx.set(dut.rx.valid, 0)
+                ctx.set(dut.lcd.req.ready, 1)
+                await ctx.tick().repeat(10)
+                assert ctx.get(dut.host) == expected
+
+        sim = Simulator(Fragment.get(dut, test()))
+        sim.add_clock(1e-6)
+        sim.add_testbench(testbench)
+        sim.run()
+
+    def test_load(self):
+        width, height, word_width = 32, 6, 16
+        dut = Bridge(word_width=word_width)
+        cells = [random.random() < 0.4 for _ in range(width * height)]
+        data = host.load(cells, word_width=word_width, span=8)
+        assert len(list(host._ops(data))) == 3
+
+        async def sender(ctx):
+            for byte in data:
+                ctx.set(dut.rx.payload, byte)
+                ctx.set(dut.rx.valid, 1)
+                await ctx.tick().until(dut.rx.ready)
+            ctx.set(dut.rx.valid, 0)
+
+        async def loader(ctx):
+            loaded = {}
+            while len(loaded) < width * height // word_width:
+                # Not always taken straight away.
+                ctx.set(dut.load.ready, random.random() < 0.5)
+                _, _, valid, ready, payload = await ctx.tick().sample(
+                    dut.load.valid, dut.load.ready, dut.load.payload
+                )
+                if valid and ready:
+                    assert payload.addr not in loaded
+                    loaded[payload.addr] = payload.data
+            assert [loaded[addr] for addr in range(len(loaded))] == \
+                Life.pack(cells, word_width)
+
+        sim = Simulator(Fragment.get(dut, test()))
+        sim.add_clock(1e-6)
+        sim.add_testbench(sender, background=True)
+        sim.add_testbench(loader)
+        sim.run()
+
+    def test_stats(self):
+        dut = Bridge()
+        counters = {name: random.randrange(1 << 32) for name, _ in Stats.as_shape()}
+
+        async def testbench(ctx):
+            for name, value in counters.items():
+                ctx.set(getattr(dut.stats, name), value)
+            ctx.set(dut.rx.payload, BridgeOp.STATS.value)
+            ctx.set(dut.rx.valid, 1)
+            await ctx.tick().until(dut.rx.ready)
+            ctx.set(dut.rx.valid, 0)
+
+            # Not always taken straight away.
+            reply = bytearray()
+            while len(reply) < host.STATS_REPLY_LEN:
+                ctx.set(dut.tx.ready, random.random() < 0.5)
+                _, _, valid, ready, payload = await ctx.tick().sample(
+                    dut.tx.valid, dut.tx.ready, dut.tx.payload
+                )
+                if valid and ready:
+                    reply.append(payload)
+            assert host.parse_stats(reply) == counters
+
+        sim = Simulator(Fragment.get(dut, test()))
+        sim.add_clock(1e-6)
+        sim.add_testbench(testbench)
+        sim.run()
+
+    def test_lets_go_after_drawing(self):
+        # Sharing the panel with Render, as in Top: once the host's window is
+        # drawn and synced, Render gets its turn even though the host's sent
+        # nothing since.
+        m = Module()
+        m.submodules.bridge = dut = Bridge()
+        m.submodules.arbiter = arbiter = Arbiter(n=2)
+        wiring.connect(m, wiring.flipped(dut.lcd), arbiter.clients[0])
+        render = arbiter.clients[1]
+        panel = Panel(64, 48)
+        reqs = []
+
+        async def sender(ctx):
+            await self._send(ctx, dut, [host.window(0, 3, 0, 0) + host.fill(0x1234, 4) +
+                                        host.sync()])
+            ctx.set(render.lock, 1)
+            ctx.set(render.req.payload, {"data": LcdCommand.CASET.value, "dc": 1})
+            ctx.set(render.req.valid, 1)
+            for _ in range(100):
+                _, _, ready = await ctx.tick().sample(render.req.ready)
+                if ready:
+                    break
+            else:
+                self.fail("Render never got the panel")
+            ctx.set(render.req.valid, 0)
+            ctx.set(render.lock, 0)
+            await ctx.tick().repeat(10)
+
+        async def panel_tb(ctx):
+            await self._panel(ctx, arbiter, panel, reqs)
+
+        sim = Simulator(Fragment.get(m, test()))
+        sim.add_clock(1e-6)
+        sim.add_testbench(sender)
+        sim.add_testbench(panel_tb, background=True)
+        sim.run()
+
+        assert list(panel.fb[0, :4]) == [0x1234] * 4
+        assert reqs[-1] == (LcdCommand.CASET.value, 1, 0)
+
+    def test_command_resp_len_limited(self):
+        assert host.command(LcdCommand.READ_DISPLAY_ID, resp_len=15)[3] == 15
+        with self.assertRaises(ValueError):
+            host.command(LcdCommand.READ_DISPLAY_ID, resp_len=16)
+
+    def test_word_width_must_be_bytes(self):
+        with self.assertRaises(ValueError):
+            Bridge(word_width=12)
+
+    def test_parse_rle(self):
+        glider = """
+#N Glider
+#C A comment.
+x = 3, y = 3, rule = B3/S23
+bob$2bo$3o!
+"""
+        width, height, alive = host.parse_rle(glider.strip())
+        assert (width, height) == (3, 3)
+        assert alive == {(1, 0), (2, 1), (0, 2), (1, 2), (2, 2)}
+
+        _, _, alive = host.parse_rle("x = 4, y = 4\n2o$$2b2o!")
+        assert alive == {(0, 0), (1, 0), (2, 2), (3, 2)}
+
+    def test_seed(self):
+        pattern = (3, 1, {(0, 0), (1, 0), (2, 0)})
+        data = host.seed(pattern, 16, 4, word_width=8)
+        ops = list(host._ops(data))
+        assert ops[0] == host.host() and ops[-1] == host.life()
+        # Centred: row 1, columns 6 to 8.
+        assert b"".join(op[4:] for op in ops[1:-1]) == bytes([0, 0, 0xc0, 0x01, 0, 0, 0, 0])
+
+    def test_encode_pixels(self):
+        a, b, c = 0x1111, 0x2222, 0x3333
+        assert host.encode_pixels([a] * 300 + [b, c, b] + [c] * 3) == (
+            host.fill(a, 256) + host.fill(a, 44) +
+            host.raw([b, c, b]) +
+            host.fill(c, 3)
+        )
@@ -0,0 +1,140 @@
+import unittest
+
+from amaranth import Module
+from amaranth.hdl import Fragment
+from amaranth.lib import wiring
+from amaranth.sim import Simulator
+
+from ili9341spi.rtl.initter import Initter
+from ili9341spi.rtl.lcd import Lcd
+from ili9341spi.rtl.proto import LCD_INIT_SEQUENCE, LcdCommand
+
+from .panel import Panel
+
+
+class test:
+    simulation = True
+    default_clk_frequency = 100_000.0
+
+
+def cycles(us):
+    return int((us * test.default_clk_frequency) // 1_000_000)
+
+
+class TestInitter(unittest.TestCase):
+    @staticmethod
+    async def _collect(ctx, dut):
+        # Accept everything sent, noting the cycle each command went out in.
+        ctx.set(dut.lcd.req.ready, 1)
+        cycle = 0
+        reset_end = None
+        sent = []
+        while not ctx.get(dut.done):
+            _, _, res, valid, payload = await ctx.tick().sample(
+                dut.res, dut.lcd.req.valid, dut.lcd.req.payload
+            )
+            cycle += 1
+            if res:
+                reset_end = cycle
+            if not valid:
+                continue
+            if payload.dc:
+                sent.append((cycle, payload.data, []))
+            else:
+                sent[-1][2].append(payload.data)
+        return reset_end, sent
+
+    @staticmethod
+    def _run(dut, testbench):
+        sim = Simulator(Fragment.get(dut, test()))
+        sim.add_clock(1e-6)
+        sim.add_testbench(testbench)
+        sim.run()
+
+    def _run_sequence(self, sequence=LCD_INIT_SEQUENCE):
+        dut = Initter(sequence=sequence)
+
+        async def testbench(ctx):
+            reset_end, sent = await self._collect(ctx, dut)
+
+            assert [(cmd, params) for _, cmd, params in sent] == [
+                (cmd.value if isinstance(cmd, LcdCommand) else cmd, params)
+                for cmd, params, _ in sequence
+            ]
+
+            # SLEEP_OUT can't go within 120ms of reset, though it needn't
+            # be the first thing that waits.
+            for at, cmd, _ in sent:
+                if cmd == LcdCommand.SLEEP_OUT.value:
+                    assert at - reset_end >= cycles(120_000)
+            assert sent[0][0] - reset_end <= cycles(121_000) + 2
+
+            for (at, cmd, params), (next_at, _, _), (_, _, delay) in \
+                    zip(sent, sent[1:], sequence):
+                # A cycle per byte, plus one each to read the parameter count
+                # and move on from the parameters, and one more to leave any
+                # delay.
+                gap = next_at - at - len(params) - 3
+                assert gap == (cycles(delay) + 1 if delay else 0), f"after {cmd:02x}"
+
+        self._run(dut, testbench)
+
+    def test_sequence_and_delays(self):
+        self._run_sequence()
+
+    def test_user_sequence(self):
+        self._run_sequence([
+            (LcdCommand.SOFTWARE_RESET, [], 5_000),
+            (0xC0, [0x17, 0x15], 0),
+            (LcdCommand.SLEEP_OUT, [], 120_000),
+            (LcdCommand.COLMOD, [0x55], 0),
+            (LcdCommand.DISPLAY_ON, [], 25_000),
+        ])
+
+    def test_polls_status(self):
+        # Through a real Lcd to the panel's pins, so the status is decoded as
+        # it's framed: a dummy clock, then D31 onwards.
+        m = Module()
+        m.submodules.initter = initter = Initter(poll_status=True)
+        m.submodules.lcd = lcd = Lcd()
+        wiring.connect(m, wiring.flipped(initter.lcd), lcd.cmd)
+
+        # Booster on and normal mode, but still asleep until the third poll.
+        panel = Panel(1, 1)
+        panel.status = (1 << 31) | (1 << 24) | (1 << 16)
+        awake = panel.status | (1 << 17)
+
+        async def testbench(ctx):
+            cycle = 0
+            sent = []
+            while not ctx.get(initter.done):
+                _, _, valid, ready, payload = await ctx.tick().sample(
+                    initter.lcd.req.valid, initter.lcd.req.ready, initter.lcd.req.payload
+                )
+                cycle += 1
+                if valid and ready and payload.dc:
+                    sent.append((cycle, payload.data))
+                if panel.status_reads == 2:
+                    panel.status = awake
+            cmds = [cmd for _, cmd in sent]
+
+            sleep_out_ix = cmds.index(LcdCommand.SLEEP_OUT.value)
+            assert cmds[sleep_out_ix + 1:] == [
+                LcdCommand.READ_DISPLAY_STATUS.value,
+            ] * 3 + [
+                LcdCommand.DISPLAY_ON.value,
+            ]
+            assert panel.status_reads == 3
+            # Nothing's sent within 5ms of SLEEP_OUT, but there's no blind
+            # wait after.
+            assert sent[sleep_out_ix + 1][0] - sent[sleep_out_ix][0] >= cycles(5_000)
+            assert sent[-1][0] - sent[sleep_out_ix][0] < cycles(5_000) + 200
+
+        async def watcher(ctx):
+            await panel.watch(ctx, lcd.pin.clk, lcd.pin.copi, lcd.pin.dc, lcd.pin.cipo)
+
+        sim = Simulator(Fragment.get(m, test()))
+        sim.add_clock(1e-6)
+        sim.add_testbench(testbench)
+        sim.add_testbench(watcher, background=True)
+        sim.run()
@@ -1,6 +1,7 @@
 import random
 import unittest
 
+from amaranth import ClockDomain, ClockSignal, Elaboratable, Module, Mux, Signal
 from amaranth.hdl import Fragment
 from amaranth.sim import Simulator
 
@@ -11,13 +12,72 @@ class test:
     simulation = True
 
 
+class Harness(Elaboratable):
+    # Presents the pins as the panel sees them, counting cycles of the SPI
+    # clock's domain so bubbles can be measured. For DDR, models the I/O
+    # registers Top puts in front.
+    def __init__(self, **kwargs):
+        self.dut = Lcd(**kwargs)
+        self.ddr = kwargs.get("ddr", False)
+        self.domain = kwargs.get("domain", "sync")
+
+        self.cycles = Signal(32)
+        self.clk = Signal()
+        self.copi = Signal()
+        self.dc = Signal()
+        self.cipo = Signal()
+
+    def elaborate(self, platform):
+        m = Module()
+        m.submodules.dut = dut = self.dut
+
+        if self.domain != "sync":
+            m.domains += ClockDomain(self.domain)
+
+        m.d[self.domain] += self.cycles.eq(self.cycles + 1)
+
+        if self.ddr:
+            clk_o = Signal(2)
+            m.d[self.domain] += [
+                clk_o.eq(dut.pin.clk),
+                self.copi.eq(dut.pin.copi),
+                self.dc.eq(dut.pin.dc),
+                dut.pin.cipo.eq(self.cipo),
+            ]
+            m.d.comb += self.clk.eq(Mux(ClockSignal(self.domain), clk_o[0], clk_o[1]))
+        else:
+            m.d.comb += [
+                self.clk.eq(dut.pin.clk),
+                self.copi.eq(dut.pin.copi),
+                self.dc.eq(dut.pin.dc),
+                dut.pin.cipo.eq(self.cipo),
+            ]
+
+        return m
+
+
 class TestLcd(unittest.TestCase):
+    RATIOS = [
+        {"divisor": 1},
+        {"divisor": 1, "ddr": True},
+        {"divisor": 2},
+        {"divisor": 4},
+        {"divisor": 8},
+        {"divisor": 1, "read_divisor": 2},
+        {"divisor": 2, "read_divisor": 4},
+    ]
+
+    # The SPI clock's domain at various speeds relative to sync.
+    DOMAINS = [
+        {"domain": "spi", "spi_period": 0.4e-6},
+        {"domain": "spi", "spi_period": 0.7e-6, "ddr": True},
+        {"domain": "spi", "spi_period": 2.3e-6, "divisor": 2},
+        {"domain": "spi", "spi_period": 0.4e-6, "divisor": 2, "read_divisor": 4},
+    ]
+
     @staticmethod
-    async def _snd(ctx, dut, bytes, rcv_cnt=0):
+    async def _feed(ctx, dut, bytes, rcv_cnt=0, gap=0):
         for byte_ix, byte in enumerate(bytes):
-            await ctx.tick()
-            assert ctx.get(dut.cmd.req.ready) == 1
-
             ctx.set(dut.cmd.req.payload.data, byte)
             ctx.set(dut.cmd.req.payload.dc, byte_ix == 0)
             ctx.set(
@@ -25,82 +85,174 @@ class TestLcd(unittest.TestCase):
                 rcv_cnt if byte_ix == len(bytes) - 1 else 0,
             )
             ctx.set(dut.cmd.req.valid, 1)
+            await ctx.tick().until(dut.cmd.req.ready)
 
-            for bit_ix in range(8):
+            ctx.set(dut.cmd.req.valid, 0)
+            for _ in range(gap):
                 await ctx.tick()
-                assert ctx.get(dut.cmd.req.ready) == 0
 
-                ctx.set(dut.cmd.req.valid, 0)
+    @staticmethod
+    async def _snd(ctx, h, bytes):
+        # Sample copi and dc on each rising edge of the SPI clock, like the
+        # panel does, noting which sync cycle each bit went out in.
+        divisor = h.dut._divisor
+        started = None
+        for byte_ix, byte in enumerate(bytes):
+            for bit_ix in range(8):
+                await ctx.posedge(h.clk)
+                if started is None:
+                    started = ctx.get(h.cycles)
 
-                assert ctx.get(dut.pin.copi) == (
+                assert ctx.get(h.cycles) == started + (byte_ix * 8 + bit_ix) * divisor, \
+                    f"snd bubble @ {byte_ix}:{bit_ix}"
+                assert ctx.get(h.copi) == (
                     (byte >> (7 - bit_ix)) & 1
                 ), f"snd pins.copi @ {byte_ix}:{bit_ix}"
-                if bit_ix == 7:
-                    assert ctx.get(dut.pin.dc) == (
-                        byte_ix == 0
-                    ), f"snd pins.dc @ {byte_ix}"
-
-        await ctx.tick()
-        assert ctx.get(dut.pin.clk) == 0
-        assert ctx.get(dut.cmd.req.ready) == (rcv_cnt == 0)
+                assert ctx.get(h.dc) == (
+                    byte_ix == 0
+                ), f"snd pins.dc @ {byte_ix}:{bit_ix}"
 
     @staticmethod
-    async def _rcv(ctx, dut, bytes):
+    async def _rcv(ctx, h, bytes):
+        # The panel shifts a bit out on each SPI clock, eight to a byte with
+        # nothing in between. Within a byte, the clock's at the read rate.
+        divisor = h.dut._read_divisor
         for byte_ix, byte in enumerate(bytes):
             for bit_ix in range(8):
-                assert ctx.get(dut.pin.clk) == 0, f"rcv pins.clk @ {byte_ix}:{bit_ix}"
-                assert ctx.get(
-                    dut.cmd.req.ready == 0
-                ), f"rcv req.ready @ {byte_ix}:{bit_ix}"
-
-                ctx.set(dut.pin.cipo, (byte >> (7 - bit_ix)) & 1)
-
-                await ctx.tick()
+                await ctx.posedge(h.clk)
+                if bit_ix:
+                    assert ctx.get(h.cycles) == last + divisor, \
+                        f"rcv clock @ {byte_ix}:{bit_ix}"
+                last = ctx.get(h.cycles)
+                ctx.set(h.cipo, (byte >> (7 - bit_ix)) & 1)
 
-            assert ctx.get(dut.cmd.resp.valid) == 1, f"rcv resp.valid @ {byte_ix}"
-            assert (
-                ctx.get(dut.cmd.resp.payload) == byte
-            ), f"rcv resp.payload @ {byte_ix}"
-
-            await ctx.tick()
+    @staticmethod
+    async def _collect(ctx, dut, bytes, ready_chance=1):
+        # Accept responses, with `ready` asserted at random on some cycles.
+        for byte_ix, byte in enumerate(bytes):
+            for _ in range(10_000):
+                ctx.set(dut.cmd.resp.ready, random.random() < ready_chance)
+                _, _, valid, ready, payload = await ctx.tick().sample(
+                    dut.cmd.resp.valid, dut.cmd.resp.ready, dut.cmd.resp.payload
+                )
+                if valid and ready:
+                    break
+            else:
+                raise AssertionError(f"rcv resp lost @ {byte_ix}")
+            assert payload == byte, f"rcv resp.payload @ {byte_ix}"
+        ctx.set(dut.cmd.resp.ready, 0)
 
     @staticmethod
-    def _run(tb_with_dut):
-        dut = Lcd()
+    async def _idle(ctx, h):
+        # Let the last SPI clock period finish first, and the request queue's
+        # read pointer make it back to sync.
+        await ctx.tick(h.domain).repeat(h.dut._read_divisor + 3)
+        for _ in range(10):
+            await ctx.tick(h.domain)
+            assert ctx.get(h.clk) == 0
+            assert ctx.get(h.dut.idle) == 1
+            assert ctx.get(h.dut.cmd.req.ready) == 1
 
-        async def testbench(ctx):
-            await tb_with_dut(ctx, dut)
+    @staticmethod
+    def _run(*tbs_with_h, spi_period=None, **kwargs):
+        h = Harness(**kwargs)
 
-        sim = Simulator(Fragment.get(dut, test()))
+        sim = Simulator(Fragment.get(h, test()))
         sim.add_clock(1e-6)
-        sim.add_testbench(testbench)
+        if spi_period is not None:
+            sim.add_clock(spi_period, domain=h.domain)
+        for tb_with_h in tbs_with_h:
+            async def testbench(ctx, tb_with_h=tb_with_h):
+                await tb_with_h(ctx, h)
+            sim.add_testbench(testbench)
         sim.run()
 
-    def test_transmits_1_byte(self):
-        async def testbench(ctx, dut):
-            await self._snd(ctx, dut, list(random.randbytes(1)))
+    def _run_snd(self, bytes, gap=0, ratios=RATIOS):
+        for kwargs in ratios:
+            with self.subTest(**kwargs, gap=gap):
+                async def feeder(ctx, h):
+                    await self._feed(ctx, h.dut, bytes, gap=gap)
 
-        self._run(testbench)
+                async def checker(ctx, h):
+                    await self._snd(ctx, h, bytes)
+                    await self._idle(ctx, h)
+
+                self._run(feeder, checker, **kwargs)
+
+    def test_transmits_1_byte(self):
+        self._run_snd(list(random.randbytes(1)))
 
     def test_transmits_2_bytes(self):
-        async def testbench(ctx, dut):
-            await self._snd(ctx, dut, list(random.randbytes(2)))
+        self._run_snd(list(random.randbytes(2)))
 
-        self._run(testbench)
+    def test_burst_is_8_clocks_per_byte(self):
+        self._run_snd(list(random.randbytes(32)))
 
-    def test_receive_1_byte_resp(self):
-        async def testbench(ctx, dut):
-            await self._snd(ctx, dut, list(random.randbytes(1)), 1)
-            await self._rcv(ctx, dut, list(random.randbytes(1)))
+    def test_burst_with_slow_producer(self):
+        # The request queue lets a producer take up to a byte time per request
+        # without opening a gap on the wire.
+        for gap in range(7):
+            self._run_snd(list(random.randbytes(16)), gap=gap)
 
-        self._run(testbench)
+    def _run_rcv(self, snd_bytes, rcv_bytes, then=(), ready_chance=1, resp_depth=4,
+                 ratios=RATIOS):
+        for kwargs in ratios:
+            kwargs = {**kwargs, "resp_depth": resp_depth}
+            with self.subTest(**kwargs):
+                async def feeder(ctx, h):
+                    await self._feed(ctx, h.dut, snd_bytes, len(rcv_bytes))
+                    await self._feed(ctx, h.dut, list(then))
+
+                async def panel(ctx, h):
+                    await self._snd(ctx, h, snd_bytes)
+                    await self._rcv(ctx, h, rcv_bytes)
+                    if then:
+                        await self._snd(ctx, h, list(then))
+                    await self._idle(ctx, h)
+
+                async def collector(ctx, h):
+                    await self._collect(ctx, h.dut, rcv_bytes, ready_chance)
+
+                self._run(feeder, panel, collector, **kwargs)
+
+    def test_receive_1_byte_resp(self):
+        self._run_rcv(list(random.randbytes(1)), list(random.randbytes(1)))
 
     def test_receive_2_byte_resp(self):
-        async def testbench(ctx, dut):
-            # TODO: optional cycle delay between send/receive. The datasheet is
-            # ambiguous as to whether or not it should be just one cycle, or an
-            # entire byte.
-            await self._snd(ctx, dut, list(random.randbytes(1)), 2)
-            await self._rcv(ctx, dut, list(random.randbytes(2)))
-
-        self._run(testbench)
+        self._run_rcv(list(random.randbytes(1)), list(random.randbytes(2)))
+
+    def test_request_queued_behind_resp(self):
+        self._run_rcv(
+            list(random.randbytes(1)), list(random.randbytes(2)), random.randbytes(3)
+        )
+
+    def test_receive_into_slow_consumer(self):
+        # The SPI clock stalls whenever the response queue fills, so nothing's
+        # lost however rarely the consumer's ready.
+        for resp_depth in [1, 2, 4]:
+            for ready_chance in [0.5, 0.1, 0.02]:
+                self._run_rcv(
+                    list(random.randbytes(1)), list(random.randbytes(12)),
+                    random.randbytes(2), ready_chance=ready_chance, resp_depth=resp_depth,
+                )
+
+    def test_separate_domain(self):
+        # Requests and responses cross into and out of the SPI clock's own
+        # domain, which needn't be any relation to sync.
+        self._run_snd(list(random.randbytes(32)), ratios=self.DOMAINS)
+        self._run_rcv(
+            list(random.randbytes(1)), list(random.randbytes(6)), random.randbytes(2),
+            ready_chance=0.3, ratios=self.DOMAINS,
+        )
+
+    def test_bad_ratios(self):
+        with self.assertRaises(ValueError):
+            Lcd(divisor=3)
+        with self.assertRaises(ValueError):
+            Lcd(divisor=2, ddr=True)
+        with self.assertRaises(ValueError):
+            Lcd(divisor=1, read_divisor=3)
+        with self.assertRaises(ValueError):
+            Lcd(divisor=4, read_divisor=2)
+        with self.assertRaises(ValueError):
+            Lcd(divisor=1, read_divisor=2, ddr=True)
@@ -0,0 +1,423 @@
+import random
+import unittest
+
+import numpy as np
+from amaranth.hdl import Fragment
+from amaranth.sim import Simulator
+
+from ili9341spi.rtl.life import Life
+
+
+class test:
+    simulation = True
+
+
+def life_run(grid, gens=1):
+    # The reference: `grid` is a 2D array of cells, stepped `gens`
+    # generations on the torus, a whole generation at a time.
+    grid = np.asarray(grid, dtype=bool)
+    for _ in range(gens):
+        n = sum(np.roll(grid, (dy, dx), axis=(0, 1)).astype(np.uint8)
+                for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dy or dx)
+        grid = (n == 3) | ((n == 2) & grid)
+    return grid
+
+
+def life_step(cells, width, height):
+    return life_run(np.reshape(cells, (height, width))).ravel().tolist()
+
+
+class TestLife(unittest.TestCase):
+    @staticmethod
+    async def _read_cells(ctx, dut, count):
+        word_width = dut._word_width
+        cells = []
+        for addr in range(count // word_width):
+            ctx.set(dut.cells.addr, addr)
+            await ctx.tick()
+            word = ctx.get(dut.cells.data)
+            cells.extend(bool((word >> bit) & 1) for bit in range(word_width))
+        return cells
+
+    @staticmethod
+    async def _read_grid(ctx, dut):
+        cells = await TestLife._read_cells(ctx, dut, dut._width * dut._height)
+        return np.reshape(cells, (dut._height, dut._width))
+
+    @staticmethod
+    async def _check_gens(ctx, dut, init, gens):
+        # Steps `gens` generations, reading each back whole and diffing it
+        # against the reference.
+        expected = np.reshape(init, (dut._height, dut._width))
+        for gen in range(1, gens + 1):
+            await TestLife._step(ctx, dut)
+            expected = life_run(expected)
+            wrong = np.argwhere(await TestLife._read_grid(ctx, dut) != expected)
+            assert not len(wrong), \
+                f"generation {gen}: {len(wrong)} cells wrong, first at (x, y) = " \
+                f"({wrong[0][1]}, {wrong[0][0]})"
+
+    @staticmethod
+    async def _read_damage(ctx, dut):
+        damage = []
+        for row in range(dut._height):
+            ctx.set(dut.damage.addr, row)
+            await ctx.tick()
+            entry = ctx.get(dut.damage.data)
+            damage.append((entry.x0, entry.x1) if entry.dirty else None)
+        return damage
+
+    @staticmethod
+    async def _step(ctx, dut, swap=True):
+        ctx.set(dut.step, 1)
+        await ctx.tick()
+        ctx.set(dut.step, 0)
+        cycles = 1
+        while ctx.get(dut.busy):
+            await ctx.tick()
+            cycles += 1
+        if swap:
+            ctx.set(dut.swap, 1)
+            await ctx.tick()
+            ctx.set(dut.swap, 0)
+        return cycles
+
+    def _run_gens(self, width, height, gens, word_width=1, spram=False):
+        init = [random.random() < 0.4 for _ in range(width * height)]
+        dut = Life(width=width, height=height, word_width=word_width, init=init,
+                   spram=spram)
+
+        async def testbench(ctx):
+            # Spram's written with `init` first.
+            await ctx.tick().until(~dut.busy)
+            assert await self._read_cells(ctx, dut, width * height) == init
+            await self._check_gens(ctx, dut, init, gens)
+
+        sim = Simulator(Fragment.get(dut, test()))
+        sim.add_clock(1e-6)
+        sim.add_testbench(testbench)
+        sim.run()
+
+    def test_generations_alternate_banks(self):
+        for word_width in [1, 2, 4, 8]:
+            with self.subTest(word_width=word_width):
+                self._run_gens(8, 6, 4, word_width)
+
+    def test_generations_in_spram(self):
+        self._run_gens(32, 6, 4, 16, spram=True)
+
+    def test_spram_init_is_sparse(self):
+        # Mostly empty, as the initial pattern usually is.
+        width, height = 64, 8
+        init = [False] * (width * height)
+        for x, y in [(0, 0), (1, 0), (2, 0), (40, 5), (63, 7)]:
+            init[y * width + x] = True
+        dut = Life(width=width, height=height, word_width=16, init=init, spram=True)
+
+        async def testbench(ctx):
+            await ctx.tick().until(~dut.busy)
+            assert await self._read_cells(ctx, dut, width * height) == init
+
+        sim = Simulator(Fragment.get(dut, test()))
+        sim.add_clock(1e-6)
+        sim.add_testbench(testbench)
+        sim.run()
+
+    def test_start_pattern(self):
+        # Top's universe, from Top's start, for long enough that the gun's
+        # fired a few gliders. Wrapping's covered by test_generations_wrap.
+        width, height = 80, 60
+        init = Life.start_cells(width, height)
+        dut = Life(width=width, height=height, word_width=16, init=init)
+
+        async def testbench(ctx):
+            await self._check_gens(ctx, dut, init, 60)
+
+        sim = Simulator(Fragment.get(dut, test()))
+        sim.add_clock(1e-6)
+        sim.add_testbench(testbench)
+        sim.run()
+
+    def test_reference(self):
+        # A blinker blinks, and a glider on Top's 80x60 torus moves a cell
+        # diagonally every 4 generations, so it's back where it started after
+        # 4 * lcm(80, 60).
+        blinker = np.zeros((5, 5), dtype=bool)
+        blinker[2, 1:4] = True
+        assert (life_run(blinker) == blinker.T).all()
+        assert (life_run(blinker, 2) == blinker).all()
+
+        glider = np.zeros((60, 80), dtype=bool)
+        for x, y in [(1, 0), (2, 1), (0, 2), (1, 2), (2, 2)]:
+            glider[y, x] = True
+        assert (life_run(glider, 4) == np.roll(glider, (1, 1), axis=(0, 1))).all()
+        assert (life_run(glider, 4 * 240) == glider).all()
+
+    def test_generations_wrap(self):
+        for word_width in [1, 5]:
+            with self.subTest(word_width=word_width):
+                self._run_gens(5, 3, 3, word_width)
+
+    def test_streams_a_word_per_cycle(self):
+        width, height = 32, 12
+        for word_width in [1, 8, 16]:
+            with self.subTest(word_width=word_width):
+                dut = Life(width=width, height=height, word_width=word_width)
+
+                async def testbench(ctx):
+                    cycles = await self._step(ctx, dut)
+                    # A word per cycle plus one per row, three rows to fill the
+                    # window, and one cycle to start.
+                    assert cycles == (height + 3) * (width // word_width + 1) + 1, cycles
+
+                sim = Simulator(Fragment.get(dut, test()))
+                sim.add_clock(1e-6)
+                sim.add_testbench(testbench)
+                sim.run()
+
+    def test_reads_current_gen_while_evolving(self):
+        width, height, word_width = 16, 8, 4
+        init = [random.random() < 0.4 for _ in range(width * height)]
+        dut = Life(width=width, height=height, word_width=word_width, init=init)
+
+        async def stepper(ctx):
+            await self._step(ctx, dut, swap=False)
+
+        async def reader(ctx):
+            await ctx.tick().until(dut.busy)
+            assert await self._read_cells(ctx, dut, width * height) == init
+            assert ctx.get(dut.busy)
+
+            await ctx.tick().until(~dut.busy)
+            assert await self._read_cells(ctx, dut, width * height) == init
+            ctx.set(dut.swap, 1)
+            await ctx.tick()
+            ctx.set(dut.swap, 0)
+            assert await self._read_cells(ctx, dut, width * height) == \
+                life_step(init, width, height)
+
+        sim = Simulator(Fragment.get(dut, test()))
+        sim.add_clock(1e-6)
+        sim.add_testbench(stepper)
+        sim.add_testbench(reader)
+        sim.run()
+
+    def test_records_damage(self):
+        width, height = 16, 10
+        for word_width in [1, 4, 16]:
+            with self.subTest(word_width=word_width):
+                init = [random.random() < 0.3 for _ in range(width * height)]
+                dut = Life(width=width, height=height, word_width=word_width, init=init)
+
+                async def testbench(ctx):
+                    assert await self._read_damage(ctx, dut) == [(0, width - 1)] * height
+                    prev = init
+                    for gen in range(4):
+                        await self._step(ctx, dut)
+                        cells = life_step(prev, width, height)
+                        expected = []
+                        for y in range(height):
+                            xs = [x for x in range(width)
+                                  if cells[y * width + x] != prev[y * width + x]]
+                            expected.append((xs[0], xs[-1]) if xs else None)
+                        assert await self._read_damage(ctx, dut) == expected, \
+                            f"generation {gen + 1}"
+                        prev = cells
+
+                sim = Simulator(Fragment.get(dut, test()))
+                sim.add_clock(1e-6)
+                sim.add_testbench(testbench)
+                sim.run()
+
+    def test_period(self):
+        # A block's still from the first; a blinker's seen to repeat once
+        # there's a CRC from two generations before, and a glider never does.
+        width, height = 16, 8
+        for name, alive, periods, expected in [
+            ("block", [(1, 1), (2, 1), (1, 2), (2, 2)], 2, [1, 1, 1]),
+            ("blinker", [(4, 3), (5, 3), (6, 3)], 2, [0, 0, 2, 2]),
+            ("blinker", [(4, 3), (5, 3), (6, 3)], 4, [0, 0, 2, 2, 2]),
+            ("glider", [(1, 0), (2, 1), (0, 2), (1, 2), (2, 2)], 3, [0] * 8),
+            ("empty", [], 0, [0, 0]),
+        ]:
+            with self.subTest(name=name, periods=periods):
+                init = [False] * (width * height)
+                for x, y in alive:
+                    init[y * width + x] = True
+                dut = Life(width=width, height=height, word_width=4, init=init,
+                           periods=periods)
+
+                async def testbench(ctx):
+                    found = []
+                    for _ in expected:
+                        await self._step(ctx, dut)
+                        found.append(ctx.get(dut.period))
+                    assert found == expected, found
+
+                sim = Simulator(Fragment.get(dut, test()))
+                sim.add_clock(1e-6)
+                sim.add_testbench(testbench)
+                sim.run()
+
+    def test_period_forgotten_on_load(self):
+        width, height = 16, 8
+        init = [False] * (width * height)
+        for x in [4, 5, 6]:
+            init[3 * width + x] = True
+        dut = Life(width=width, height=height, word_width=4, init=init, periods=2)
+
+        async def testbench(ctx):
+            for _ in range(3):
+                await self._step(ctx, dut)
+            assert ctx.get(dut.period) == 2
+            # The same blinker, loaded over itself.
+            for addr, word in enumerate(Life.pack(life_step(init, width, height), 4)):
+                ctx.set(dut.load.payload.addr, addr)
+                ctx.set(dut.load.payload.data, word)
+                ctx.set(dut.load.valid, 1)
+                await ctx.tick()
+            ctx.set(dut.load.valid, 0)
+            assert ctx.get(dut.period) == 0
+            found = []
+            for _ in range(3):
+                await self._step(ctx, dut)
+                found.append(ctx.get(dut.period))
+            assert found == [0, 0, 2], found
+
+        sim = Simulator(Fragment.get(dut, test()))
+        sim.add_clock(1e-6)
+        sim.add_testbench(testbench)
+        sim.run()
+
+    @staticmethod
+    def _carried(gens, width, height):
+        # The damage from the first of `gens` to the last, as carried over
+        # one generation at a time.
+        damage = [None] * height
+        for prev, cells in zip(gens, gens[1:]):
+            for y in range(height):
+                xs = [x for x in range(width)
+                      if cells[y * width + x] != prev[y * width + x]]
+                if xs and damage[y]:
+                    damage[y] = (min(xs[0], damage[y][0]), max(xs[-1], damage[y][1]))
+                elif xs:
+                    damage[y] = (xs[0], xs[-1])
+        return damage
+
+    @staticmethod
+    async def _step_skip(ctx, dut, skip, show=False):
+        ctx.set(dut.skip, skip)
+        ctx.set(dut.step, 1)
+        await ctx.tick()
+        ctx.set(dut.skip, 0)
+        ctx.set(dut.step, 0)
+        await ctx.tick().until(~dut.busy)
+        ctx.set(dut.swap, 1)
+        ctx.set(dut.show, show)
+        await ctx.tick()
+        ctx.set(dut.swap, 0)
+        ctx.set(dut.show, 0)
+
+    def test_skip_carries_damage(self):
+        width, height, word_width = 16, 10, 4
+        init = [random.random() < 0.3 for _ in range(width * height)]
+        dut = Life(width=width, height=height, word_width=word_width, init=init)
+
+        async def testbench(ctx):
+            gens = [init]
+            for skip in [False, True, True]:
+                await self._step_skip(ctx, dut, skip)
+                gens.append(life_step(gens[-1], width, height))
+            # The first and second generations are skipped over, so the third's
+            # damage is from what was there before them.
+            assert await self._read_damage(ctx, dut) == self._carried(gens, width, height)
+            assert await self._read_cells(ctx, dut, width * height) == gens[-1]
+
+        sim = Simulator(Fragment.get(dut, test()))
+        sim.add_clock(1e-6)
+        sim.add_testbench(testbench)
+        sim.run()
+
+    def test_three_banks(self):
+        width, height, word_width = 16, 10, 4
+        init = [random.random() < 0.3 for _ in range(width * height)]
+        dut = Life(width=width, height=height, word_width=word_width, init=init, banks=3)
+
+        async def testbench(ctx):
+            gens = [init]
+            for skip in [False, True, True]:
+                await self._step_skip(ctx, dut, skip)
+                gens.append(life_step(gens[-1], width, height))
+                # Still reading what was shown, evolving on regardless.
+                assert await self._read_cells(ctx, dut, width * height) == init
+            assert await self._read_damage(ctx, dut) == [(0, width - 1)] * height
+
+            ctx.set(dut.show, 1)
+            await ctx.tick()
+            ctx.set(dut.show, 0)
+            assert await self._read_cells(ctx, dut, width * height) == gens[-1]
+            assert await self._read_damage(ctx, dut) == self._carried(gens, width, height)
+
+            # Evolved on from the shown one, then skipped over, and what that
+            # makes shown as it's swapped in.
+            for skip, show in [(False, False), (True, True)]:
+                await self._step_skip(ctx, dut, skip, show)
+                gens.append(life_step(gens[-1], width, height))
+            assert await self._read_cells(ctx, dut, width * height) == gens[-1]
+            assert await self._read_damage(ctx, dut) == self._carried(gens[-3:], width, height)
+
+        sim = Simulator(Fragment.get(dut, test()))
+        sim.add_clock(1e-6)
+        sim.add_testbench(testbench)
+        sim.run()
+
+    def test_banks(self):
+        with self.assertRaises(ValueError):
+            Life(width=32, height=6, word_width=16, banks=4)
+        with self.assertRaises(ValueError):
+            Life(width=32, height=6, word_width=16, spram=True, banks=3)
+
+    def test_load(self):
+        for word_width, spram in [(4, False), (16, True)]:
+            with self.subTest(spram=spram):
+                self._run_load(word_width, spram)
+
+    def _run_load(self, word_width, spram):
+        width, height = 16, 6
+        init = [random.random() < 0.4 for _ in range(width * height)]
+        dut = Life(width=width, height=height, word_width=word_width, init=init,
+                   spram=spram)
+
+        async def testbench(ctx):
+            await ctx.tick().until(~dut.busy)
+            # Into the bank after the first swap, to be sure it's the current
+            # one that's loaded.
+            await self._step(ctx, dut)
+            cells = [random.random() < 0.4 for _ in range(width * height)]
+            for addr, word in enumerate(Life.pack(cells, word_width)):
+                ctx.set(dut.load.payload.addr, addr)
+                ctx.set(dut.load.payload.data, word)
+                ctx.set(dut.load.valid, 1)
+                await ctx.tick().until(dut.load.ready)
+            ctx.set(dut.load.valid, 0)
+            assert await self._read_cells(ctx, dut, width * height) == cells
+
+            await self._step(ctx, dut)
+            assert await self._read_cells(ctx, dut, width * height) == \
+                life_step(cells, width, height)
+
+        sim = Simulator(Fragment.get(dut, test()))
+        sim.add_clock(1e-6)
+        sim.add_testbench(testbench)
+        sim.run()
+
+    def test_pack(self):
+        assert Life.pack([1, 0, 0, 1, 1, 1, 0, 0], 4) == [0b1001, 0b0011]
+
+    def test_word_width_must_divide_width(self):
+        with self.assertRaises(ValueError):
+            Life(width=80, height=60, word_width=32)
+
+    def test_spram_word_width(self):
+        with self.assertRaises(ValueError):
+            Life(width=80, height=60, word_width=8, spram=True)
@@ -0,0 +1,107 @@
+import unittest
+
+import numpy as np
+from amaranth import Module
+from amaranth.hdl import Fragment
+from amaranth.sim import Simulator
+
+from ili9341spi.rtl.lcd import Lcd
+from ili9341spi.rtl.proto import LcdCommand
+
+from .panel import Panel
+
+
+class test:
+    simulation = True
+
+
+class TestPanel(unittest.TestCase):
+    WIDTH = 32
+    HEIGHT = 24
+
+    def _run(self, sent):
+        # `sent` goes byte by byte through Lcd, and the panel reads the pins.
+        m = Module()
+        m.submodules.lcd = lcd = Lcd()
+
+        panel = Panel(self.WIDTH, self.HEIGHT)
+
+        async def sender(ctx):
+            for data, dc in sent:
+                ctx.set(lcd.cmd.req.payload, {"data": data, "dc": dc})
+                ctx.set(lcd.cmd.req.valid, 1)
+                await ctx.tick().until(lcd.cmd.req.ready)
+            ctx.set(lcd.cmd.req.valid, 0)
+            await ctx.tick().until(lcd.idle)
+
+        async def watcher(ctx):
+            await panel.watch(ctx, lcd.pin.clk, lcd.pin.copi, lcd.pin.dc)
+
+        sim = Simulator(Fragment.get(m, test()))
+        sim.add_clock(1e-6)
+        sim.add_testbench(sender)
+        sim.add_testbench(watcher, background=True)
+        sim.run()
+        return panel
+
+    @staticmethod
+    def _window(x0, x1, y0, y1, data):
+        # CASET, PASET and MEMORY_WRITE, followed by `data`.
+        def params(*values):
+            return [(byte, 0) for value in values for byte in value.to_bytes(2, "big")]
+
+        return [
+            (LcdCommand.CASET.value, 1), *params(x0, x1),
+            (LcdCommand.PASET.value, 1), *params(y0, y1),
+            (LcdCommand.MEMORY_WRITE.value, 1), *[(byte, 0) for byte in data],
+        ]
+
+    def _fill(self, data):
+        return self._window(0, self.WIDTH - 1, 0, self.HEIGHT - 1, data)
+
+    def test_frames_from_pins(self):
+        # Each full-panel window filled is a frame.
+        stripes = [
+            byte
+            for y in range(self.HEIGHT)
+            for byte in [0xaa if y % 2 else 0x55] * self.WIDTH * 2
+        ]
+        panel = self._run([
+            *self._fill([0x12, 0x34] * self.WIDTH * self.HEIGHT),
+            *self._fill(stripes),
+        ])
+
+        assert len(panel.frames) == 2
+        assert (panel.frames[0] == 0x1234).all()
+        assert (panel.frames[1][1::2] == 0xaaaa).all()
+        assert (panel.frames[1][0::2] == 0x5555).all()
+        assert panel.bytes == 2 * (11 + self.WIDTH * self.HEIGHT * 2)
+
+    def test_partial_window(self):
+        # Only shows up on screen, not as a frame of its own.
+        patch = [0xf8, 0x00, 0x07, 0xe0, 0x00, 0x1f, 0xff, 0xff]
+        panel = self._run([
+            *self._fill([0x12, 0x34] * self.WIDTH * self.HEIGHT),
+            *self._window(3, 4, 5, 6, patch),
+        ])
+
+        assert len(panel.frames) == 1
+        expected = np.full((self.HEIGHT, self.WIDTH), 0x1234)
+        expected[5:7, 3:5] = [[0xf800, 0x07e0], [0x001f, 0xffff]]
+        assert (panel.screen() == expected).all()
+
+    def test_wraps_within_window(self):
+        # Past the end of the window, writes carry on from its start.
+        panel = Panel(self.WIDTH, self.HEIGHT)
+        for cmd, params in [
+            (LcdCommand.CASET, [0, 3, 0, 4]),
+            (LcdCommand.PASET, [0, 5, 0, 6]),
+            (LcdCommand.MEMORY_WRITE, [0x11, 0x11] * 4 + [0x22, 0x22, 0x33, 0x33]),
+        ]:
+            panel.feed(cmd.value, 1)
+            for param in params:
+                panel.feed(param, 0)
+
+        assert panel.fb[5:7, 3:5].tolist() == [[0x2222, 0x3333], [0x1111, 0x1111]]
+        assert (panel.fb[:, :3] == Panel.UNWRITTEN).all()
+        assert (panel.fb[7:] == Panel.UNWRITTEN).all()
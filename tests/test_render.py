@@ -0,0 +1,194 @@
+import random
+import unittest
+
+from amaranth import Elaboratable, Module
+from amaranth.hdl import Fragment
+from amaranth.lib import wiring
+from amaranth.sim import Simulator
+
+from ili9341spi.rtl.life import Life
+from ili9341spi.rtl.render import Render
+
+from .panel import Panel
+from .test_life import life_step
+
+
+class test:
+    simulation = True
+
+
+class Harness(Elaboratable):
+    def __init__(self, *, width, height, cell_size, word_width, init, damage,
+                 universe_width=None):
+        self.life = Life(width=universe_width or width // cell_size,
+                         height=height // cell_size, word_width=word_width, init=init)
+        self.dut = Render(width=width, height=height, cell_size=cell_size,
+                          word_width=word_width, damage=damage,
+                          universe_width=universe_width)
+
+    def elaborate(self, platform):
+        m = Module()
+        m.submodules.life = self.life
+        m.submodules.dut = self.dut
+        wiring.connect(m, self.life.cells, self.dut.cells)
+        wiring.connect(m, self.life.damage, self.dut.damage)
+        return m
+
+
+def full_redraw(cells, width, height, cell_size):
+    grid_width = width // cell_size
+    return [
+        [0xffff if cells[(y // cell_size) * grid_width + x // cell_size] else 0x0000
+         for x in range(width)]
+        for y in range(height)
+    ]
+
+
+class TestRender(unittest.TestCase):
+    WIDTH = 32
+    HEIGHT = 24
+    CELL_SIZE = 4
+
+    def _run_frames(self, init, gens, *, damage, word_width=4, views=None,
+                    universe_width=None, cell_size=CELL_SIZE):
+        h = Harness(width=self.WIDTH, height=self.HEIGHT, cell_size=cell_size,
+                    word_width=word_width, init=init, damage=damage,
+                    universe_width=universe_width)
+        panel = Panel(self.WIDTH, self.HEIGHT)
+        frames = []
+
+        async def testbench(ctx):
+            ctx.set(h.dut.lcd.req.ready, 1)
+            for gen in range(gens):
+                if views:
+                    ctx.set(h.dut.view, views[gen])
+                # Render this generation while the next evolves.
+                ctx.set(h.dut.start, 1)
+                ctx.set(h.life.step, 1)
+                await ctx.tick()
+                ctx.set(h.dut.start, 0)
+                ctx.set(h.life.step, 0)
+                while ctx.get(h.dut.busy) or ctx.get(h.life.busy):
+                    _, _, valid, payload = await ctx.tick().sample(
+                        h.dut.lcd.req.valid, h.dut.lcd.req.payload
+                    )
+                    if valid:
+                        panel.feed(payload.data, payload.dc)
+                frames.append((panel.screen(), panel.bytes))
+                panel.bytes = 0
+
+                ctx.set(h.life.swap, 1)
+                await ctx.tick()
+                ctx.set(h.life.swap, 0)
+
+        sim = Simulator(Fragment.get(h, test()))
+        sim.add_clock(1e-6)
+        sim.add_testbench(testbench)
+        sim.run()
+        return frames
+
+    def test_damage_matches_full_redraw(self):
+        for cell_size, word_width in [(self.CELL_SIZE, 4), (1, 16)]:
+            with self.subTest(cell_size=cell_size):
+                self._run_damage_matches_full_redraw(cell_size, word_width)
+
+    def _run_damage_matches_full_redraw(self, cell_size, word_width):
+        grid_width = self.WIDTH // cell_size
+        grid_height = self.HEIGHT // cell_size
+        init = [random.random() < 0.3 for _ in range(grid_width * grid_height)]
+        gens = 5
+
+        damaged = self._run_frames(init, gens, damage=True, word_width=word_width,
+                                   cell_size=cell_size)
+        full = self._run_frames(init, gens, damage=False, word_width=word_width,
+                                cell_size=cell_size)
+
+        cells = init
+        for gen, ((damaged_fb, damaged_bytes), (full_fb, full_bytes)) in \
+                enumerate(zip(damaged, full)):
+            expected = full_redraw(cells, self.WIDTH, self.HEIGHT, cell_size)
+            assert (full_fb == expected).all(), f"full redraw, generation {gen}"
+            assert (damaged_fb == expected).all(), f"damage, generation {gen}"
+            # A window per row costs more than single pixels of soup save.
+            if gen > 0 and cell_size > 1:
+                assert damaged_bytes < full_bytes, f"generation {gen}"
+            cells = life_step(cells, grid_width, grid_height)
+
+    def test_streams_a_byte_per_cycle(self):
+        # Once the first row's fetched, a byte is offered every cycle, with no
+        # gaps for fetching rows or moving between scanlines.
+        grid_width = self.WIDTH // self.CELL_SIZE
+        grid_height = self.HEIGHT // self.CELL_SIZE
+        word_width = 4
+        h = Harness(width=self.WIDTH, height=self.HEIGHT, cell_size=self.CELL_SIZE,
+                    word_width=word_width, init=[False] * (grid_width * grid_height),
+                    damage=False)
+
+        async def testbench(ctx):
+            ctx.set(h.dut.lcd.req.ready, 1)
+            ctx.set(h.dut.start, 1)
+            await ctx.tick()
+            ctx.set(h.dut.start, 0)
+
+            await ctx.tick().until(h.dut.lcd.req.valid)
+            bytes = 1
+            while ctx.get(h.dut.busy):
+                assert ctx.get(h.dut.lcd.req.valid), f"bubble after {bytes} bytes"
+                bytes += 1
+                await ctx.tick()
+            assert bytes == 11 + self.WIDTH * self.HEIGHT * 2
+
+        sim = Simulator(Fragment.get(h, test()))
+        sim.add_clock(1e-6)
+        sim.add_testbench(testbench)
+        sim.run()
+
+    def test_sparse_damage_is_small(self):
+        # A lone blinker only redraws the five cells that change, in a window
+        # for each of the three rows they're on.
+        grid_width = self.WIDTH // self.CELL_SIZE
+        grid_height = self.HEIGHT // self.CELL_SIZE
+        init = [False] * (grid_width * grid_height)
+        for x in range(2, 5):
+            init[3 * grid_width + x] = True
+
+        frames = self._run_frames(init, 4, damage=True, word_width=8)
+        for gen, (_, bytes) in enumerate(frames[1:], 1):
+            pixel_bytes = 2 * self.CELL_SIZE * self.CELL_SIZE
+            assert bytes == 3 * 11 + 5 * pixel_bytes, f"generation {gen}: {bytes}"
+
+    def test_scroll_matches_view(self):
+        grid_width = self.WIDTH // self.CELL_SIZE
+        grid_height = self.HEIGHT // self.CELL_SIZE
+        universe_width = grid_width * 2 + 4
+        init = [random.random() < 0.3 for _ in range(universe_width * grid_height)]
+        views = [0, 3, 3, 12, 1, 0, 11, 9, 9, 2]
+
+        frames = self._run_frames(init, len(views), damage=True, views=views,
+                                  universe_width=universe_width)
+
+        cells = init
+        for gen, ((fb, _), view) in enumerate(zip(frames, views)):
+            shown = [cells[y * universe_width + view + x]
+                     for y in range(grid_height) for x in range(grid_width)]
+            assert (fb == full_redraw(shown, self.WIDTH, self.HEIGHT, self.CELL_SIZE)).all(), \
+                f"generation {gen}, view {view}"
+            cells = life_step(cells, universe_width, grid_height)
+
+    def test_pan_draws_only_the_strip(self):
+        # A still life doesn't change, so panning across it only draws what
+        # comes into view: a window per row, and the scroll.
+        grid_width = self.WIDTH // self.CELL_SIZE
+        grid_height = self.HEIGHT // self.CELL_SIZE
+        universe_width = grid_width * 2
+        init = [False] * (universe_width * grid_height)
+        for x, y in [(9, 2), (10, 2), (9, 3), (10, 3)]:
+            init[y * universe_width + x] = True
+        views = [0, 2, 5, 4]
+
+        frames = self._run_frames(init, len(views), damage=True, views=views,
+                                  universe_width=universe_width)
+        for (_, bytes), view, last in zip(frames[1:], views[1:], views):
+            cells = abs(view - last)
+            row_bytes = 11 + cells * self.CELL_SIZE * self.CELL_SIZE * 2
+            assert bytes == 3 + grid_height * row_bytes, f"view {view}: {bytes}"
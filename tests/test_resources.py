@@ -0,0 +1,130 @@
+import json
+import unittest
+
+from amaranth import Module, Signal
+from amaranth.lib import wiring
+from amaranth.lib.memory import Memory
+from amaranth.lib.wiring import In, Out
+
+from ili9341spi import ILI9341SPI
+from ili9341spi.resources import analyse, compare, netlist, report
+from ili9341spi.rtl import Top
+from ili9341spi.targets import icebreaker, ulx3s
+
+
+class Chain(wiring.Component):
+    a: In(8)
+    b: In(8)
+    o: Out(8)
+
+    def elaborate(self, platform):
+        m = Module()
+        # An 8-bit add, registered, then anded with `b` on the way out.
+        sum = Signal(8)
+        m.d.sync += sum.eq(self.a + self.b)
+        m.d.comb += self.o.eq(sum & self.b)
+        return m
+
+
+class Rom(wiring.Component):
+    addr: In(10)
+    data: Out(16)
+
+    def __init__(self, *, depth, block):
+        self._depth = depth
+        self._block = block
+        super().__init__()
+
+    def elaborate(self, platform):
+        m = Module()
+        m.submodules.rom = rom = Memory(shape=16, depth=self._depth,
+                                        init=range(self._depth),
+                                        attrs={"rom_style": "block"} if self._block else {})
+        port = rom.read_port()
+        m.d.comb += port.addr.eq(self.addr)
+        m.d.comb += self.data.eq(port.data)
+        return m
+
+
+class Blinky(wiring.Component):
+    # No ports of its own, just a pin, like Top.
+    def __init__(self):
+        super().__init__({})
+
+    def elaborate(self, platform):
+        m = Module()
+        counter = Signal(8)
+        m.d.sync += counter.eq(counter + 1)
+        m.d.comb += platform.request("led", 0).o.eq(counter[-1])
+        return m
+
+
+class TestResources(unittest.TestCase):
+    def test_counts_and_depth(self):
+        result = analyse(netlist(Chain(), icebreaker()), icebreaker())
+        assert result["ffs"] == 8
+        assert result["bram"] == 0
+        # The adder's carry chain, into the flops; the and after them is a
+        # path of its own.
+        assert result["depth"] == 8, result["depth"]
+        assert result["depth_at"].startswith("test_resources.py:")
+
+    def test_bram(self):
+        for depth, block, expected in [(8, False, 0), (8, True, 1), (1024, False, 4)]:
+            with self.subTest(depth=depth, block=block):
+                dut = Rom(depth=depth, block=block)
+                result = analyse(netlist(dut, icebreaker()), icebreaker())
+                assert result["memory_bits"] == depth * 16
+                assert result["bram"] == expected, result["bram"]
+        # One DP16KD takes 1024x18.
+        assert analyse(netlist(Rom(depth=1024, block=False), ulx3s()), ulx3s())["bram"] == 1
+
+    def test_pins(self):
+        # Prepared as for a build: the I/O cells are counted, and paths run
+        # into them without knowing which way their ports go.
+        for target, io_cell in [(icebreaker, "SB_IO"), (ulx3s, "OBZ")]:
+            with self.subTest(target=target.__name__):
+                platform = target()
+                result = analyse(netlist(Blinky(), platform), platform)
+                assert result["primitives"].get(io_cell) == 1, result["primitives"]
+                assert result["ffs"] >= 8
+                assert result["depth"] >= 8, result["depth"]
+
+    def test_up5k_1x1(self):
+        # Life at a cell a pixel, against what the UP5K has: 5280 logic cells,
+        # each with one flop, 30 block RAMs and 4 SPRAMs. The flops are most
+        # of it; whether the logic packs in alongside is for nextpnr to say.
+        platform = icebreaker()
+        result = analyse(netlist(Top(platform, cell_size=1), platform), platform)
+        assert result["primitives"]["SB_SPRAM256KA"] <= 4
+        assert result["bram"] <= 30
+        assert result["ffs"] <= 5280, result["ffs"]
+
+    def test_compare(self):
+        was = {"cells": 100, "gates": 80, "ffs": 10, "bram": 1, "depth": 12,
+               "depth_at": "lcd.py:1"}
+        baseline = {"icebreaker": {"Lcd": was}}
+
+        lines, grown = compare({"icebreaker": {"Lcd": {**was, "cells": 104}}}, baseline)
+        assert not grown
+        assert lines == ["icebreaker Lcd cells: 100 -> 104 (+4.0%)"]
+
+        _, grown = compare({"icebreaker": {"Lcd": {**was, "cells": 106}}}, baseline)
+        assert grown
+        _, grown = compare({"icebreaker": {"Lcd": {**was, "depth": 13}}}, baseline)
+        assert grown
+        _, grown = compare({"icebreaker": {"Lcd": {**was, "gates": 20}}}, baseline)
+        assert not grown
+
+        lines, grown = compare({"ulx3s": {"Lcd": was}}, baseline)
+        assert lines == ["ulx3s Lcd: not in baseline"]
+        assert not grown
+
+    def test_baseline(self):
+        # The smaller components against what's committed, so one quietly
+        # doubling in size fails here rather than waiting to be noticed.
+        with open(ILI9341SPI().path("resources.json")) as f:
+            baseline = json.load(f)
+        results = report([icebreaker, ulx3s], ["Lcd", "Initter"])
+        lines, grown = compare(results, baseline)
+        assert not grown, lines
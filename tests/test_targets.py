@@ -0,0 +1,17 @@
+import unittest
+
+from ili9341spi.targets import icebreaker, ulx3s
+
+
+class TestTargets(unittest.TestCase):
+    # The ILI9341's serial cycle times: tSCYCW and tSCYCR.
+    WRITE_PERIOD = 100e-9
+    READ_PERIOD = 150e-9
+
+    def test_spi_within_datasheet(self):
+        for target in [icebreaker, ulx3s]:
+            with self.subTest(target=target.__name__):
+                write = target.lcd_divisor / target.lcd_clk_frequency
+                read = target.lcd_read_divisor / target.lcd_clk_frequency
+                self.assertGreaterEqual(write, self.WRITE_PERIOD)
+                self.assertGreaterEqual(read, self.READ_PERIOD)
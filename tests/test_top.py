@@ -0,0 +1,149 @@
+import unittest
+
+import numpy as np
+
+from ili9341spi import host
+from ili9341spi.rtl.proto import Stats
+
+from .test_life import life_run
+from .test_render import full_redraw
+from .top import Harness, Top, platform
+
+
+class TestTop(unittest.TestCase):
+    def test_seed(self):
+        # Wide enough that the seed's more than the bridge can queue, and sent
+        # while the first frame's still being drawn, so the LOADs wait. The
+        # panel's slowed to a byte every eight cycles so the frame takes
+        # longer than the seed does to arrive, as it would at full size.
+        plat = platform()
+        plat.lcd_clk_frequency = plat.default_clk_frequency
+        h = Harness(Top(plat, grid_width=512), plat=plat)
+        width, height = 512, Top.LCD_HEIGHT // 4
+        panel_width = Top.LCD_WIDTH // 4
+        data = host.seed(host.parse_rle("x = 3, y = 3\nbob$2bo$3o!"), width, height, x=2, y=1)
+        assert len(data) > 256 + 64
+
+        async def testbench(ctx):
+            await ctx.tick().until(h.top.stats.init != 0)
+            for chunk in host.chunks(data):
+                await h.send(ctx, chunk)
+                assert await h.reply(ctx) == host.sync()
+
+            # Redrawn in full once the host hands back: from the start of that
+            # frame to the start of the next.
+            await ctx.tick().until(h.top.stats.host != 0)
+            gens = ctx.get(h.top.stats.gens)
+            await ctx.tick().until(h.top.stats.gens != gens)
+            nonlocal screen
+            screen = h.panel.screen()
+
+        screen = None
+        h.run(testbench)
+
+        cells = [False] * (width * height)
+        for x, y in [(3, 1), (4, 2), (2, 3), (3, 3), (4, 3)]:
+            cells[y * width + x] = True
+        shown = [cells[y * width + x] for y in range(height) for x in range(panel_width)]
+        assert screen.tolist() == \
+            full_redraw(shown, Top.LCD_WIDTH, Top.LCD_HEIGHT, 4)
+
+    def _frames(self, frame_gens, count):
+        # A glider, which never settles, seeded and then drawn `count` times.
+        # Each frame's what's on screen once the panel's had every byte sent
+        # before the next one started. Returns the cells seeded, and each
+        # frame with the generations evolved since the first.
+        plat = platform()
+        h = Harness(Top(plat, frame_gens=frame_gens), plat=plat)
+        width, height = Top.LCD_WIDTH // 4, Top.LCD_HEIGHT // 4
+        data = host.seed(host.parse_rle("x = 3, y = 3\nbob$2bo$3o!"), width, height, x=2, y=1)
+        frames = []
+
+        async def testbench(ctx):
+            await ctx.tick().until(h.top.stats.init != 0)
+            for chunk in host.chunks(data):
+                await h.send(ctx, chunk)
+                assert await h.reply(ctx) == host.sync()
+
+            # The first frame's the one drawn once the host hands back.
+            await ctx.tick().until(h.top.stats.host != 0)
+            last = ctx.get(h.top.stats.as_value())
+            first = ctx.get(h.top.stats.gens)
+            gens = [0]
+            ends = []
+            while len(frames) < count:
+                await ctx.tick()
+                if ctx.get(h.top.stats.as_value()) != last:
+                    last = ctx.get(h.top.stats.as_value())
+                    ends.append(ctx.get(h.top.stats.lcd_bytes))
+                    gens.append(ctx.get(h.top.stats.gens) - first)
+                if ends and h.panel.bytes >= ends[0]:
+                    assert h.panel.bytes == ends.pop(0)
+                    frames.append((gens.pop(0), h.panel.screen()))
+
+        h.run(testbench)
+
+        cells = np.zeros((height, width), dtype=bool)
+        for x, y in [(3, 1), (4, 2), (2, 3), (3, 3), (4, 3)]:
+            cells[y, x] = True
+        return cells, frames
+
+    @staticmethod
+    def _shows(frame, cells):
+        return frame.tolist() == full_redraw(cells.ravel().tolist(), Top.LCD_WIDTH,
+                                             Top.LCD_HEIGHT, 4)
+
+    def test_frame_gens(self):
+        # Frames on the pins are generations 0, K, 2K, and so on.
+        for frame_gens in [1, 3]:
+            with self.subTest(frame_gens=frame_gens):
+                cells, frames = self._frames(frame_gens, 4)
+                for ix, (gens, frame) in enumerate(frames):
+                    assert gens == ix * frame_gens, f"frame {ix}"
+                    assert self._shows(frame, life_run(cells, gens)), f"frame {ix}"
+
+    def test_continuous(self):
+        # Evolving continuously, generations go by undrawn, but every frame's
+        # a whole one, each later than the last.
+        cells, frames = self._frames(0, 4)
+        for ix, (gens, frame) in enumerate(frames):
+            if ix:
+                assert gens > frames[ix - 1][0], f"frame {ix}"
+            assert self._shows(frame, life_run(cells, gens)), f"frame {ix}"
+        assert frames[-1][0] > len(frames)
+
+    def test_settled_counted(self):
+        # A block settles at once. Once Top's left it be for a while, the host
+        # taking the panel and handing it back has it drawn again; every cycle
+        # between that frame and the last is counted in one phase or another.
+        h = Harness()
+        width, height = Top.LCD_WIDTH // 4, Top.LCD_HEIGHT // 4
+        data = host.seed(host.parse_rle("x = 2, y = 2\n2o$2o!"), width, height)
+        phases = [
+            name for name, _ in Stats.as_shape()
+            if name not in ("gens", "lcd_bytes", "spi_idle")
+        ]
+
+        async def testbench(ctx):
+            await ctx.tick().until(h.top.stats.init != 0)
+            for chunk in host.chunks(data):
+                await h.send(ctx, chunk)
+                assert await h.reply(ctx) == host.sync()
+
+            # Settled once no frame's started for a few frames' time.
+            while True:
+                last = ctx.get(h.top.stats.as_value())
+                await ctx.tick().repeat(3 * ctx.get(h.top.frame_cycles))
+                if ctx.get(h.top.stats.as_value()) == last:
+                    break
+            before = ctx.get(h.top.stats)
+
+            await h.send(ctx, host.host() + host.life() + host.sync())
+            assert await h.reply(ctx) == host.sync()
+            await ctx.tick().until(h.top.stats.as_value() != last)
+            after = ctx.get(h.top.stats)
+            delta = {name: getattr(after, name) - getattr(before, name) for name in phases}
+            assert delta["settled"] > 0
+            assert sum(delta.values()) == ctx.get(h.top.frame_cycles), delta
+
+        h.run(testbench)
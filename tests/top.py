@@ -0,0 +1,90 @@
+from amaranth.hdl import Fragment
+from amaranth.sim import Simulator
+
+from ili9341spi import rtl
+from ili9341spi.targets import cxxrtl
+
+from .panel import Panel
+
+
+class platform(cxxrtl):
+    # cxxrtl's, but slowed right down, so the panel's delays take a few
+    # thousand cycles rather than a few hundred thousand. The UART's bits are
+    # eight cycles, enough for it to find the middle of each.
+    simulation = True
+    default_clk_frequency = 10_000.0
+    lcd_clk_frequency = 20_000.0
+    uart_baud = 1_250
+
+
+class Top(rtl.Top):
+    # Just big enough for a row of 16-cell words; a frame's a few seconds of
+    # simulation rather than a few minutes.
+    LCD_WIDTH = 64
+    LCD_HEIGHT = 24
+
+
+class Harness:
+    # Top on the pins it has under cxxrtl: the UART's driven and listened to
+    # a bit at a time, and the panel's read off the SPI pins.
+    def __init__(self, top=None, *, plat=None):
+        self.plat = plat or platform()
+        self.top = top or Top(self.plat)
+        self.panel = Panel(self.top.LCD_WIDTH, self.top.LCD_HEIGHT)
+        self.divisor = int(self.plat.default_clk_frequency // self.plat.uart_baud)
+        self.received = []
+        self.done = False
+
+    async def spi_clk(self, ctx):
+        # A process, not a testbench, so each edge is exactly when it should
+        # be; it can't sample, so it keeps its own count.
+        clk = 0
+        while True:
+            await ctx.delay(1 / self.plat.lcd_clk_frequency / 2)
+            clk ^= 1
+            ctx.set(self.top.spi_clk, clk)
+
+    async def send(self, ctx, data):
+        # 8N1, least significant bit first.
+        for byte in data:
+            for bit in [0, *((byte >> ix) & 1 for ix in range(8)), 1]:
+                ctx.set(self.top.uart_rx, bit)
+                await ctx.tick().repeat(self.divisor)
+
+    async def receive(self, ctx):
+        # Everything sent back, into `received`, until the testbench is `done`.
+        while not self.done:
+            if ctx.get(self.top.uart_tx):
+                await ctx.tick()
+                continue
+            await ctx.tick().repeat(self.divisor // 2)
+            byte = 0
+            for ix in range(8):
+                await ctx.tick().repeat(self.divisor)
+                byte |= ctx.get(self.top.uart_tx) << ix
+            await ctx.tick().repeat(self.divisor)
+            self.received.append(byte)
+
+    async def reply(self, ctx, length=1):
+        # The next `length` bytes received.
+        while len(self.received) < length:
+            await ctx.tick()
+        reply, self.received[:] = self.received[:length], self.received[length:]
+        return bytes(reply)
+
+    async def watch(self, ctx):
+        await self.panel.watch(ctx, self.top.lcd.clk, self.top.lcd.copi, self.top.lcd.dc)
+
+    def run(self, testbench):
+        async def main(ctx):
+            ctx.set(self.top.uart_rx, 1)
+            await testbench(ctx)
+            self.done = True
+
+        sim = Simulator(Fragment.get(self.top, self.plat))
+        sim.add_clock(1 / self.plat.default_clk_frequency)
+        sim.add_process(self.spi_clk)
+        sim.add_testbench(main)
+        sim.add_testbench(self.receive)
+        sim.add_testbench(self.watch, background=True)
+        sim.run()